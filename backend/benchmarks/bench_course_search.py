@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Course search benchmark
+Builds the in-process course search index over synthetic courses and reports
+per-query latency for search-as-you-type prefixes and full queries.
+
+Usage: python benchmarks/bench_course_search.py [courses]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from routers.course_search import CourseSearchIndex  # noqa: E402
+
+WORDS = [
+    "python", "programming", "basics", "english", "spoken", "mathematics", "physics",
+    "chemistry", "marketing", "digital", "tailoring", "fashion", "design", "data",
+    "science", "analysis", "excel", "accounting", "telugu", "grammar", "ssc", "intermediate",
+    "advanced", "beginner", "web", "development", "react", "java", "career", "interview"
+]
+TELUGU_WORDS = ["పైథాన్", "ప్రోగ్రామింగ్", "గణితం", "ఇంగ్లీష్", "డిజిటల్", "మార్కెటింగ్"]
+QUERIES = ["p", "py", "pyth", "python", "python prog", "digital mark", "data sci", "గణ", "english grammar"]
+
+
+def synthetic_courses(count):
+    rng = random.Random(42)
+    for i in range(count):
+        yield {
+            "id": f"course-{i}",
+            "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+            "title_te": " ".join(rng.sample(TELUGU_WORDS, 2)),
+            "description": " ".join(rng.choices(WORDS, k=25)),
+            "tags": rng.sample(WORDS, 3),
+            "category": rng.choice(["tech", "k12", "language", "skill"]),
+            "is_featured": rng.random() < 0.2,
+            "created_at": f"2025-01-01T00:00:{i:06d}"
+        }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    start = time.perf_counter()
+    index = CourseSearchIndex(synthetic_courses(count))
+    print(f"Indexed {count} courses ({len(index.vocabulary)} tokens) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(50):
+            t0 = time.perf_counter()
+            _, total = index.search(query)
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"{query!r:20} matches={total:6}  median={statistics.median(timings):.2f} ms  max={max(timings):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
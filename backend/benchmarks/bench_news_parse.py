@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+RSS parser benchmark
+Compares the streaming lxml parser (news.parse_rss_items) with the previous
+BeautifulSoup implementation on the same feed documents and reports items/sec.
+
+Usage: python benchmarks/bench_news_parse.py [feed.xml ...]
+
+Pass saved copies of real feeds (e.g. `curl -o hindu.xml <feed url>`) to benchmark
+those; without arguments, synthetic feeds shaped like the configured sources
+(CDATA HTML descriptions, media:content, enclosures) are generated.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from bs4 import BeautifulSoup  # noqa: E402
+from routers.news import parse_rss_items  # noqa: E402
+
+WORDS = [
+    "hyderabad", "telangana", "metro", "ghmc", "minister", "project", "water", "supply",
+    "police", "traffic", "election", "budget", "school", "hospital", "farmers", "rains"
+]
+
+
+def bs4_parse_rss_items(xml_text, url, limit=10):
+    """The BeautifulSoup parser this benchmark is measured against"""
+    items = []
+    soup = BeautifulSoup(xml_text, 'lxml-xml')
+    for item in soup.find_all('item')[:limit]:
+        title = item.find('title')
+        link = item.find('link')
+        description = item.find('description')
+        pub_date = item.find('pubDate')
+        image = None
+        media = item.find('media:content') or item.find('enclosure') or item.find('media:thumbnail')
+        if media and media.get('url'):
+            image = media.get('url')
+        if not image and description:
+            img_tag = BeautifulSoup(description.text, 'html.parser').find('img')
+            if img_tag and img_tag.get('src'):
+                image = img_tag.get('src')
+        desc_text = ""
+        if description:
+            desc_text = BeautifulSoup(description.text, 'html.parser').get_text()[:400].strip()
+        items.append({
+            "title": title.text.strip() if title else "No title",
+            "summary": desc_text or "Read more...",
+            "link": link.text.strip() if link else "",
+            "image": image,
+            "published_at": pub_date.text if pub_date else None
+        })
+    return items
+
+
+def synthetic_feed(count, seed):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        words = " ".join(rng.choices(WORDS, k=60))
+        media = f'<media:content url="https://img.example.com/{seed}/{i}.jpg" medium="image"/>' if i % 2 else ""
+        items.append(
+            f"<item><title><![CDATA[{' '.join(rng.sample(WORDS, 6)).title()}]]></title>"
+            f"<link>https://news.example.com/{seed}/article-{i}</link>"
+            f"<guid>https://news.example.com/{seed}/article-{i}</guid>"
+            f"<description><![CDATA[<p><img src=\"https://img.example.com/d/{i}.jpg\" width=\"300\"/>"
+            f"<strong>{words[:80]}</strong> {words}</p><p>{words}</p>]]></description>"
+            f"<pubDate>Sat, 18 Oct 2025 {i % 24:02d}:15:00 +0530</pubDate>{media}</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>'
+        f"<title>Feed {seed}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def bench(name, parse, feeds, limit, rounds=5):
+    per_round = []
+    total_items = 0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        total_items = sum(len(parse(body, "https://news.example.com/feed", limit)) for body in feeds)
+        per_round.append(time.perf_counter() - t0)
+    seconds = statistics.median(per_round)
+    print(f"{name:12} items={total_items:6}  median={seconds * 1000:8.1f} ms  {total_items / seconds:10.0f} items/sec")
+    return total_items / seconds
+
+
+def main():
+    if len(sys.argv) > 1:
+        feeds = [Path(path).read_bytes() for path in sys.argv[1:]]
+        print(f"{len(feeds)} recorded feeds")
+    else:
+        feeds = [synthetic_feed(50, seed) for seed in range(20)]
+        print(f"{len(feeds)} synthetic feeds x 50 items")
+
+    for limit in (10, 50):
+        print(f"-- limit={limit}")
+        old = bench("bs4", lambda body, url, n: bs4_parse_rss_items(body.decode("utf-8", "replace"), url, n), feeds, limit)
+        new = bench("iterparse", parse_rss_items, feeds, limit)
+        print(f"speedup x{new / old:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Wearable ingestion benchmark
+Compares samples/sec of the per-item sync path (/fitness/sync/wearable, one request
+and one insert per activity) against the batch path (/fitness/sync/batch).
+
+Usage: REACT_APP_BACKEND_URL=http://localhost:8001 python benchmarks/bench_wearable_ingest.py [samples]
+"""
+import os
+import sys
+import time
+import uuid
+import requests
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001').rstrip('/')
+
+# Test credentials (MOCKED - static OTP)
+TEST_PHONE = "9876543210"
+TEST_OTP = "123456"
+
+BATCH_SIZE = 500
+
+
+def get_headers():
+    requests.post(f"{BASE_URL}/api/auth/send-otp", json={"phone": TEST_PHONE})
+    resp = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={"phone": TEST_PHONE, "otp": TEST_OTP})
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['token']}", "Content-Type": "application/json"}
+
+
+def bench_per_item(session, headers, samples):
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    start = time.perf_counter()
+    for _ in range(samples):
+        session.post(f"{BASE_URL}/api/fitness/sync/wearable", headers=headers, json={
+            "device_type": "bench_watch",
+            "sync_date": today,
+            "activities": [{"type": "walking", "duration": 1, "steps": 100}]
+        }).raise_for_status()
+    return samples / (time.perf_counter() - start)
+
+
+def bench_batch(session, headers, samples):
+    now = datetime.now(timezone.utc).isoformat()
+    device_id = f"bench-{uuid.uuid4()}"
+    batch = [
+        {"kind": "heart_rate", "sample_id": str(i), "recorded_at": now, "values": {"current": 60 + i % 40}}
+        for i in range(samples)
+    ]
+    start = time.perf_counter()
+    for offset in range(0, samples, BATCH_SIZE):
+        session.post(f"{BASE_URL}/api/fitness/sync/batch", headers=headers, json={
+            "device_id": device_id,
+            "device_type": "bench_watch",
+            "samples": batch[offset:offset + BATCH_SIZE]
+        }).raise_for_status()
+    return samples / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    headers = get_headers()
+    with requests.Session() as session:
+        per_item = bench_per_item(session, headers, samples)
+        batch = bench_batch(session, headers, samples)
+    print(f"per-item: {per_item:,.0f} samples/sec")
+    print(f"batch:    {batch:,.0f} samples/sec ({batch / per_item:.1f}x)")
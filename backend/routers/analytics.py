@@ -4,10 +4,15 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime, timezone, timedelta
 from .utils import db, generate_id, now_iso, get_current_user
+from .cubes import ensure_cube_indexes, query_colony_cubes, totals_by_colony, rebuild_colony_cubes
 import logging
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+@router.on_event("startup")
+async def ensure_analytics_indexes():
+    await ensure_cube_indexes()
+
 
 # ============== MODELS ==============
 
@@ -302,3 +307,46 @@ async def export_analytics(
         "total_events": len(events),
         "events": events
     }
+
+
+# ============== COLONY CUBES ==============
+
+@router.get("/admin/colony-cubes")
+async def get_colony_cubes(
+    days: int = 30,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    colonies: Optional[str] = None,
+    metrics: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    """Admin: Per-colony daily metrics (comma-separated colonies/metrics filters)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    end_date = end_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    start_date = start_date or (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    cells = await query_colony_cubes(
+        start_date,
+        end_date,
+        colonies=colonies.split(",") if colonies else None,
+        metrics=metrics.split(",") if metrics else None
+    )
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "cells": cells,
+        "totals": totals_by_colony(cells)
+    }
+
+
+@router.post("/admin/colony-cubes/rebuild")
+async def rebuild_cubes(user: dict = Depends(get_current_user)):
+    """Admin: Recompute colony cubes from source collections"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    cell_count = await rebuild_colony_cubes()
+    return {"success": True, "cells": cell_count}
@@ -0,0 +1,260 @@
+"""Certificate share assets - pre-rendered OpenGraph HTML and PNG images
+
+Share pages and images are rendered once when a certificate is issued and written
+to a content-addressed disk cache: the file name is a hash of the template version
+and the certificate fields, so a file never changes once written and can be served
+with immutable cache headers. Bump CERTIFICATE_TEMPLATE_VERSION after editing the
+template and run `python -m routers.certificate_render` to re-render everything.
+"""
+import asyncio
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from PIL import Image, ImageDraw, ImageFont, features
+from .utils import db
+
+CERTIFICATE_TEMPLATE_VERSION = "2"
+
+# The default font has no Telugu glyphs. Lines with Telugu text use Noto Sans Telugu:
+# CERTIFICATE_TELUGU_FONT, a file dropped into backend/fonts, or the system package
+# (fonts-noto-core on Debian/Ubuntu, installed by nixpacks.toml).
+TELUGU_FONT_CANDIDATES = [
+    os.environ.get("CERTIFICATE_TELUGU_FONT"),
+    Path(__file__).parent.parent / "fonts" / "NotoSansTelugu-Regular.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansTelugu-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansTelugu-Regular.ttf"
+]
+
+_TELUGU_RE = re.compile("[\u0c00-\u0c7f]")
+
+CERTIFICATE_CACHE_DIR = Path(os.environ.get(
+    "CERTIFICATE_CACHE_DIR",
+    Path(__file__).parent.parent / "cache" / "certificates"
+))
+
+IMAGE_SIZE = (1200, 630)
+
+BRAND_COLOR = (13, 148, 136)
+DARK_COLOR = (30, 41, 59)
+
+# certificate_id -> share key, so crawler hits skip Mongo
+_share_keys = {}
+
+def frontend_url() -> str:
+    return os.environ.get("FRONTEND_URL", "https://www.mydammaiguda.in")
+
+def share_fields(certificate: dict) -> dict:
+    return {
+        "id": certificate["id"],
+        "user_name": certificate.get("user_name", "Student"),
+        "course_title": certificate.get("course_title", "Course"),
+        "certificate_number": certificate.get("certificate_number", ""),
+        "issued_at": (certificate.get("issued_at") or "")[:10]
+    }
+
+def has_telugu(text: str) -> bool:
+    return bool(_TELUGU_RE.search(text))
+
+@lru_cache(maxsize=1)
+def telugu_font_path() -> Optional[str]:
+    for candidate in TELUGU_FONT_CANDIDATES:
+        if candidate and Path(candidate).is_file():
+            return str(candidate)
+    logging.warning("No Noto Sans Telugu font found; Telugu certificate text will not render")
+    return None
+
+def share_key(fields: dict) -> str:
+    payload = {"template": CERTIFICATE_TEMPLATE_VERSION, "base_url": frontend_url(), **fields}
+    # An image drawn before the Telugu font was installed must not be reused afterwards
+    if any(has_telugu(str(value)) for value in fields.values()):
+        payload["telugu_font"] = Path(telugu_font_path() or "").name
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+def asset_path(key: str, extension: str) -> Path:
+    return CERTIFICATE_CACHE_DIR / f"{key}.{extension}"
+
+def render_certificate_html(fields: dict, key: str) -> str:
+    base_url = frontend_url()
+    e = {name: html.escape(str(value)) for name, value in fields.items()}
+    og_image = f"{base_url}/certificate/assets/{key}.png"
+    page_url = f"{base_url}/certificate/{e['id']}"
+    app_url = f"{base_url}/education/certificate/{e['id']}"
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{e['user_name']} - {e['course_title']} Certificate | My Dammaiguda</title>
+
+    <!-- OpenGraph Meta Tags -->
+    <meta property="og:title" content="{e['user_name']} completed {e['course_title']}!" />
+    <meta property="og:description" content="Certificate of Completion from AIT Education Platform. Certificate No: {e['certificate_number']}" />
+    <meta property="og:image" content="{og_image}" />
+    <meta property="og:image:width" content="{IMAGE_SIZE[0]}" />
+    <meta property="og:image:height" content="{IMAGE_SIZE[1]}" />
+    <meta property="og:url" content="{page_url}" />
+    <meta property="og:type" content="website" />
+    <meta property="og:site_name" content="My Dammaiguda - AIT Education" />
+
+    <!-- Twitter Card Meta Tags -->
+    <meta name="twitter:card" content="summary_large_image" />
+    <meta name="twitter:title" content="{e['user_name']} completed {e['course_title']}!" />
+    <meta name="twitter:description" content="Certificate of Completion from AIT Education Platform" />
+    <meta name="twitter:image" content="{og_image}" />
+
+    <!-- Redirect to frontend app -->
+    <meta http-equiv="refresh" content="0; url={app_url}">
+
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: linear-gradient(135deg, #0D9488 0%, #1e293b 100%); color: white; }}
+        .card {{ background: white; color: #333; padding: 40px; border-radius: 16px; max-width: 500px; text-align: center; box-shadow: 0 25px 50px rgba(0,0,0,0.3); }}
+        h1 {{ color: #0D9488; margin-bottom: 10px; }}
+        .cert-number {{ font-family: monospace; background: #f1f5f9; padding: 8px 16px; border-radius: 8px; display: inline-block; margin: 20px 0; }}
+        .link {{ color: #0D9488; text-decoration: none; }}
+    </style>
+</head>
+<body>
+    <div class="card">
+        <h1>Certificate of Completion</h1>
+        <h2>{e['user_name']}</h2>
+        <p>has successfully completed</p>
+        <h3>{e['course_title']}</h3>
+        <div class="cert-number">{e['certificate_number']}</div>
+        <p>Issued: {e['issued_at']}</p>
+        <p><a href="{app_url}" class="link">View Full Certificate →</a></p>
+    </div>
+</body>
+</html>
+"""
+
+def _font(text: str, size: int) -> ImageFont.ImageFont:
+    """Noto Sans Telugu for Telugu text when available, the default font otherwise"""
+    path = telugu_font_path() if has_telugu(text) else None
+    if not path:
+        return ImageFont.load_default(size=size)
+    # Raqm shapes conjuncts and vowel signs; the basic layout only places glyphs side by side
+    layout = ImageFont.Layout.RAQM if features.check("raqm") else ImageFont.Layout.BASIC
+    return ImageFont.truetype(path, size=size, layout_engine=layout)
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, max_width: int, size: int) -> ImageFont.ImageFont:
+    """Largest font size up to `size` at which text fits max_width"""
+    while size > 16:
+        font = _font(text, size)
+        if draw.textlength(text, font=font) <= max_width:
+            return font
+        size -= 4
+    return _font(text, size)
+
+def render_certificate_png(fields: dict) -> bytes:
+    width, height = IMAGE_SIZE
+    image = Image.new("RGB", IMAGE_SIZE, DARK_COLOR)
+    draw = ImageDraw.Draw(image)
+
+    # Brand band and card
+    draw.rectangle([0, 0, width, height // 2], fill=BRAND_COLOR)
+    draw.rounded_rectangle([60, 50, width - 60, height - 50], radius=24, fill="white")
+
+    center = width // 2
+    card_width = width - 200
+    lines = [
+        ("Certificate of Completion", BRAND_COLOR, 44, 120),
+        (fields["user_name"], DARK_COLOR, 64, 230),
+        ("has successfully completed", (100, 116, 139), 28, 310),
+        (fields["course_title"], DARK_COLOR, 44, 380),
+        (f"{fields['certificate_number']}  ·  Issued {fields['issued_at']}", (100, 116, 139), 24, 480)
+    ]
+    for text, color, size, y in lines:
+        font = _fit_text(draw, text, card_width, size)
+        draw.text((center, y), text, fill=color, font=font, anchor="mm")
+
+    draw.text((center, height - 85), "My Dammaiguda · AIT Education", fill=BRAND_COLOR,
+              font=ImageFont.load_default(size=22), anchor="mm")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def write_share_assets(certificate: dict) -> str:
+    """Render the share page and image into the cache (if not already there); returns the key"""
+    fields = share_fields(certificate)
+    key = share_key(fields)
+    CERTIFICATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    html_path, png_path = asset_path(key, "html"), asset_path(key, "png")
+    if not png_path.exists():
+        _write_atomic(png_path, render_certificate_png(fields))
+    if not html_path.exists():
+        _write_atomic(html_path, render_certificate_html(fields, key).encode("utf-8"))
+    return key
+
+async def render_share_assets(certificate: dict) -> str:
+    """Render off the event loop and record the key on the certificate"""
+    key = await asyncio.to_thread(write_share_assets, certificate)
+    if certificate.get("share_key") != key:
+        await db.certificates.update_one({"id": certificate["id"]}, {"$set": {"share_key": key}})
+    _share_keys[certificate["id"]] = key
+    return key
+
+async def get_share_html(certificate_id: str) -> Optional[bytes]:
+    """Cached share page for a certificate, rendering it first if needed"""
+    key = _share_keys.get(certificate_id)
+    if key and asset_path(key, "html").exists():
+        return asset_path(key, "html").read_bytes()
+
+    certificate = await db.certificates.find_one({"id": certificate_id}, {"_id": 0})
+    if not certificate:
+        return None
+    key = certificate.get("share_key")
+    if not key or not asset_path(key, "html").exists():
+        key = await render_share_assets(certificate)
+    _share_keys[certificate_id] = key
+    return asset_path(key, "html").read_bytes()
+
+def get_share_image_path(key: str) -> Optional[Path]:
+    # Keys are hex digests; anything else is not ours
+    if not key.isalnum():
+        return None
+    path = asset_path(key, "png")
+    return path if path.exists() else None
+
+async def rerender_all_certificates() -> dict:
+    """Re-render every certificate (after a template change) and drop unreferenced files"""
+    started = time.time()
+    keys = set()
+    rendered = 0
+    async for certificate in db.certificates.find({}, {"_id": 0}):
+        keys.add(await render_share_assets(certificate))
+        rendered += 1
+
+    removed = 0
+    if CERTIFICATE_CACHE_DIR.exists():
+        for path in CERTIFICATE_CACHE_DIR.iterdir():
+            if path.name.split(".")[0] in keys:
+                continue
+            try:
+                # Certificates issued while this ran wrote files the scan above never saw
+                if path.stat().st_mtime >= started:
+                    continue
+            except FileNotFoundError:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+    return {"rendered": rendered, "removed": removed}
+
+
+if __name__ == "__main__":
+    print(asyncio.run(rerender_all_certificates()))
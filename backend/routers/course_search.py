@@ -0,0 +1,177 @@
+"""Course search - in-process inverted index over published courses
+
+Title, description, tags and the Telugu title/description are tokenized into a
+token -> {course_id: weight} map. Postings are laid out in sorted vocabulary
+order in flat arrays, so every token sharing a prefix is one contiguous slice:
+search-as-you-type is two bisects and a vectorized max per query word, however
+many tokens the prefix covers, instead of a $regex scan.
+The index is rebuilt from Mongo when a course changes (invalidate_course_search)
+and at most every SEARCH_INDEX_TTL_SECONDS so other workers pick up changes.
+"""
+import asyncio
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .utils import db
+
+# Field -> weight of a token found in it
+SEARCH_FIELDS = {
+    "title": 3.0,
+    "title_te": 3.0,
+    "tags": 2.0,
+    "description": 1.0,
+    "description_te": 1.0
+}
+
+# A prefix match scores this fraction of a whole-token match
+PREFIX_MATCH_FACTOR = 0.5
+
+SEARCH_INDEX_TTL_SECONDS = 300
+
+# Sorts after every character a token can contain, closing a prefix range
+_PREFIX_END = "\U0010ffff"
+
+# Split on whitespace and ASCII punctuation only; \w would break Telugu words at vowel signs
+_TOKEN_RE = re.compile(r"[^\s!-/:-@\[-`{-~]+")
+
+def tokenize(text) -> List[str]:
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        return [token for item in text for token in tokenize(item)]
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class CourseSearchIndex:
+    """Inverted index with prefix lookup over a fixed set of courses"""
+
+    def __init__(self, courses: Iterable[dict]):
+        postings: Dict[str, Dict[int, float]] = {}
+        self.course_ids: List[str] = []
+        categories, featured, created = [], [], []
+
+        for course in courses:
+            doc = len(self.course_ids)
+            self.course_ids.append(course["id"])
+            categories.append(course.get("category"))
+            featured.append(bool(course.get("is_featured")))
+            created.append(course.get("created_at") or "")
+            for field, weight in SEARCH_FIELDS.items():
+                for token in set(tokenize(course.get(field))):
+                    posting = postings.setdefault(token, {})
+                    posting[doc] = posting.get(doc, 0) + weight
+
+        self.vocabulary = sorted(postings)
+        # Postings of vocabulary[i] are docs/weights[offsets[i]:offsets[i + 1]]
+        sizes = [len(postings[token]) for token in self.vocabulary]
+        self.offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.offsets[1:])
+        self.docs = np.fromiter(
+            (doc for token in self.vocabulary for doc in postings[token]), dtype=np.int32, count=int(self.offsets[-1])
+        )
+        self.weights = np.fromiter(
+            (w for token in self.vocabulary for w in postings[token].values()), dtype=np.float64, count=int(self.offsets[-1])
+        )
+
+        self.category_codes = {c: i for i, c in enumerate(dict.fromkeys(categories))}
+        self.categories = np.array([self.category_codes[c] for c in categories], dtype=np.int32)
+        self.featured = np.array(featured, dtype=bool)
+        # Position in created_at order, so ties rank newest first without comparing strings
+        self.recency = np.empty(len(created), dtype=np.int64)
+        self.recency[sorted(range(len(created)), key=created.__getitem__)] = np.arange(len(created))
+
+    def _match_token(self, token: str) -> np.ndarray:
+        """Best score of token per course: whole-token matches in full, other prefix matches reduced"""
+        lo = bisect_left(self.vocabulary, token)
+        hi = bisect_left(self.vocabulary, token + _PREFIX_END, lo)
+        scores = np.zeros(len(self.course_ids))
+        if lo == hi:
+            return scores
+        exact = self.vocabulary[lo] == token
+        start, split, stop = self.offsets[lo], self.offsets[lo + 1 if exact else lo], self.offsets[hi]
+        np.maximum.at(scores, self.docs[split:stop], self.weights[split:stop] * PREFIX_MATCH_FACTOR)
+        if exact:
+            np.maximum.at(scores, self.docs[start:split], self.weights[start:split])
+        return scores
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        featured: bool = False,
+        limit: int = 20,
+        skip: int = 0
+    ) -> Tuple[List[str], int]:
+        """Course ids matching every query token, best first, plus the total match count"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.course_ids:
+            return [], 0
+
+        scores = np.zeros(len(self.course_ids))
+        matched = np.ones(len(self.course_ids), dtype=bool)
+        for token in tokens:
+            token_scores = self._match_token(token)
+            matched &= token_scores > 0
+            if not matched.any():
+                return [], 0
+            scores += token_scores
+
+        if category:
+            code = self.category_codes.get(category)
+            if code is None:
+                return [], 0
+            matched &= self.categories == code
+        if featured:
+            matched &= self.featured
+
+        candidates = np.flatnonzero(matched)
+        total = len(candidates)
+        # Only the requested page needs ordering: best score first, newest first on ties
+        wanted = skip + limit
+        if wanted <= 0:
+            return [], total
+        if total > wanted:
+            cutoff = np.partition(scores[candidates], total - wanted)[total - wanted]
+            candidates = candidates[scores[candidates] >= cutoff]
+        order = np.lexsort((-self.recency[candidates], -scores[candidates]))
+        return [self.course_ids[i] for i in candidates[order[skip:wanted]]], total
+
+
+_search_index: Optional[CourseSearchIndex] = None
+_search_index_built_at: Optional[float] = None
+_search_index_generation = 0
+_search_index_lock = asyncio.Lock()
+
+def _search_index_fresh() -> bool:
+    return (
+        _search_index is not None
+        and _search_index_built_at is not None
+        and time.monotonic() - _search_index_built_at < SEARCH_INDEX_TTL_SECONDS
+    )
+
+def invalidate_course_search():
+    """Force a rebuild on the next search (call after any course change)"""
+    global _search_index_built_at, _search_index_generation
+    _search_index_built_at = None
+    _search_index_generation += 1
+
+async def get_course_search_index() -> CourseSearchIndex:
+    global _search_index, _search_index_built_at
+
+    if _search_index_fresh():
+        return _search_index
+
+    async with _search_index_lock:
+        if not _search_index_fresh():
+            generation = _search_index_generation
+            built_at = time.monotonic()
+            projection = {"_id": 0, "id": 1, "category": 1, "is_featured": 1, "created_at": 1}
+            projection.update({field: 1 for field in SEARCH_FIELDS})
+            courses = await db.courses.find({"is_published": True}, projection).to_list(None)
+            # Building takes long enough on a large catalogue to stall the event loop
+            _search_index = await asyncio.to_thread(CourseSearchIndex, courses)
+            # An invalidation that arrived mid-rebuild leaves the index stale
+            _search_index_built_at = built_at if generation == _search_index_generation else None
+    return _search_index
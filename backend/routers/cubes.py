@@ -0,0 +1,163 @@
+"""Colony data cubes - per (colony, day, metric) counters for heatmaps and manager dashboards
+
+Counters are bumped with $inc as issues, enrollments and fitness rollups are written, so
+any date range and colony subset is one indexed read. rebuild_colony_cubes() recomputes
+everything from the source collections for backfills.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+from pymongo import UpdateOne
+from .utils import db, now_iso
+
+CUBE_METRICS = ["steps", "active_users", "issues_reported", "issues_closed", "enrollments"]
+
+# Issue statuses that count as closing an issue
+CLOSED_ISSUE_STATUSES = {"closed", "resolved", "resolved_by_authority", "resolved_by_us"}
+
+async def ensure_cube_indexes():
+    await db.colony_cubes.create_index([("metric", 1), ("date", 1), ("colony", 1)], unique=True)
+
+    # The heatmap and manager trends read only the cubes: backfill from history the first time
+    if not await db.colony_cubes.find_one({}, {"_id": 1}):
+        for source in (db.issues, db.enrollments, db.fitness_daily):
+            if await source.find_one({}, {"_id": 1}):
+                await rebuild_colony_cubes()
+                break
+
+def today_str() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+async def get_user_colony(user_id: str) -> Optional[str]:
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "colony": 1})
+    return user.get("colony") if user else None
+
+async def bump_cube(colony: Optional[str], metric: str, delta=1, date: Optional[str] = None):
+    """Add delta to one (colony, day, metric) counter"""
+    if not colony or not delta:
+        return
+    await db.colony_cubes.update_one(
+        {"metric": metric, "date": date or today_str(), "colony": colony},
+        {"$inc": {"value": delta}, "$set": {"updated_at": now_iso()}},
+        upsert=True
+    )
+
+async def apply_fitness_day_to_cubes(user_id: str, date: str, previous: dict, summary: dict):
+    """Fold the change in a user's daily fitness rollup into their colony's counters"""
+    steps_delta = (summary.get("total_steps", 0) or 0) - (previous.get("total_steps", 0) or 0)
+    was_active = (previous.get("activity_count", 0) or 0) > 0
+    is_active = (summary.get("activity_count", 0) or 0) > 0
+    if not steps_delta and was_active == is_active:
+        return
+
+    colony = await get_user_colony(user_id)
+    if not colony:
+        return
+
+    ops = []
+    if steps_delta:
+        ops.append(UpdateOne(
+            {"metric": "steps", "date": date, "colony": colony},
+            {"$inc": {"value": steps_delta}, "$set": {"updated_at": now_iso()}},
+            upsert=True
+        ))
+    if was_active != is_active:
+        ops.append(UpdateOne(
+            {"metric": "active_users", "date": date, "colony": colony},
+            {"$inc": {"value": 1 if is_active else -1}, "$set": {"updated_at": now_iso()}},
+            upsert=True
+        ))
+    await db.colony_cubes.bulk_write(ops, ordered=False)
+
+async def query_colony_cubes(
+    start_date: str,
+    end_date: str,
+    colonies: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    colony_pattern: Optional[str] = None
+) -> List[dict]:
+    """Read cube cells for a date range, optionally restricted to colonies (or a
+    case-insensitive colony pattern) and metrics"""
+    query = {
+        "metric": {"$in": metrics or CUBE_METRICS},
+        "date": {"$gte": start_date, "$lte": end_date}
+    }
+    if colonies:
+        query["colony"] = {"$in": colonies}
+    elif colony_pattern:
+        query["colony"] = {"$regex": colony_pattern, "$options": "i"}
+
+    return await db.colony_cubes.find(
+        query, {"_id": 0, "metric": 1, "date": 1, "colony": 1, "value": 1}
+    ).to_list(None)
+
+def totals_by_colony(cells: List[dict]) -> dict:
+    """Sum cells into {colony: {metric: total}}"""
+    totals = {}
+    for cell in cells:
+        colony_totals = totals.setdefault(cell["colony"], {m: 0 for m in CUBE_METRICS})
+        colony_totals[cell["metric"]] += cell["value"]
+    return totals
+
+async def rebuild_colony_cubes() -> int:
+    """Recompute every cube cell from the source collections"""
+    user_colony = {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "id", "as": "u"}}
+    colony_field = {"$arrayElemAt": ["$u.colony", 0]}
+
+    pipelines = {
+        "issues": [
+            {"$match": {"reporter_colony": {"$ne": None}}},
+            {"$facet": {
+                "issues_reported": [
+                    {"$group": {"_id": {"colony": "$reporter_colony", "date": {"$substr": ["$created_at", 0, 10]}}, "value": {"$sum": 1}}}
+                ],
+                "issues_closed": [
+                    {"$match": {"status": {"$in": list(CLOSED_ISSUE_STATUSES)}}},
+                    {"$group": {"_id": {"colony": "$reporter_colony", "date": {"$substr": [{"$ifNull": ["$updated_at", "$created_at"]}, 0, 10]}}, "value": {"$sum": 1}}}
+                ]
+            }}
+        ],
+        "enrollments": [
+            user_colony,
+            {"$group": {"_id": {"colony": colony_field, "date": {"$substr": ["$enrolled_at", 0, 10]}}, "value": {"$sum": 1}}}
+        ],
+        "fitness_daily": [
+            user_colony,
+            {"$group": {
+                "_id": {"colony": colony_field, "date": "$date"},
+                "steps": {"$sum": "$total_steps"},
+                "active_users": {"$sum": {"$cond": [{"$gt": ["$activity_count", 0]}, 1, 0]}}
+            }}
+        ]
+    }
+
+    cells = {}
+
+    def add(metric: str, key: dict, value):
+        if key.get("colony") and key.get("date"):
+            cells[(metric, key["date"], key["colony"])] = value
+
+    issues = await db.issues.aggregate(pipelines["issues"]).to_list(1)
+    for metric in ["issues_reported", "issues_closed"]:
+        for row in issues[0][metric] if issues else []:
+            add(metric, row["_id"], row["value"])
+
+    async for row in db.enrollments.aggregate(pipelines["enrollments"]):
+        add("enrollments", row["_id"], row["value"])
+
+    async for row in db.fitness_daily.aggregate(pipelines["fitness_daily"]):
+        add("steps", row["_id"], row["steps"])
+        add("active_users", row["_id"], row["active_users"])
+
+    # Overwrite every recomputed cell, then drop cells that no longer have source data
+    rebuilt_at = now_iso()
+    if cells:
+        await db.colony_cubes.bulk_write([
+            UpdateOne(
+                {"metric": metric, "date": date, "colony": colony},
+                {"$set": {"value": value, "updated_at": rebuilt_at}},
+                upsert=True
+            )
+            for (metric, date, colony), value in cells.items()
+        ], ordered=False)
+    await db.colony_cubes.delete_many({"updated_at": {"$lt": rebuilt_at}})
+    return len(cells)
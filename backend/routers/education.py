@@ -1,9 +1,17 @@
 """AIT Education Router - Comprehensive EdTech platform (Byju's style)"""
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
-from .utils import db, generate_id, now_iso, get_current_user
+import asyncio
+import gzip
+import json
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from .utils import db, generate_id, now_iso, get_current_user, cancel_task
+from .cubes import bump_cube, get_user_colony, rebuild_colony_cubes
+from .course_search import get_course_search_index, invalidate_course_search
+from .certificate_render import render_share_assets, rerender_all_certificates
 import logging
 
 router = APIRouter(prefix="/education", tags=["AIT Education"])
@@ -155,6 +163,9 @@ class QuizSubmission(BaseModel):
     quiz_id: str
     answers: List[dict]  # [{question_id, selected_option}]
 
+class BulkQuizSubmission(BaseModel):
+    submissions: List[dict]  # [{user_id, answers: [{question_id, selected_option}]}]
+
 class ReviewCreate(BaseModel):
     course_id: str
     rating: int  # 1-5 stars
@@ -185,6 +196,15 @@ class ProgressUpdate(BaseModel):
     completed: bool = True
     watch_time_seconds: int = 0
 
+class WatchTimeBeat(BaseModel):
+    course_id: str
+    lesson_id: str
+    watch_time_seconds: int
+    position_seconds: Optional[int] = None
+
+class HeartbeatBatch(BaseModel):
+    beats: List[WatchTimeBeat]
+
 class ScholarshipApplication(BaseModel):
     course_id: str
     course_title: str
@@ -199,21 +219,641 @@ class ScholarshipApplication(BaseModel):
 
 # ============== HELPER FUNCTIONS ==============
 
-def calculate_course_progress(enrollments: list, lessons: list) -> dict:
-    """Calculate overall course progress"""
-    if not lessons:
+def calculate_course_progress(enrollment: dict, total_lessons: int) -> dict:
+    """Calculate overall course progress from the enrollment's completed-lesson counter"""
+    if not total_lessons:
         return {"completed": 0, "total": 0, "percentage": 0}
     
-    completed = len([lesson for lesson in lessons if any(
-        e.get("lesson_id") == lesson.get("id") and e.get("completed") 
-        for e in enrollments
-    )])
+    completed = min(enrollment.get("completed_count", 0), total_lessons)
     
     return {
         "completed": completed,
-        "total": len(lessons),
-        "percentage": round((completed / len(lessons)) * 100)
+        "total": total_lessons,
+        "percentage": round((completed / total_lessons) * 100)
+    }
+
+# ============== ENROLLMENT PROGRESS ==============
+# Each enrollment keeps completed_lessons (a set of lesson ids) and completed_count;
+# each course keeps total_lessons, adjusted by the lesson create/delete handlers.
+
+async def get_course_total_lessons(course_id: str) -> int:
+    course = await db.courses.find_one({"id": course_id}, {"_id": 0, "total_lessons": 1})
+    if course is None:
+        return 0
+    if "total_lessons" not in course:
+        course["total_lessons"] = await db.lessons.count_documents({"course_id": course_id})
+        await db.courses.update_one({"id": course_id}, {"$set": {"total_lessons": course["total_lessons"]}})
+    return course["total_lessons"]
+
+async def record_lesson_completion(user: dict, course_id: str, lesson_id: str) -> bool:
+    """Add a lesson to the enrollment's completed set; completes the course when all are done"""
+    enrollment = await db.enrollments.find_one_and_update(
+        {"course_id": course_id, "user_id": user["id"], "completed_lessons": {"$ne": lesson_id}},
+        {
+            "$addToSet": {"completed_lessons": lesson_id},
+            "$inc": {"completed_count": 1},
+            "$set": {"last_accessed": now_iso()}
+        },
+        projection={"_id": 0, "completed_count": 1, "status": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    # Not enrolled, or this lesson was already counted
+    if not enrollment:
+        return False
+    
+    if enrollment.get("status") != "completed":
+        total_lessons = await get_course_total_lessons(course_id)
+        if enrollment["completed_count"] >= total_lessons:
+            # Award completion badge/certificate
+            await mark_enrollment_completed(user["id"], course_id, user.get("name"))
+    return True
+
+async def remove_lesson_from_course(lesson: dict):
+    """Adjust counters after a lesson is deleted"""
+    _bundle_cache.pop(lesson.get("course_id"), None)
+    ops = [
+        db.courses.update_one({"id": lesson.get("course_id")}, {"$inc": {"total_lessons": -1, "content_version": 1}}),
+        db.enrollments.update_many(
+            {"course_id": lesson.get("course_id"), "completed_lessons": lesson["id"]},
+            {"$pull": {"completed_lessons": lesson["id"]}, "$inc": {"completed_count": -1}}
+        )
+    ]
+    if lesson.get("subject_id"):
+        ops.append(db.subjects.update_one({"id": lesson["subject_id"]}, {"$inc": {"lesson_count": -1}}))
+    await asyncio.gather(*ops)
+
+# ============== WATCH-TIME HEARTBEATS ==============
+# Video players report watch time every few seconds. Deltas are summed in memory per
+# (user, lesson) and written as one $inc upsert per key every WATCH_TIME_FLUSH_SECONDS.
+
+WATCH_TIME_FLUSH_SECONDS = 60
+
+# A single beat can't claim more watch time than this
+MAX_BEAT_SECONDS = 300
+
+MAX_BEATS_PER_REQUEST = 100
+
+_watch_time_buffer = {}
+
+def lesson_progress_update(user_id: str, course_id: str, lesson_id: str, watch_time_seconds: int = 0,
+                           completed: bool = False, position_seconds: Optional[int] = None) -> tuple:
+    """Filter and upsert update for a lesson_progress row"""
+    now = now_iso()
+    on_insert = {
+        "id": generate_id(),
+        "user_id": user_id,
+        "course_id": course_id,
+        "lesson_id": lesson_id,
+        "created_at": now
     }
+    update = {"$inc": {"watch_time_seconds": watch_time_seconds}, "$set": {"updated_at": now}}
+    if completed:
+        update["$set"].update(completed=True, completed_at=now)
+    else:
+        on_insert.update(completed=False, completed_at=None)
+    if position_seconds is not None:
+        update["$set"]["position_seconds"] = position_seconds
+    update["$setOnInsert"] = on_insert
+    return {"user_id": user_id, "lesson_id": lesson_id}, update
+
+def buffer_watch_time(user_id: str, beat: WatchTimeBeat):
+    seconds = max(0, min(beat.watch_time_seconds, MAX_BEAT_SECONDS))
+    entry = _watch_time_buffer.setdefault((user_id, beat.lesson_id), {"course_id": beat.course_id, "seconds": 0})
+    entry["seconds"] += seconds
+    if beat.position_seconds is not None:
+        entry["position_seconds"] = beat.position_seconds
+
+async def flush_watch_time() -> int:
+    """Write buffered watch time to lesson_progress"""
+    global _watch_time_buffer
+    if not _watch_time_buffer:
+        return 0
+    
+    pending, _watch_time_buffer = _watch_time_buffer, {}
+    keys = list(pending)
+    ops = [
+        UpdateOne(*lesson_progress_update(
+            user_id, pending[(user_id, lesson_id)]["course_id"], lesson_id, pending[(user_id, lesson_id)]["seconds"],
+            position_seconds=pending[(user_id, lesson_id)].get("position_seconds")
+        ), upsert=True)
+        for user_id, lesson_id in keys
+    ]
+    try:
+        await db.lesson_progress.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # Unordered: everything but the listed ops was applied, so only those are retried
+        rebuffer_watch_time({keys[error["index"]]: pending[keys[error["index"]]] for error in e.details.get("writeErrors", [])})
+        raise
+    except Exception:
+        rebuffer_watch_time(pending)
+        raise
+    return len(ops)
+
+def rebuffer_watch_time(entries: dict):
+    """Put unwritten deltas back so the next flush retries them"""
+    for key, entry in entries.items():
+        current = _watch_time_buffer.setdefault(key, {"course_id": entry["course_id"], "seconds": 0})
+        current["seconds"] += entry["seconds"]
+        if "position_seconds" in entry:
+            current.setdefault("position_seconds", entry["position_seconds"])
+
+async def watch_time_flush_loop():
+    while True:
+        await asyncio.sleep(WATCH_TIME_FLUSH_SECONDS)
+        flush = asyncio.ensure_future(flush_watch_time())
+        try:
+            await asyncio.shield(flush)
+        except asyncio.CancelledError:
+            # Cancelled at shutdown: let a write already in flight land before the final flush
+            await asyncio.gather(flush, return_exceptions=True)
+            raise
+        except Exception as e:
+            logging.error(f"Watch time flush error: {e}")
+
+async def dedupe_lesson_progress() -> int:
+    """Merge lesson_progress rows that racing upserts created for the same (user, lesson)"""
+    merged = 0
+    async for group in db.lesson_progress.aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": {"user_id": "$user_id", "lesson_id": "$lesson_id"}, "rows": {"$push": "$$ROOT"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True):
+        keep, *extra = group["rows"]
+        rows = group["rows"]
+        completed_at = sorted(r["completed_at"] for r in rows if r.get("completed") and r.get("completed_at"))
+        latest = max(rows, key=lambda r: r.get("updated_at") or "")
+        update = {
+            "watch_time_seconds": sum(r.get("watch_time_seconds", 0) or 0 for r in rows),
+            "completed": any(r.get("completed") for r in rows),
+            "completed_at": completed_at[0] if completed_at else None
+        }
+        if latest.get("position_seconds") is not None:
+            update["position_seconds"] = latest["position_seconds"]
+        await db.lesson_progress.update_one({"_id": keep["_id"]}, {"$set": update})
+        await db.lesson_progress.delete_many({"_id": {"$in": [r["_id"] for r in extra]}})
+        merged += len(extra)
+    return merged
+
+async def ensure_unique_index(collection, keys: list, dedupe) -> None:
+    """Create a unique index, first replacing an older non-unique one and merging its duplicates"""
+    try:
+        await collection.create_index(keys, unique=True)
+        return
+    except OperationFailure:
+        pass
+    await dedupe()
+    try:
+        await collection.drop_index(keys)
+    except OperationFailure:
+        pass
+    await collection.create_index(keys, unique=True)
+
+_watch_time_flush_task = None
+
+@router.on_event("startup")
+async def start_watch_time_flush():
+    global _watch_time_flush_task
+    await ensure_unique_index(db.lesson_progress, [("user_id", 1), ("lesson_id", 1)], dedupe_lesson_progress)
+    _watch_time_flush_task = asyncio.create_task(watch_time_flush_loop())
+
+@router.on_event("shutdown")
+async def flush_watch_time_on_shutdown():
+    # Stop the loop first so its flush can't run alongside the final one
+    await cancel_task(_watch_time_flush_task)
+    await flush_watch_time()
+
+async def rebuild_enrollment_progress(only_missing: bool = False) -> int:
+    """Recompute completed_lessons/completed_count on enrollments from lesson_progress"""
+    query = {"completed_count": {"$exists": False}} if only_missing else {}
+    
+    completed = {}
+    async for row in db.lesson_progress.aggregate([
+        {"$match": {"completed": True}},
+        {"$group": {"_id": {"user_id": "$user_id", "course_id": "$course_id"}, "lessons": {"$addToSet": "$lesson_id"}}}
+    ]):
+        completed[(row["_id"]["user_id"], row["_id"]["course_id"])] = row["lessons"]
+    
+    ops = []
+    async for enrollment in db.enrollments.find(query, {"_id": 0, "id": 1, "user_id": 1, "course_id": 1}):
+        lessons = completed.get((enrollment["user_id"], enrollment["course_id"]), [])
+        ops.append(UpdateOne(
+            {"id": enrollment["id"]},
+            {"$set": {"completed_lessons": lessons, "completed_count": len(lessons)}}
+        ))
+    
+    if ops:
+        await db.enrollments.bulk_write(ops, ordered=False)
+    return len(ops)
+
+# ============== COURSE COUNTERS ==============
+# enrollment_count, completion_count and the rating aggregates (review_count,
+# rating_sum, rating_breakdown, average_rating) live on the course document and are
+# maintained by the enrollment, completion and review paths.
+# reconcile_course_counters() recomputes them from the source collections.
+
+COURSE_COUNTER_DEFAULTS = {
+    "total_lessons": 0,
+    "enrollment_count": 0,
+    "completion_count": 0,
+    "average_rating": 0,
+    "review_count": 0,
+    "rating_sum": 0,
+    "rating_breakdown": {str(star): 0 for star in range(1, 6)}
+}
+
+async def dedupe_enrollments() -> int:
+    """Merge enrollments that racing enrolls created for the same (course, user)"""
+    merged = 0
+    async for group in db.enrollments.aggregate([
+        {"$sort": {"enrolled_at": 1}},
+        {"$group": {"_id": {"course_id": "$course_id", "user_id": "$user_id"}, "rows": {"$push": "$$ROOT"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True):
+        keep, *extra = group["rows"]
+        rows = group["rows"]
+        lessons = list(dict.fromkeys(lesson for r in rows for lesson in r.get("completed_lessons") or []))
+        completed_at = sorted(r["completed_at"] for r in rows if r.get("status") == "completed" and r.get("completed_at"))
+        update = {"completed_lessons": lessons, "completed_count": len(lessons)}
+        if completed_at:
+            update.update(status="completed", completed_at=completed_at[0])
+        await db.enrollments.update_one({"_id": keep["_id"]}, {"$set": update})
+        await db.enrollments.delete_many({"_id": {"$in": [r["_id"] for r in extra]}})
+        merged += len(extra)
+    
+    # The duplicates were counted on their courses, learners and colony cubes
+    if merged:
+        await reconcile_course_counters()
+        await rebuild_learning_xp()
+        await rebuild_colony_cubes()
+    return merged
+
+async def dedupe_course_reviews() -> int:
+    """Merge reviews that racing submits created for the same (course, user)"""
+    merged = 0
+    async for group in db.course_reviews.aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": {"course_id": "$course_id", "user_id": "$user_id"}, "rows": {"$push": "$$ROOT"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True):
+        keep, *extra = group["rows"]
+        # The earliest review keeps its id; its content comes from the latest edit
+        latest = max(group["rows"], key=lambda r: r.get("updated_at") or r.get("created_at") or "")
+        extra_ids = [r["id"] for r in extra]
+        await db.review_helpful.update_many({"review_id": {"$in": extra_ids}}, {"$set": {"review_id": keep["id"]}})
+        helpful = await db.review_helpful.count_documents({"review_id": keep["id"]})
+        await db.course_reviews.update_one({"_id": keep["_id"]}, {"$set": {
+            "rating": latest.get("rating"),
+            "review_text": latest.get("review_text"),
+            "review_text_te": latest.get("review_text_te"),
+            "updated_at": latest.get("updated_at"),
+            "helpful_count": helpful
+        }})
+        await db.course_reviews.delete_many({"_id": {"$in": [r["_id"] for r in extra]}})
+        merged += len(extra)
+    
+    # The duplicates were counted in their courses' rating aggregates
+    if merged:
+        await reconcile_course_counters()
+    return merged
+
+@router.on_event("startup")
+async def ensure_education_indexes():
+    await ensure_unique_index(db.enrollments, [("course_id", 1), ("user_id", 1)], dedupe_enrollments)
+    await db.course_reviews.create_index([("course_id", 1), ("created_at", -1)])
+    await ensure_unique_index(db.course_reviews, [("course_id", 1), ("user_id", 1)], dedupe_course_reviews)
+    await ensure_learning_xp_indexes()
+    await ensure_quiz_stats_indexes()
+    await backfill_review_author_names()
+    
+    # Backfill counters for courses and enrollments created before they were tracked
+    missing_counters = [{field: {"$exists": False}} for field in COURSE_COUNTER_DEFAULTS]
+    if await db.courses.find_one({"$or": missing_counters}, {"_id": 1}):
+        await reconcile_course_counters()
+    await rebuild_enrollment_progress(only_missing=True)
+
+async def create_enrollment(user_id: str, course_id: str, colony: Optional[str] = None, **fields) -> tuple:
+    """Insert an enrollment unless one exists. Returns (enrollment, created).
+    colony is the learner's colony when the caller has it; otherwise it is looked up."""
+    new_enrollment = {
+        "id": generate_id(),
+        "user_id": user_id,
+        "course_id": course_id,
+        "enrolled_at": now_iso(),
+        "status": "active",
+        "completed_at": None,
+        "completed_lessons": [],
+        "completed_count": 0,
+        **fields
+    }
+    
+    try:
+        enrollment = await db.enrollments.find_one_and_update(
+            {"course_id": course_id, "user_id": user_id},
+            {"$setOnInsert": new_enrollment},
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # A concurrent enroll won the upsert race
+        enrollment = await db.enrollments.find_one({"course_id": course_id, "user_id": user_id}, {"_id": 0})
+    if enrollment:
+        return enrollment, False
+    
+    await asyncio.gather(
+        db.courses.update_one({"id": course_id}, {"$inc": {"enrollment_count": 1}}),
+        bump_learning_xp(user_id, courses_enrolled=1),
+        bump_cube(colony or await get_user_colony(user_id), "enrollments")
+    )
+    return new_enrollment, True
+
+async def mark_enrollment_completed(user_id: str, course_id: str, user_name: Optional[str] = None) -> bool:
+    """Mark an enrollment completed, counting it once on the course and the learner's XP"""
+    result = await db.enrollments.update_one(
+        {"course_id": course_id, "user_id": user_id, "status": {"$ne": "completed"}},
+        {"$set": {"completed_at": now_iso(), "status": "completed"}}
+    )
+    if result.modified_count == 0:
+        return False
+    
+    await asyncio.gather(
+        db.courses.update_one({"id": course_id}, {"$inc": {"completion_count": 1}}),
+        bump_learning_xp(user_id, user_name, courses_completed=1)
+    )
+    return True
+
+async def apply_rating_change(course_id: str, old_rating: Optional[int] = None, new_rating: Optional[int] = None):
+    """Move one review between rating buckets (None = no review) and recompute the average, atomically"""
+    deltas = {}
+    if old_rating:
+        deltas[f"rating_breakdown.{old_rating}"] = -1
+    if new_rating:
+        deltas[f"rating_breakdown.{new_rating}"] = deltas.get(f"rating_breakdown.{new_rating}", 0) + 1
+    deltas["review_count"] = (1 if new_rating else 0) - (1 if old_rating else 0)
+    deltas["rating_sum"] = (new_rating or 0) - (old_rating or 0)
+    
+    await db.courses.update_one({"id": course_id}, [
+        {"$set": {field: {"$add": [{"$ifNull": [f"${field}", 0]}, delta]} for field, delta in deltas.items()}},
+        {"$set": {"average_rating": {"$cond": [
+            {"$gt": ["$review_count", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$review_count"]}, 1]},
+            0
+        ]}}}
+    ])
+
+async def backfill_review_author_names():
+    """Store reviewer names on reviews written before names were denormalized"""
+    user_ids = await db.course_reviews.distinct("user_id", {"user_name": {"$exists": False}})
+    if not user_ids:
+        return
+    users = await db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    names = {u["id"]: u.get("name") or "Student" for u in users}
+    await db.course_reviews.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "user_name": {"$exists": False}},
+            {"$set": {"user_name": names.get(user_id, "Student")}}
+        )
+        for user_id in user_ids
+    ], ordered=False)
+
+async def reconcile_course_counters() -> int:
+    """Recompute every course's counters from lessons, enrollments and reviews"""
+    counters = {}
+    async for course in db.courses.find({}, {"_id": 0, "id": 1}):
+        counters[course["id"]] = dict(COURSE_COUNTER_DEFAULTS)
+    
+    async for row in db.lessons.aggregate([{"$group": {"_id": "$course_id", "count": {"$sum": 1}}}]):
+        if row["_id"] in counters:
+            counters[row["_id"]]["total_lessons"] = row["count"]
+    
+    async for row in db.enrollments.aggregate([
+        {"$group": {
+            "_id": "$course_id",
+            "enrollments": {"$sum": 1},
+            "completions": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+        }}
+    ]):
+        if row["_id"] in counters:
+            counters[row["_id"]]["enrollment_count"] = row["enrollments"]
+            counters[row["_id"]]["completion_count"] = row["completions"]
+    
+    for values in counters.values():
+        values["rating_breakdown"] = dict(values["rating_breakdown"])
+    
+    async for row in db.course_reviews.aggregate([
+        {"$group": {"_id": {"course_id": "$course_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]):
+        values = counters.get(row["_id"]["course_id"])
+        rating = row["_id"]["rating"]
+        if values is None or rating not in range(1, 6):
+            continue
+        values["rating_breakdown"][str(rating)] = row["count"]
+        values["review_count"] += row["count"]
+        values["rating_sum"] += rating * row["count"]
+    
+    for values in counters.values():
+        if values["review_count"]:
+            values["average_rating"] = round(values["rating_sum"] / values["review_count"], 1)
+    
+    if counters:
+        await db.courses.bulk_write([
+            UpdateOne({"id": course_id}, {"$set": values})
+            for course_id, values in counters.items()
+        ], ordered=False)
+    
+    return len(counters)
+
+@router.post("/admin/reconcile-counters")
+async def reconcile_counters(user: dict = Depends(get_current_user)):
+    """Recompute course counters and learner XP (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    courses, learners, enrollments = await asyncio.gather(
+        reconcile_course_counters(), rebuild_learning_xp(), rebuild_enrollment_progress()
+    )
+    return {"success": True, "courses": courses, "learners": learners, "enrollments": enrollments}
+
+# ============== LEARNING XP ==============
+# One learning_xp document per user, bumped with $inc as courses are completed,
+# quizzes passed and certificates issued. Rank is a count of higher XP values.
+
+XP_RULES = {
+    "courses_completed": 100,
+    "quizzes_passed": 20,
+    "certificates": 50
+}
+
+XP_COUNTERS = ["courses_enrolled", "courses_completed", "quizzes_taken", "quizzes_passed", "quiz_score_sum", "certificates"]
+
+XP_PER_LEVEL = 200
+
+def xp_badge(xp: int) -> str:
+    if xp >= 1000:
+        return "Expert"
+    if xp >= 500:
+        return "Advanced"
+    if xp >= 200:
+        return "Intermediate"
+    return "Beginner"
+
+def xp_for(counters: dict) -> int:
+    return sum(counters.get(field, 0) * points for field, points in XP_RULES.items())
+
+async def ensure_learning_xp_indexes():
+    await db.learning_xp.create_index("user_id", unique=True)
+    await db.learning_xp.create_index([("xp", -1)])
+    
+    # Backfill from history the first time
+    if not await db.learning_xp.find_one({}, {"_id": 1}) and await db.enrollments.find_one({}, {"_id": 1}):
+        await rebuild_learning_xp()
+
+async def bump_learning_xp(user_id: str, user_name: Optional[str] = None, **deltas):
+    """Add to a learner's counters (see XP_COUNTERS) and XP"""
+    update = {
+        "$inc": {**deltas, "xp": xp_for(deltas)},
+        "$set": {"updated_at": now_iso()}
+    }
+    if user_name:
+        update["$set"]["user_name"] = user_name
+    await db.learning_xp.update_one({"user_id": user_id}, update, upsert=True)
+
+async def get_learning_xp(user_id: str) -> dict:
+    doc = await db.learning_xp.find_one({"user_id": user_id}, {"_id": 0}) or {}
+    return {"xp": 0, **{field: 0 for field in XP_COUNTERS}, **doc}
+
+async def get_xp_rank(xp: int) -> int:
+    return await db.learning_xp.count_documents({"xp": {"$gt": xp}}) + 1
+
+async def rebuild_learning_xp() -> int:
+    """Recompute every learner's XP document from enrollments, quiz attempts and certificates"""
+    learners = {}
+    
+    def counters(user_id):
+        return learners.setdefault(user_id, {field: 0 for field in XP_COUNTERS})
+    
+    async for row in db.enrollments.aggregate([
+        {"$group": {
+            "_id": "$user_id",
+            "enrolled": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+        }}
+    ]):
+        counters(row["_id"]).update(courses_enrolled=row["enrolled"], courses_completed=row["completed"])
+    
+    async for row in db.quiz_attempts.aggregate([
+        {"$group": {
+            "_id": "$user_id",
+            "taken": {"$sum": 1},
+            "passed": {"$sum": {"$cond": ["$passed", 1, 0]}},
+            "score_sum": {"$sum": "$score"}
+        }}
+    ]):
+        counters(row["_id"]).update(quizzes_taken=row["taken"], quizzes_passed=row["passed"], quiz_score_sum=row["score_sum"])
+    
+    async for row in db.certificates.aggregate([{"$group": {"_id": "$user_id", "count": {"$sum": 1}}}]):
+        counters(row["_id"])["certificates"] = row["count"]
+    
+    names = {
+        u["id"]: u.get("name") async for u in db.users.find(
+            {"id": {"$in": list(learners)}}, {"_id": 0, "id": 1, "name": 1}
+        )
+    }
+    
+    if learners:
+        await db.learning_xp.bulk_write([
+            UpdateOne(
+                {"user_id": user_id},
+                {"$set": {**values, "xp": xp_for(values), "user_name": names.get(user_id), "updated_at": now_iso()}},
+                upsert=True
+            )
+            for user_id, values in learners.items()
+        ], ordered=False)
+    
+    return len(learners)
+
+# ============== COURSE BUNDLES ==============
+# GET /courses/{id}/bundle returns the whole course tree as one gzipped JSON payload.
+# Every course/subject/lesson/quiz mutation bumps content_version on the course,
+# which is the bundle's ETag, so clients revalidate with a single indexed read.
+
+BUNDLE_CACHE_MAX_COURSES = 200
+
+# Course fields that change without a content change and are left out of bundles
+BUNDLE_EXCLUDED_FIELDS = [
+    "enrollment_count", "completion_count", "average_rating", "review_count", "rating_sum", "rating_breakdown"
+]
+
+_bundle_cache = {}
+
+async def bump_course_version(course_id: Optional[str]):
+    """Mark a course's content as changed"""
+    if not course_id:
+        return
+    _bundle_cache.pop(course_id, None)
+    await db.courses.update_one({"id": course_id}, {"$inc": {"content_version": 1}})
+
+def bundle_etag(course_id: str, version: int) -> str:
+    # Weak: the same version is served gzipped or plain
+    return f'W/"{course_id}-{version}"'
+
+async def build_course_bundle(course: dict) -> dict:
+    course_id = course["id"]
+    version = course.get("content_version", 0)
+    
+    subjects, lessons, quizzes = await asyncio.gather(
+        db.subjects.find({"course_id": course_id}, {"_id": 0}).sort("order_index", 1).to_list(None),
+        db.lessons.find({"course_id": course_id}, {"_id": 0}).sort("order_index", 1).to_list(None),
+        db.quizzes.find({"course_id": course_id}, {"_id": 0, "questions": 0}).to_list(None)
+    )
+    
+    lessons_by_subject = {}
+    for lesson in lessons:
+        lessons_by_subject.setdefault(lesson.get("subject_id"), []).append(lesson)
+    for subject in subjects:
+        subject["lessons"] = lessons_by_subject.pop(subject["id"], [])
+    
+    payload = {
+        "version": version,
+        "course": course,
+        "subjects": subjects,
+        # Lessons not attached to a subject (or to a deleted one)
+        "lessons": [lesson for group in lessons_by_subject.values() for lesson in group],
+        "quizzes": quizzes
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    
+    entry = {"version": version, "etag": bundle_etag(course_id, version), "body": gzip.compress(raw)}
+    if len(_bundle_cache) >= BUNDLE_CACHE_MAX_COURSES:
+        _bundle_cache.pop(next(iter(_bundle_cache)))
+    _bundle_cache[course_id] = entry
+    return entry
+
+@router.get("/courses/{course_id}/bundle")
+async def get_course_bundle(course_id: str, request: Request, user: dict = Depends(get_current_user)):
+    """Get the full course tree (subjects, lessons, quiz metadata) for offline use"""
+    course = await db.courses.find_one(
+        {"id": course_id},
+        {"_id": 0, **{field: 0 for field in BUNDLE_EXCLUDED_FIELDS}}
+    )
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    version = course.get("content_version", 0)
+    etag = bundle_etag(course_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    entry = _bundle_cache.get(course_id)
+    if entry is None or entry["version"] != version:
+        entry = await build_course_bundle(course)
+    
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(content=entry["body"], media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=gzip.decompress(entry["body"]), media_type="application/json", headers=headers)
 
 # ============== COURSE ROUTES ==============
 
@@ -226,27 +866,24 @@ async def get_courses(
     skip: int = 0
 ):
     """Get all courses with optional filtering"""
+    if search:
+        # Ranked by relevance from the in-process search index
+        index = await get_course_search_index()
+        course_ids, total = index.search(search, category=category, featured=featured, limit=limit, skip=skip)
+        found = await db.courses.find({"id": {"$in": course_ids}, "is_published": True}, {"_id": 0}).to_list(len(course_ids))
+        by_id = {course["id"]: course for course in found}
+        return {"courses": [by_id[cid] for cid in course_ids if cid in by_id], "total": total}
+    
     query = {"is_published": True}
     
     if category:
         query["category"] = category
     if featured:
         query["is_featured"] = True
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$in": [search]}}
-        ]
     
     courses = await db.courses.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     total = await db.courses.count_documents(query)
     
-    # Get enrollment counts
-    for course in courses:
-        enrollment_count = await db.enrollments.count_documents({"course_id": course["id"]})
-        course["enrollment_count"] = enrollment_count
-    
     return {"courses": courses, "total": total}
 
 @router.get("/courses/categories")
@@ -285,11 +922,7 @@ async def get_course(course_id: str, user: dict = Depends(get_current_user)):
     # Get progress if enrolled
     progress = None
     if enrollment:
-        progress_records = await db.lesson_progress.find({
-            "course_id": course_id,
-            "user_id": user["id"]
-        }, {"_id": 0}).to_list(100)
-        progress = calculate_course_progress(progress_records, lessons)
+        progress = calculate_course_progress(enrollment, len(lessons))
     
     # Get quizzes
     quizzes = await db.quizzes.find(
@@ -318,12 +951,14 @@ async def create_course(course_data: CourseCreate, user: dict = Depends(get_curr
         "instructor_id": course_data.instructor_id or user["id"],
         "instructor_name": course_data.instructor_name or user.get("name", "Instructor"),
         "is_published": False,
+        **COURSE_COUNTER_DEFAULTS,
         "created_at": now_iso(),
         "updated_at": now_iso()
     }
     
     await db.courses.insert_one(new_course)
     new_course.pop("_id", None)
+    invalidate_course_search()
     
     return {"success": True, "course": new_course}
 
@@ -337,6 +972,8 @@ async def update_course(course_id: str, updates: dict, user: dict = Depends(get_
     updates.pop("id", None)
     updates.pop("_id", None)
     updates.pop("created_at", None)
+    for field in [*COURSE_COUNTER_DEFAULTS, "content_version"]:
+        updates.pop(field, None)
     updates["updated_at"] = now_iso()
     
     result = await db.courses.update_one(
@@ -346,6 +983,8 @@ async def update_course(course_id: str, updates: dict, user: dict = Depends(get_
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
+    invalidate_course_search()
+    await bump_course_version(course_id)
     
     updated_course = await db.courses.find_one({"id": course_id}, {"_id": 0})
     return {"success": True, "course": updated_course}
@@ -363,6 +1002,8 @@ async def publish_course(course_id: str, user: dict = Depends(get_current_user))
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
+    invalidate_course_search()
+    await bump_course_version(course_id)
     
     return {"success": True, "message": "Course published"}
 
@@ -392,6 +1033,7 @@ async def create_subject(subject_data: SubjectCreate, user: dict = Depends(get_c
     
     await db.subjects.insert_one(new_subject)
     new_subject.pop("_id", None)
+    await bump_course_version(subject_data.course_id)
     
     return {"success": True, "subject": new_subject}
 
@@ -411,6 +1053,7 @@ async def update_subject(subject_id: str, updates: dict, user: dict = Depends(ge
         raise HTTPException(status_code=404, detail="Subject not found")
     
     updated = await db.subjects.find_one({"id": subject_id}, {"_id": 0})
+    await bump_course_version(updated.get("course_id"))
     return {"success": True, "subject": updated}
 
 @router.delete("/subjects/{subject_id}")
@@ -419,14 +1062,18 @@ async def delete_subject(subject_id: str, user: dict = Depends(get_current_user)
     if user.get("role") not in ["admin", "instructor", "manager"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    # Delete associated lessons
-    await db.lessons.delete_many({"subject_id": subject_id})
     # Delete subject
-    result = await db.subjects.delete_one({"id": subject_id})
+    subject = await db.subjects.find_one_and_delete({"id": subject_id})
     
-    if result.deleted_count == 0:
+    if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
+    # Delete associated lessons, keeping course lesson counts and enrollment progress in step
+    lessons = await db.lessons.find({"subject_id": subject_id}, {"_id": 0, "id": 1, "course_id": 1}).to_list(None)
+    await db.lessons.delete_many({"subject_id": subject_id})
+    await asyncio.gather(*[remove_lesson_from_course(lesson) for lesson in lessons])
+    await bump_course_version(subject.get("course_id"))
+    
     return {"success": True, "message": "Subject deleted"}
 
 # ============== LESSON ROUTES ==============
@@ -455,7 +1102,9 @@ async def create_lesson(lesson_data: LessonCreate, user: dict = Depends(get_curr
     await db.lessons.insert_one(new_lesson)
     new_lesson.pop("_id", None)
     
-    # Update lesson count in subject
+    # Update lesson count in course and subject
+    await db.courses.update_one({"id": lesson_data.course_id}, {"$inc": {"total_lessons": 1, "content_version": 1}})
+    _bundle_cache.pop(lesson_data.course_id, None)
     if lesson_data.subject_id:
         await db.subjects.update_one(
             {"id": lesson_data.subject_id},
@@ -480,6 +1129,7 @@ async def update_lesson(lesson_id: str, updates: dict, user: dict = Depends(get_
         raise HTTPException(status_code=404, detail="Lesson not found")
     
     updated = await db.lessons.find_one({"id": lesson_id}, {"_id": 0})
+    await bump_course_version(updated.get("course_id"))
     return {"success": True, "lesson": updated}
 
 @router.delete("/lessons/{lesson_id}")
@@ -488,19 +1138,12 @@ async def delete_lesson(lesson_id: str, user: dict = Depends(get_current_user)):
     if user.get("role") not in ["admin", "instructor", "manager"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    lesson = await db.lessons.find_one({"id": lesson_id})
+    lesson = await db.lessons.find_one_and_delete({"id": lesson_id})
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    # Delete lesson
-    await db.lessons.delete_one({"id": lesson_id})
-    
-    # Update subject lesson count
-    if lesson.get("subject_id"):
-        await db.subjects.update_one(
-            {"id": lesson["subject_id"]},
-            {"$inc": {"lesson_count": -1}}
-        )
+    # Update course/subject lesson counts and enrollment progress
+    await remove_lesson_from_course(lesson)
     
     return {"success": True, "message": "Lesson deleted"}
 
@@ -556,55 +1199,35 @@ async def get_lesson(lesson_id: str, user: dict = Depends(get_current_user)):
 @router.post("/lessons/{lesson_id}/progress")
 async def update_lesson_progress(lesson_id: str, progress: ProgressUpdate, user: dict = Depends(get_current_user)):
     """Update lesson progress"""
-    existing = await db.lesson_progress.find_one({
-        "lesson_id": lesson_id,
-        "user_id": user["id"]
-    })
+    if not progress.completed:
+        # Plain watch-time ping: coalesce like a heartbeat
+        buffer_watch_time(user["id"], WatchTimeBeat(
+            course_id=progress.course_id, lesson_id=lesson_id, watch_time_seconds=progress.watch_time_seconds
+        ))
+        return {"success": True, "message": "Progress updated"}
     
-    if existing:
-        await db.lesson_progress.update_one(
-            {"id": existing["id"]},
-            {"$set": {
-                "completed": progress.completed,
-                "watch_time_seconds": existing.get("watch_time_seconds", 0) + progress.watch_time_seconds,
-                "completed_at": now_iso() if progress.completed else existing.get("completed_at"),
-                "updated_at": now_iso()
-            }}
-        )
-    else:
-        new_progress = {
-            "id": generate_id(),
-            "user_id": user["id"],
-            "course_id": progress.course_id,
-            "lesson_id": lesson_id,
-            "completed": progress.completed,
-            "watch_time_seconds": progress.watch_time_seconds,
-            "completed_at": now_iso() if progress.completed else None,
-            "created_at": now_iso()
-        }
-        await db.lesson_progress.insert_one(new_progress)
+    await db.lesson_progress.update_one(*lesson_progress_update(
+        user["id"], progress.course_id, lesson_id, progress.watch_time_seconds, completed=True
+    ), upsert=True)
     
-    # Update streak if lesson was completed
-    if progress.completed:
-        await update_streak_on_completion(user["id"])
-    
-    # Check if course is completed
-    course_lessons = await db.lessons.find({"course_id": progress.course_id}).to_list(100)
-    completed_lessons = await db.lesson_progress.count_documents({
-        "course_id": progress.course_id,
-        "user_id": user["id"],
-        "completed": True
-    })
+    await update_streak_on_completion(user["id"])
     
-    if completed_lessons >= len(course_lessons):
-        # Award completion badge/certificate
-        await db.enrollments.update_one(
-            {"course_id": progress.course_id, "user_id": user["id"]},
-            {"$set": {"completed_at": now_iso(), "status": "completed"}}
-        )
+    # Count the lesson on the enrollment and check if course is completed
+    await record_lesson_completion(user, progress.course_id, lesson_id)
     
     return {"success": True, "message": "Progress updated"}
 
+@router.post("/progress/heartbeat")
+async def progress_heartbeat(batch: HeartbeatBatch, user: dict = Depends(get_current_user)):
+    """Record batched watch-time deltas from the video player"""
+    if len(batch.beats) > MAX_BEATS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BEATS_PER_REQUEST} beats per request")
+    
+    for beat in batch.beats:
+        buffer_watch_time(user["id"], beat)
+    
+    return {"success": True, "accepted": len(batch.beats)}
+
 # ============== ENROLLMENT ROUTES ==============
 
 @router.post("/enroll")
@@ -614,25 +1237,10 @@ async def enroll_course(enrollment: EnrollmentRequest, user: dict = Depends(get_
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    existing = await db.enrollments.find_one({
-        "course_id": enrollment.course_id,
-        "user_id": user["id"]
-    }, {"_id": 0})
-    
-    if existing:
-        return {"success": True, "message": "Already enrolled", "enrollment": existing}
-    
-    new_enrollment = {
-        "id": generate_id(),
-        "user_id": user["id"],
-        "course_id": enrollment.course_id,
-        "enrolled_at": now_iso(),
-        "status": "active",
-        "completed_at": None
-    }
+    new_enrollment, created = await create_enrollment(user["id"], enrollment.course_id, colony=user.get("colony"))
     
-    await db.enrollments.insert_one(new_enrollment)
-    new_enrollment.pop("_id", None)
+    if not created:
+        return {"success": True, "message": "Already enrolled", "enrollment": new_enrollment}
     
     return {"success": True, "message": "Enrolled successfully", "enrollment": new_enrollment}
 
@@ -644,22 +1252,19 @@ async def get_my_courses(user: dict = Depends(get_current_user)):
         {"_id": 0}
     ).to_list(100)
     
+    course_docs = await db.courses.find(
+        {"id": {"$in": [e["course_id"] for e in enrollments]}},
+        {"_id": 0}
+    ).to_list(len(enrollments))
+    courses_by_id = {course["id"]: course for course in course_docs}
+    
     courses = []
     for enrollment in enrollments:
-        course = await db.courses.find_one(
-            {"id": enrollment["course_id"]},
-            {"_id": 0}
-        )
+        course = courses_by_id.get(enrollment["course_id"])
         if course:
-            # Get progress
-            lessons = await db.lessons.find({"course_id": course["id"]}).to_list(100)
-            progress_records = await db.lesson_progress.find({
-                "course_id": course["id"],
-                "user_id": user["id"]
-            }).to_list(100)
-            
+            course = dict(course)
             course["enrollment"] = enrollment
-            course["progress"] = calculate_course_progress(progress_records, lessons)
+            course["progress"] = calculate_course_progress(enrollment, course.get("total_lessons", 0))
             courses.append(course)
     
     return {"courses": courses}
@@ -683,6 +1288,191 @@ async def get_learning_streak(user: dict = Depends(get_current_user)):
         "freeze_available": 2     # Number of freezes available
     }
 
+# ============== QUIZ GRADING ==============
+# Answer keys are compiled once per quiz version and cached in-process. Every graded
+# attempt $incs quiz_stats (attempts, passes, score sum) and quiz_item_stats
+# (per-question attempts, correct count and option distribution).
+
+MAX_BULK_SUBMISSIONS = 200
+
+_compiled_quizzes = {}
+
+def question_id(question: dict, index: int) -> str:
+    """Stable id for a question, falling back to its position"""
+    return str(question.get("id") or index)
+
+def compile_quiz(quiz: dict) -> dict:
+    questions = quiz.get("questions", [])
+    return {
+        "version": quiz.get("version", 0),
+        "passing_score": quiz.get("passing_score", 70),
+        "question_ids": [question_id(q, i) for i, q in enumerate(questions)],
+        "key": {question_id(q, i): q.get("correct_answer") for i, q in enumerate(questions)},
+        "explanations": {question_id(q, i): q.get("explanation") for i, q in enumerate(questions)},
+        # Option value -> index, used as the stats key for the option distribution
+        "options": {
+            question_id(q, i): {str(option): n for n, option in enumerate(q.get("options") or [])}
+            for i, q in enumerate(questions)
+        }
+    }
+
+async def get_compiled_quiz(quiz_id: str) -> Optional[dict]:
+    """Compiled answer key for the quiz's current version"""
+    current = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0, "version": 1})
+    if current is None:
+        return None
+    
+    compiled = _compiled_quizzes.get(quiz_id)
+    if compiled is None or compiled["version"] != current.get("version", 0):
+        quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+        if quiz is None:
+            return None
+        compiled = compile_quiz(quiz)
+        _compiled_quizzes[quiz_id] = compiled
+    return compiled
+
+def grade_answers(compiled: dict, answers: List[dict]) -> dict:
+    selected = {str(a.get("question_id")): a.get("selected_option") for a in answers}
+    
+    correct = 0
+    results = []
+    for q_id in compiled["question_ids"]:
+        user_answer = selected.get(q_id)
+        is_correct = user_answer == compiled["key"][q_id]
+        if is_correct:
+            correct += 1
+        results.append({
+            "question_id": q_id,
+            "user_answer": user_answer,
+            "correct_answer": compiled["key"][q_id],
+            "is_correct": is_correct,
+            "explanation": compiled["explanations"][q_id]
+        })
+    
+    total = len(compiled["question_ids"])
+    score = round((correct / total) * 100) if total else 0
+    return {
+        "score": score,
+        "correct": correct,
+        "total": total,
+        "passed": score >= compiled["passing_score"],
+        "results": results
+    }
+
+def option_key(compiled: dict, q_id: str, user_answer) -> str:
+    if user_answer is None:
+        return "skipped"
+    index = compiled["options"][q_id].get(str(user_answer))
+    return str(index) if index is not None else "other"
+
+def aggregate_quiz_stats(compiled: dict, graded: List[dict]) -> tuple:
+    """Sum a batch of graded attempts into quiz-level and per-question deltas"""
+    quiz_delta = {"attempts": 0, "passed": 0, "score_sum": 0}
+    items = {}
+    for grade in graded:
+        quiz_delta["attempts"] += 1
+        quiz_delta["passed"] += 1 if grade["passed"] else 0
+        quiz_delta["score_sum"] += grade["score"]
+        for result in grade["results"]:
+            delta = items.setdefault(result["question_id"], {"attempts": 0, "correct": 0})
+            delta["attempts"] += 1
+            delta["correct"] += 1 if result["is_correct"] else 0
+            option_field = f"options.{option_key(compiled, result['question_id'], result['user_answer'])}"
+            delta[option_field] = delta.get(option_field, 0) + 1
+    return quiz_delta, items
+
+async def record_quiz_attempts(quiz_id: str, compiled: dict, graded: List[dict]):
+    """Store graded attempts and fold them into quiz, item and learner stats"""
+    attempts = [
+        {
+            "id": generate_id(),
+            "quiz_id": quiz_id,
+            "user_id": grade["user_id"],
+            "score": grade["score"],
+            "correct_count": grade["correct"],
+            "total_questions": grade["total"],
+            "passed": grade["passed"],
+            "answers": grade["answers"],
+            "user_name": grade.get("user_name"),
+            "quiz_version": compiled["version"],
+            "attempted_at": now_iso()
+        }
+        for grade in graded
+    ]
+    quiz_delta, items = aggregate_quiz_stats(compiled, graded)
+    
+    ops = [
+        db.quiz_attempts.insert_many(attempts),
+        db.quiz_stats.update_one(
+            {"quiz_id": quiz_id},
+            {"$inc": quiz_delta, "$set": {"updated_at": now_iso()}},
+            upsert=True
+        )
+    ]
+    if items:
+        ops.append(db.quiz_item_stats.bulk_write([
+            UpdateOne({"quiz_id": quiz_id, "question_id": q_id}, {"$inc": delta}, upsert=True)
+            for q_id, delta in items.items()
+        ], ordered=False))
+    ops.extend(
+        bump_learning_xp(
+            grade["user_id"], grade.get("user_name"),
+            quizzes_taken=1, quizzes_passed=1 if grade["passed"] else 0, quiz_score_sum=grade["score"]
+        )
+        for grade in graded
+    )
+    await asyncio.gather(*ops)
+    return attempts
+
+async def rebuild_quiz_stats(quiz_ids: Optional[List[str]] = None) -> int:
+    """Recompute quiz_stats and quiz_item_stats by regrading stored attempts (all quizzes by default)"""
+    if quiz_ids is None:
+        quiz_ids = await db.quiz_attempts.distinct("quiz_id")
+    for quiz_id in quiz_ids:
+        compiled = await get_compiled_quiz(quiz_id)
+        if compiled is None:
+            continue
+        graded = []
+        async for attempt in db.quiz_attempts.find({"quiz_id": quiz_id}, {"_id": 0, "answers": 1, "passed": 1, "score": 1}):
+            grade = grade_answers(compiled, attempt.get("answers") or [])
+            # Keep the recorded outcome; the key may have changed since
+            grade.update(score=attempt.get("score", 0), passed=attempt.get("passed", False))
+            graded.append(grade)
+        
+        quiz_delta, items = aggregate_quiz_stats(compiled, graded)
+        await db.quiz_stats.update_one(
+            {"quiz_id": quiz_id},
+            {"$set": {**quiz_delta, "updated_at": now_iso()}},
+            upsert=True
+        )
+        await db.quiz_item_stats.delete_many({"quiz_id": quiz_id})
+        if items:
+            await db.quiz_item_stats.insert_many([
+                {"quiz_id": quiz_id, "question_id": q_id, **unflatten_options(delta)}
+                for q_id, delta in items.items()
+            ])
+    return len(quiz_ids)
+
+def unflatten_options(delta: dict) -> dict:
+    """Turn {"options.N": count} keys back into an options sub-document"""
+    doc = {"options": {}}
+    for field, value in delta.items():
+        if field.startswith("options."):
+            doc["options"][field[len("options."):]] = value
+        else:
+            doc[field] = value
+    return doc
+
+async def ensure_quiz_stats_indexes():
+    await db.quiz_stats.create_index("quiz_id", unique=True)
+    await db.quiz_item_stats.create_index([("quiz_id", 1), ("question_id", 1)], unique=True)
+    
+    # Only quizzes with attempts but no stats yet are regraded, not every attempt on every start
+    with_stats = set(await db.quiz_stats.distinct("quiz_id"))
+    missing = [quiz_id for quiz_id in await db.quiz_attempts.distinct("quiz_id") if quiz_id not in with_stats]
+    if missing:
+        await rebuild_quiz_stats(missing)
+
 # ============== QUIZ ROUTES ==============
 
 @router.post("/quizzes")
@@ -694,11 +1484,15 @@ async def create_quiz(quiz_data: QuizCreate, user: dict = Depends(get_current_us
     new_quiz = {
         "id": generate_id(),
         **quiz_data.dict(),
+        "version": 1,
         "created_at": now_iso()
     }
+    for question in new_quiz["questions"]:
+        question.setdefault("id", generate_id())
     
     await db.quizzes.insert_one(new_quiz)
     new_quiz.pop("_id", None)
+    await bump_course_version(quiz_data.course_id)
     
     return {"success": True, "quiz": new_quiz}
 
@@ -726,9 +1520,9 @@ async def get_quiz(quiz_id: str, user: dict = Depends(get_current_user)):
     
     # Don't send correct answers to client
     questions_for_client = []
-    for q in quiz.get("questions", []):
+    for i, q in enumerate(quiz.get("questions", [])):
         questions_for_client.append({
-            "id": q.get("id", generate_id()),
+            "id": question_id(q, i),
             "question": q.get("question"),
             "question_te": q.get("question_te"),
             "options": q.get("options"),
@@ -743,72 +1537,124 @@ async def get_quiz(quiz_id: str, user: dict = Depends(get_current_user)):
 @router.post("/quizzes/{quiz_id}/submit")
 async def submit_quiz(quiz_id: str, submission: QuizSubmission, user: dict = Depends(get_current_user)):
     """Submit quiz answers and get results"""
-    quiz = await db.quizzes.find_one({"id": quiz_id})
-    if not quiz:
+    compiled = await get_compiled_quiz(quiz_id)
+    if not compiled:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
     # Grade the quiz
-    questions = quiz.get("questions", [])
-    correct = 0
-    results = []
+    grade = grade_answers(compiled, submission.answers)
+    grade.update(user_id=user["id"], user_name=user.get("name"), answers=submission.answers)
+    
+    await record_quiz_attempts(quiz_id, compiled, [grade])
+    
+    return {
+        "success": True,
+        "score": grade["score"],
+        "correct": grade["correct"],
+        "total": grade["total"],
+        "passed": grade["passed"],
+        "passing_score": compiled["passing_score"],
+        "results": grade["results"]
+    }
+
+@router.post("/quizzes/{quiz_id}/submit-bulk")
+async def submit_quiz_bulk(quiz_id: str, batch: BulkQuizSubmission, user: dict = Depends(get_current_user)):
+    """Grade a classroom's answer sheets in one request (instructor only)"""
+    if user.get("role") not in ["admin", "instructor"]:
+        raise HTTPException(status_code=403, detail="Instructor access required")
+    if len(batch.submissions) > MAX_BULK_SUBMISSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_SUBMISSIONS} submissions per request")
+    
+    compiled = await get_compiled_quiz(quiz_id)
+    if not compiled:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    
+    quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0, "course_id": 1})
+    course = await db.courses.find_one({"id": quiz.get("course_id")}, {"_id": 0, "instructor_id": 1}) if quiz else None
+    if user.get("role") != "admin" and (not course or course.get("instructor_id") != user["id"]):
+        raise HTTPException(status_code=403, detail="Only the course instructor can submit for this quiz")
+    
+    if any(not submission.get("user_id") for submission in batch.submissions):
+        raise HTTPException(status_code=400, detail="Each submission needs a user_id")
     
-    for q in questions:
-        q_id = q.get("id")
-        user_answer = next(
-            (a.get("selected_option") for a in submission.answers if a.get("question_id") == q_id),
-            None
+    # The whole sheet is rejected on a bad learner, so a corrected resubmission can't double-record anyone
+    user_ids = list({submission["user_id"] for submission in batch.submissions})
+    learners, enrolled = await asyncio.gather(
+        db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None),
+        db.enrollments.distinct("user_id", {"course_id": quiz["course_id"], "user_id": {"$in": user_ids}})
+    )
+    names = {learner["id"]: learner.get("name") for learner in learners}
+    unknown = [uid for uid in user_ids if uid not in names]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown users: {', '.join(unknown)}")
+    not_enrolled = [uid for uid in user_ids if uid not in set(enrolled)]
+    if not_enrolled:
+        raise HTTPException(status_code=400, detail=f"Not enrolled in the course: {', '.join(not_enrolled)}")
+    
+    graded = []
+    for submission in batch.submissions:
+        grade = grade_answers(compiled, submission.get("answers") or [])
+        grade.update(
+            user_id=submission["user_id"], user_name=names[submission["user_id"]],
+            answers=submission.get("answers") or []
         )
-        is_correct = user_answer == q.get("correct_answer")
-        if is_correct:
-            correct += 1
-        
-        results.append({
-            "question_id": q_id,
-            "user_answer": user_answer,
-            "correct_answer": q.get("correct_answer"),
-            "is_correct": is_correct,
-            "explanation": q.get("explanation")
-        })
+        graded.append(grade)
     
-    score = round((correct / len(questions)) * 100) if questions else 0
-    passed = score >= quiz.get("passing_score", 70)
+    if graded:
+        await record_quiz_attempts(quiz_id, compiled, graded)
     
-    # Save attempt
-    attempt = {
-        "id": generate_id(),
-        "quiz_id": quiz_id,
-        "user_id": user["id"],
-        "score": score,
-        "correct_count": correct,
-        "total_questions": len(questions),
-        "passed": passed,
-        "answers": submission.answers,
-        "attempted_at": now_iso()
+    return {
+        "success": True,
+        "graded": len(graded),
+        "results": [
+            {"user_id": g["user_id"], "score": g["score"], "correct": g["correct"], "passed": g["passed"]}
+            for g in graded
+        ]
     }
+
+@router.get("/instructor/quizzes/{quiz_id}/item-analysis")
+async def get_quiz_item_analysis(quiz_id: str, user: dict = Depends(get_current_user)):
+    """Per-question correct rate and option distribution for a quiz"""
+    if user.get("role") not in ["admin", "instructor"]:
+        raise HTTPException(status_code=403, detail="Instructor access required")
     
-    await db.quiz_attempts.insert_one(attempt)
+    quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
     
-    # Award badge if first time passing
-    if passed:
-        existing_pass = await db.quiz_attempts.find_one({
-            "quiz_id": quiz_id,
-            "user_id": user["id"],
-            "passed": True,
-            "id": {"$ne": attempt["id"]}
+    stats, items = await asyncio.gather(
+        db.quiz_stats.find_one({"quiz_id": quiz_id}, {"_id": 0}),
+        db.quiz_item_stats.find({"quiz_id": quiz_id}, {"_id": 0}).to_list(None)
+    )
+    stats = stats or {"attempts": 0, "passed": 0, "score_sum": 0}
+    items_by_id = {item["question_id"]: item for item in items}
+    
+    questions = []
+    for i, q in enumerate(quiz.get("questions", [])):
+        q_id = question_id(q, i)
+        item = items_by_id.get(q_id, {})
+        attempts = item.get("attempts", 0)
+        distribution = item.get("options", {})
+        questions.append({
+            "question_id": q_id,
+            "question": q.get("question"),
+            "attempts": attempts,
+            "correct_rate": round(item.get("correct", 0) / attempts * 100, 1) if attempts else 0,
+            "options": [
+                {"option": option, "count": distribution.get(str(n), 0)}
+                for n, option in enumerate(q.get("options") or [])
+            ],
+            "skipped": distribution.get("skipped", 0),
+            "other": distribution.get("other", 0)
         })
-        
-        if not existing_pass:
-            # First time passing - could award XP or badge here
-            pass
     
     return {
-        "success": True,
-        "score": score,
-        "correct": correct,
-        "total": len(questions),
-        "passed": passed,
-        "passing_score": quiz.get("passing_score", 70),
-        "results": results
+        "quiz_id": quiz_id,
+        "title": quiz.get("title"),
+        "attempts": stats["attempts"],
+        "pass_rate": round(stats["passed"] / stats["attempts"] * 100, 1) if stats["attempts"] else 0,
+        "avg_score": round(stats["score_sum"] / stats["attempts"], 1) if stats["attempts"] else 0,
+        "questions": questions
     }
 
 # ============== LIVE CLASS ROUTES ==============
@@ -874,6 +1720,15 @@ async def get_certificates(user: dict = Depends(get_current_user)):
     
     return {"certificates": certificates}
 
+@router.post("/admin/certificates/rerender")
+async def rerender_certificates(user: dict = Depends(get_current_user)):
+    """Re-render all certificate share pages and images (admin only)"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    result = await rerender_all_certificates()
+    return {"success": True, **result}
+
 @router.get("/certificates/{certificate_id}")
 async def get_certificate(certificate_id: str):
     """Get certificate details (public)"""
@@ -919,9 +1774,18 @@ async def generate_certificate(course_id: str, user: dict = Depends(get_current_
         "certificate_number": f"AIT-{generate_id()[:8].upper()}"
     }
     
-    await db.certificates.insert_one(certificate)
+    await asyncio.gather(
+        db.certificates.insert_one(certificate),
+        bump_learning_xp(user["id"], user.get("name"), certificates=1)
+    )
     certificate.pop("_id", None)
     
+    # Pre-render the share page and image
+    try:
+        certificate["share_key"] = await render_share_assets(certificate)
+    except Exception as e:
+        logging.error(f"Certificate render failed for {certificate['id']}: {e}")
+    
     return {"success": True, "certificate": certificate}
 
 # ============== REVIEW ROUTES ==============
@@ -929,49 +1793,29 @@ async def generate_certificate(course_id: str, user: dict = Depends(get_current_
 @router.get("/courses/{course_id}/reviews")
 async def get_course_reviews(course_id: str, limit: int = 20, skip: int = 0):
     """Get reviews for a course"""
-    reviews = await db.course_reviews.find(
-        {"course_id": course_id},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    reviews, course = await asyncio.gather(
+        db.course_reviews.find(
+            {"course_id": course_id},
+            {"_id": 0}
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit),
+        db.courses.find_one(
+            {"id": course_id},
+            {"_id": 0, "average_rating": 1, "review_count": 1, "rating_breakdown": 1}
+        )
+    )
     
-    # Get user names for reviews
     for review in reviews:
-        user = await db.users.find_one({"id": review.get("user_id")}, {"_id": 0, "name": 1})
-        review["user_name"] = user.get("name", "Student") if user else "Student"
+        review.setdefault("user_name", "Student")
     
-    # Calculate average rating
-    pipeline = [
-        {"$match": {"course_id": course_id}},
-        {"$group": {
-            "_id": None,
-            "avg_rating": {"$avg": "$rating"},
-            "total_reviews": {"$sum": 1},
-            "five_star": {"$sum": {"$cond": [{"$eq": ["$rating", 5]}, 1, 0]}},
-            "four_star": {"$sum": {"$cond": [{"$eq": ["$rating", 4]}, 1, 0]}},
-            "three_star": {"$sum": {"$cond": [{"$eq": ["$rating", 3]}, 1, 0]}},
-            "two_star": {"$sum": {"$cond": [{"$eq": ["$rating", 2]}, 1, 0]}},
-            "one_star": {"$sum": {"$cond": [{"$eq": ["$rating", 1]}, 1, 0]}}
-        }}
-    ]
-    
-    stats_result = await db.course_reviews.aggregate(pipeline).to_list(1)
-    stats = stats_result[0] if stats_result else {
-        "avg_rating": 0, "total_reviews": 0,
-        "five_star": 0, "four_star": 0, "three_star": 0, "two_star": 0, "one_star": 0
-    }
+    course = course or {}
+    breakdown = course.get("rating_breakdown") or {}
     
     return {
         "reviews": reviews,
         "stats": {
-            "average_rating": round(stats.get("avg_rating", 0), 1),
-            "total_reviews": stats.get("total_reviews", 0),
-            "rating_breakdown": {
-                5: stats.get("five_star", 0),
-                4: stats.get("four_star", 0),
-                3: stats.get("three_star", 0),
-                2: stats.get("two_star", 0),
-                1: stats.get("one_star", 0)
-            }
+            "average_rating": course.get("average_rating", 0),
+            "total_reviews": course.get("review_count", 0),
+            "rating_breakdown": {star: breakdown.get(str(star), 0) for star in range(5, 0, -1)}
         }
     }
 
@@ -991,56 +1835,50 @@ async def create_review(course_id: str, review_data: ReviewCreate, user: dict =
     if not 1 <= review_data.rating <= 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
     
-    # Check for existing review
-    existing = await db.course_reviews.find_one({
-        "course_id": course_id,
-        "user_id": user["id"]
-    })
-    
-    if existing:
-        # Update existing review
-        await db.course_reviews.update_one(
-            {"id": existing["id"]},
-            {"$set": {
-                "rating": review_data.rating,
-                "review_text": review_data.review_text,
-                "review_text_te": review_data.review_text_te,
-                "updated_at": now_iso()
-            }}
-        )
-        return {"success": True, "message": "Review updated", "review_id": existing["id"]}
-    
-    # Create new review
-    new_review = {
-        "id": generate_id(),
-        "course_id": course_id,
-        "user_id": user["id"],
+    # Create the review, or update the existing one and get its previous rating
+    new_review_id = generate_id()
+    review_filter = {"course_id": course_id, "user_id": user["id"]}
+    review_fields = {
         "rating": review_data.rating,
         "review_text": review_data.review_text,
         "review_text_te": review_data.review_text_te,
-        "created_at": now_iso(),
-        "updated_at": None,
-        "helpful_count": 0
+        "user_name": user.get("name") or "Student"
     }
+    try:
+        existing = await db.course_reviews.find_one_and_update(
+            review_filter,
+            {
+                "$set": review_fields,
+                "$setOnInsert": {
+                    "id": new_review_id,
+                    "created_at": now_iso(),
+                    "updated_at": None,
+                    "helpful_count": 0
+                }
+            },
+            upsert=True,
+            projection={"_id": 0, "id": 1, "rating": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # A concurrent submit inserted the review first; apply this one as an update to it
+        existing = await db.course_reviews.find_one_and_update(
+            review_filter,
+            {"$set": review_fields},
+            projection={"_id": 0, "id": 1, "rating": 1},
+            return_document=ReturnDocument.BEFORE
+        )
     
-    await db.course_reviews.insert_one(new_review)
+    if existing:
+        await db.course_reviews.update_one({"id": existing["id"]}, {"$set": {"updated_at": now_iso()}})
+        if existing.get("rating") != review_data.rating:
+            await apply_rating_change(course_id, existing.get("rating"), review_data.rating)
+        return {"success": True, "message": "Review updated", "review_id": existing["id"]}
     
-    # Update course average rating
-    pipeline = [
-        {"$match": {"course_id": course_id}},
-        {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}
-    ]
-    result = await db.course_reviews.aggregate(pipeline).to_list(1)
-    if result:
-        await db.courses.update_one(
-            {"id": course_id},
-            {"$set": {
-                "average_rating": round(result[0]["avg"], 1),
-                "review_count": result[0]["count"]
-            }}
-        )
+    # Update course rating aggregates
+    await apply_rating_change(course_id, new_rating=review_data.rating)
     
-    return {"success": True, "message": "Review submitted", "review_id": new_review["id"]}
+    return {"success": True, "message": "Review submitted", "review_id": new_review_id}
 
 @router.delete("/reviews/{review_id}")
 async def delete_review(review_id: str, user: dict = Depends(get_current_user)):
@@ -1053,28 +1891,10 @@ async def delete_review(review_id: str, user: dict = Depends(get_current_user)):
     if review["user_id"] != user["id"] and user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete this review")
     
-    course_id = review["course_id"]
-    await db.course_reviews.delete_one({"id": review_id})
-    
-    # Update course average rating
-    pipeline = [
-        {"$match": {"course_id": course_id}},
-        {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}
-    ]
-    result = await db.course_reviews.aggregate(pipeline).to_list(1)
-    if result:
-        await db.courses.update_one(
-            {"id": course_id},
-            {"$set": {
-                "average_rating": round(result[0]["avg"], 1),
-                "review_count": result[0]["count"]
-            }}
-        )
-    else:
-        await db.courses.update_one(
-            {"id": course_id},
-            {"$set": {"average_rating": 0, "review_count": 0}}
-        )
+    # Only the request that actually deletes the review adjusts the aggregates
+    deleted = await db.course_reviews.find_one_and_delete({"id": review_id}, projection={"_id": 0, "rating": 1})
+    if deleted:
+        await apply_rating_change(review["course_id"], old_rating=deleted.get("rating"))
     
     return {"success": True, "message": "Review deleted"}
 
@@ -1119,117 +1939,60 @@ async def mark_review_helpful(review_id: str, user: dict = Depends(get_current_u
 @router.get("/leaderboard")
 async def get_leaderboard(limit: int = 20, timeframe: str = "all"):
     """Get learning leaderboard with enhanced stats"""
-    # Aggregate user stats
-    pipeline = [
-        {"$group": {
-            "_id": "$user_id",
-            "courses_completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
-            "total_courses": {"$sum": 1}
-        }},
-        {"$sort": {"courses_completed": -1}},
-        {"$limit": limit}
-    ]
-    
-    stats = await db.enrollments.aggregate(pipeline).to_list(limit)
+    rows = await db.learning_xp.find({}, {"_id": 0}).sort("xp", -1).limit(limit).to_list(limit)
     
-    # Get user details and additional stats
     leaderboard = []
-    for i, stat in enumerate(stats):
-        user = await db.users.find_one({"id": stat["_id"]}, {"_id": 0, "name": 1, "id": 1})
-        if user:
-            # Get quiz stats
-            quiz_stats = await db.quiz_attempts.aggregate([
-                {"$match": {"user_id": stat["_id"]}},
-                {"$group": {
-                    "_id": None,
-                    "total_quizzes": {"$sum": 1},
-                    "avg_score": {"$avg": "$score"},
-                    "passed": {"$sum": {"$cond": ["$passed", 1, 0]}}
-                }}
-            ]).to_list(1)
-            
-            # Get certificates count
-            certs_count = await db.certificates.count_documents({"user_id": stat["_id"]})
-            
-            # Calculate XP
-            xp = (stat["courses_completed"] * 100) + (quiz_stats[0]["passed"] * 20 if quiz_stats else 0) + (certs_count * 50)
-            
-            # Determine badge
-            badge = "Beginner"
-            if xp >= 1000: badge = "Expert"
-            elif xp >= 500: badge = "Advanced"
-            elif xp >= 200: badge = "Intermediate"
-            
-            leaderboard.append({
-                "rank": i + 1,
-                "user_id": user["id"],
-                "user_name": user.get("name", "Student"),
-                "courses_completed": stat["courses_completed"],
-                "total_courses": stat["total_courses"],
-                "quizzes_passed": quiz_stats[0]["passed"] if quiz_stats else 0,
-                "avg_quiz_score": round(quiz_stats[0]["avg_score"], 1) if quiz_stats else 0,
-                "certificates": certs_count,
-                "xp": xp,
-                "badge": badge
-            })
+    for i, row in enumerate(rows):
+        leaderboard.append({
+            "rank": i + 1,
+            "user_id": row["user_id"],
+            "user_name": row.get("user_name") or "Student",
+            "courses_completed": row.get("courses_completed", 0),
+            "total_courses": row.get("courses_enrolled", 0),
+            "quizzes_passed": row.get("quizzes_passed", 0),
+            "avg_quiz_score": round(row.get("quiz_score_sum", 0) / row["quizzes_taken"], 1) if row.get("quizzes_taken") else 0,
+            "certificates": row.get("certificates", 0),
+            "xp": row.get("xp", 0),
+            "badge": xp_badge(row.get("xp", 0))
+        })
     
     return {"leaderboard": leaderboard}
 
 @router.get("/my-stats")
 async def get_my_stats(user: dict = Depends(get_current_user)):
     """Get user's learning statistics"""
-    enrollments = await db.enrollments.find({"user_id": user["id"]}).to_list(100)
-    quiz_attempts = await db.quiz_attempts.find({"user_id": user["id"]}).to_list(100)
-    certificates = await db.certificates.count_documents({"user_id": user["id"]})
-    
-    total_watch_time = 0
-    progress_records = await db.lesson_progress.find({"user_id": user["id"]}).to_list(500)
-    for p in progress_records:
-        total_watch_time += p.get("watch_time_seconds", 0)
-    
-    completed_courses = len([e for e in enrollments if e.get("status") == "completed"])
-    avg_quiz_score = sum(a.get("score", 0) for a in quiz_attempts) / len(quiz_attempts) if quiz_attempts else 0
-    quizzes_passed = len([q for q in quiz_attempts if q.get("passed")])
+    stats = await get_learning_xp(user["id"])
+    xp = stats["xp"]
     
-    # Calculate XP
-    xp = (completed_courses * 100) + (quizzes_passed * 20) + (certificates * 50)
+    watch_time = await db.lesson_progress.aggregate([
+        {"$match": {"user_id": user["id"]}},
+        {"$group": {"_id": None, "seconds": {"$sum": "$watch_time_seconds"}}}
+    ]).to_list(1)
+    total_watch_time = watch_time[0]["seconds"] if watch_time else 0
     
     # Determine badge and level
-    level = 1 + (xp // 200)
-    badge = "Beginner"
-    if xp >= 1000: badge = "Expert"
-    elif xp >= 500: badge = "Advanced"
-    elif xp >= 200: badge = "Intermediate"
+    level = 1 + (xp // XP_PER_LEVEL)
     
-    # Get rank
-    all_xp = await db.enrollments.aggregate([
-        {"$group": {"_id": "$user_id", "courses": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}}},
-        {"$sort": {"courses": -1}}
-    ]).to_list(1000)
-    
-    rank = next((i+1 for i, u in enumerate(all_xp) if u["_id"] == user["id"]), len(all_xp) + 1)
-    
-    # Get streak data
-    streak_data = await calculate_learning_streak(user["id"])
+    rank, streak_data = await asyncio.gather(get_xp_rank(xp), calculate_learning_streak(user["id"]))
     
     return {
-        "total_courses_enrolled": len(enrollments),
-        "courses_completed": completed_courses,
-        "courses_in_progress": len(enrollments) - completed_courses,
-        "certificates_earned": certificates,
+        "total_courses_enrolled": stats["courses_enrolled"],
+        "courses_completed": stats["courses_completed"],
+        "courses_in_progress": stats["courses_enrolled"] - stats["courses_completed"],
+        "certificates_earned": stats["certificates"],
         "total_watch_time_hours": round(total_watch_time / 3600, 1),
-        "quizzes_taken": len(quiz_attempts),
-        "quizzes_passed": quizzes_passed,
-        "average_quiz_score": round(avg_quiz_score, 1),
+        "quizzes_taken": stats["quizzes_taken"],
+        "quizzes_passed": stats["quizzes_passed"],
+        "average_quiz_score": round(stats["quiz_score_sum"] / stats["quizzes_taken"], 1) if stats["quizzes_taken"] else 0,
         "current_streak": streak_data["current_streak"],
         "longest_streak": streak_data["longest_streak"],
         "last_activity_date": streak_data["last_activity_date"],
         "total_xp": xp,
         "level": level,
-        "badge": badge,
+        "badge": xp_badge(xp),
         "rank": rank,
-        "next_level_xp": (level * 200),
-        "xp_progress": xp % 200
+        "next_level_xp": (level * XP_PER_LEVEL),
+        "xp_progress": xp % XP_PER_LEVEL
     }
 
 # ============== INSTRUCTOR PORTAL ROUTES ==============
@@ -1251,15 +2014,8 @@ async def get_instructor_dashboard(user: dict = Depends(get_current_user)):
     course_stats = []
     
     for course in courses:
-        # Get enrollment count
-        enrollments = await db.enrollments.count_documents({"course_id": course["id"]})
-        completions = await db.enrollments.count_documents({"course_id": course["id"], "status": "completed"})
-        
-        # Get reviews
-        reviews = await db.course_reviews.aggregate([
-            {"$match": {"course_id": course["id"]}},
-            {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}
-        ]).to_list(1)
+        enrollments = course.get("enrollment_count", 0)
+        completions = course.get("completion_count", 0)
         
         total_students += enrollments
         total_revenue += enrollments * course.get("price", 0)
@@ -1270,8 +2026,8 @@ async def get_instructor_dashboard(user: dict = Depends(get_current_user)):
             "enrollments": enrollments,
             "completions": completions,
             "completion_rate": round((completions / enrollments * 100) if enrollments > 0 else 0, 1),
-            "rating": round(reviews[0]["avg"], 1) if reviews else 0,
-            "review_count": reviews[0]["count"] if reviews else 0,
+            "rating": course.get("average_rating", 0),
+            "review_count": course.get("review_count", 0),
             "revenue": enrollments * course.get("price", 0),
             "is_published": course.get("is_published", False)
         })
@@ -1296,12 +2052,23 @@ async def get_instructor_courses(user: dict = Depends(get_current_user)):
     courses = await db.courses.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
     
     # Enrich with stats
+    course_ids = [course["id"] for course in courses]
+    lesson_counts = {
+        row["_id"]: row["count"] async for row in db.lessons.aggregate([
+            {"$match": {"course_id": {"$in": course_ids}}},
+            {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+        ])
+    }
+    quiz_counts = {
+        row["_id"]: row["count"] async for row in db.quizzes.aggregate([
+            {"$match": {"course_id": {"$in": course_ids}}},
+            {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+        ])
+    }
     for course in courses:
-        course["enrollments"] = await db.enrollments.count_documents({"course_id": course["id"]})
-        lessons = await db.lessons.count_documents({"course_id": course["id"]})
-        quizzes = await db.quizzes.count_documents({"course_id": course["id"]})
-        course["lessons_count"] = lessons
-        course["quizzes_count"] = quizzes
+        course["enrollments"] = course.get("enrollment_count", 0)
+        course["lessons_count"] = lesson_counts.get(course["id"], 0)
+        course["quizzes_count"] = quiz_counts.get(course["id"], 0)
     
     return {"courses": courses}
 
@@ -1316,20 +2083,18 @@ async def get_course_students(course_id: str, user: dict = Depends(get_current_u
         {"_id": 0}
     ).to_list(500)
     
+    total_lessons = await get_course_total_lessons(course_id)
+    users = await db.users.find(
+        {"id": {"$in": [e["user_id"] for e in enrollments]}},
+        {"_id": 0, "id": 1, "name": 1, "phone": 1}
+    ).to_list(len(enrollments))
+    users_by_id = {u["id"]: u for u in users}
+    
     students = []
     for enrollment in enrollments:
-        student = await db.users.find_one(
-            {"id": enrollment["user_id"]},
-            {"_id": 0, "id": 1, "name": 1, "phone": 1}
-        )
+        student = users_by_id.get(enrollment["user_id"])
         if student:
-            # Get progress
-            lessons = await db.lessons.find({"course_id": course_id}).to_list(100)
-            completed = await db.lesson_progress.count_documents({
-                "course_id": course_id,
-                "user_id": student["id"],
-                "completed": True
-            })
+            completed = min(enrollment.get("completed_count", 0), total_lessons)
             
             students.append({
                 "user_id": student["id"],
@@ -1337,33 +2102,81 @@ async def get_course_students(course_id: str, user: dict = Depends(get_current_u
                 "phone": student.get("phone", ""),
                 "enrolled_at": enrollment.get("enrolled_at"),
                 "status": enrollment.get("status"),
-                "progress": round((completed / len(lessons) * 100) if lessons else 0, 1),
+                "progress": round((completed / total_lessons * 100) if total_lessons else 0, 1),
                 "completed_at": enrollment.get("completed_at")
             })
     
     return {"students": students, "total": len(students)}
 
-@router.get("/instructor/course/{course_id}/analytics")
-async def get_course_analytics(course_id: str, user: dict = Depends(get_current_user)):
-    """Get detailed analytics for a course"""
-    if user.get("role") not in ["admin", "instructor"]:
-        raise HTTPException(status_code=403, detail="Instructor access required")
+# ============== COURSE ANALYTICS SNAPSHOTS ==============
+# Instructor analytics are computed by one aggregation and stored in
+# course_analytics_snapshots. Snapshots viewed in the last week are refreshed
+# every ANALYTICS_REFRESH_SECONDS by a background loop.
+
+ANALYTICS_REFRESH_SECONDS = 600
+ANALYTICS_TREND_DAYS = 30
+ANALYTICS_ACTIVE_DAYS = 7
+
+async def compute_course_analytics(course_id: str) -> dict:
+    """Funnel, lesson completion and enrollment trend in a single $facet, plus quiz pass rates from quiz_stats"""
+    lessons, quizzes = await asyncio.gather(
+        db.lessons.find({"course_id": course_id}, {"_id": 0, "id": 1, "title": 1, "order_index": 1}).sort("order_index", 1).to_list(None),
+        db.quizzes.find({"course_id": course_id}, {"_id": 0, "id": 1, "title": 1}).to_list(None)
+    )
     
-    # Course info
-    course = await db.courses.find_one({"id": course_id}, {"_id": 0})
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
+    today = datetime.now(timezone.utc)
+    trend_start = (today - timedelta(days=ANALYTICS_TREND_DAYS - 1)).strftime("%Y-%m-%d")
+    
+    def count_if(condition):
+        return {"$sum": {"$cond": [condition, 1, 0]}}
+    
+    pipeline = [
+        {"$match": {"course_id": course_id}},
+        {"$project": {
+            "_src": {"$literal": "enrollment"},
+            "status": 1,
+            "completed_count": 1,
+            "day": {"$substrBytes": [{"$ifNull": ["$enrolled_at", ""]}, 0, 10]}
+        }},
+        {"$unionWith": {"coll": "lesson_progress", "pipeline": [
+            {"$match": {"course_id": course_id}},
+            {"$project": {"_src": {"$literal": "lesson"}, "lesson_id": 1, "completed": 1}}
+        ]}},
+        {"$facet": {
+            "funnel": [
+                {"$match": {"_src": "enrollment"}},
+                {"$group": {
+                    "_id": None,
+                    "enrolled": {"$sum": 1},
+                    "started": count_if({"$gt": [{"$ifNull": ["$completed_count", 0]}, 0]}),
+                    "completed": count_if({"$eq": ["$status", "completed"]})
+                }}
+            ],
+            "lessons": [
+                {"$match": {"_src": "lesson"}},
+                {"$group": {"_id": "$lesson_id", "views": {"$sum": 1}, "completions": count_if({"$eq": ["$completed", True]})}}
+            ],
+            "trend": [
+                {"$match": {"_src": "enrollment", "day": {"$gte": trend_start}}},
+                {"$group": {"_id": "$day", "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
     
-    # Enrollment stats
-    enrollments = await db.enrollments.find({"course_id": course_id}).to_list(1000)
-    completed = len([e for e in enrollments if e.get("status") == "completed"])
+    facet_rows, quiz_stat_rows = await asyncio.gather(
+        db.enrollments.aggregate(pipeline).to_list(1),
+        db.quiz_stats.find({"quiz_id": {"$in": [q["id"] for q in quizzes]}}, {"_id": 0}).to_list(None)
+    )
+    facets = facet_rows[0]
+    funnel = facets["funnel"][0] if facets["funnel"] else {"enrolled": 0, "started": 0, "completed": 0}
+    lesson_rows = {row["_id"]: row for row in facets["lessons"]}
+    quiz_rows = {row["quiz_id"]: row for row in quiz_stat_rows}
+    trend_rows = {row["_id"]: row["count"] for row in facets["trend"]}
     
-    # Lesson engagement
-    lessons = await db.lessons.find({"course_id": course_id}, {"_id": 0}).sort("order_index", 1).to_list(100)
     lesson_stats = []
     for lesson in lessons:
-        views = await db.lesson_progress.count_documents({"lesson_id": lesson["id"]})
-        completions = await db.lesson_progress.count_documents({"lesson_id": lesson["id"], "completed": True})
+        row = lesson_rows.get(lesson["id"], {})
+        views, completions = row.get("views", 0), row.get("completions", 0)
         lesson_stats.append({
             "id": lesson["id"],
             "title": lesson.get("title"),
@@ -1373,35 +2186,30 @@ async def get_course_analytics(course_id: str, user: dict = Depends(get_current_
             "completion_rate": round((completions / views * 100) if views > 0 else 0, 1)
         })
     
-    # Quiz stats
-    quizzes = await db.quizzes.find({"course_id": course_id}, {"_id": 0, "questions": 0}).to_list(50)
     quiz_stats = []
     for quiz in quizzes:
-        attempts = await db.quiz_attempts.find({"quiz_id": quiz["id"]}).to_list(1000)
-        avg_score = sum(a.get("score", 0) for a in attempts) / len(attempts) if attempts else 0
-        pass_rate = len([a for a in attempts if a.get("passed")]) / len(attempts) * 100 if attempts else 0
+        row = quiz_rows.get(quiz["id"], {})
+        attempts = row.get("attempts", 0)
         quiz_stats.append({
             "id": quiz["id"],
             "title": quiz.get("title"),
-            "attempts": len(attempts),
-            "avg_score": round(avg_score, 1),
-            "pass_rate": round(pass_rate, 1)
+            "attempts": attempts,
+            "avg_score": round(row.get("score_sum", 0) / attempts, 1) if attempts else 0,
+            "pass_rate": round(row.get("passed", 0) / attempts * 100 if attempts else 0, 1)
         })
     
-    # Enrollment over time (last 30 days)
     enrollment_trend = []
-    for i in range(30):
-        date = datetime.now(timezone.utc) - timedelta(days=29-i)
-        date_str = date.strftime("%Y-%m-%d")
-        count = len([e for e in enrollments if e.get("enrolled_at", "")[:10] == date_str])
-        enrollment_trend.append({"date": date_str, "count": count})
+    for i in range(ANALYTICS_TREND_DAYS):
+        date_str = (today - timedelta(days=ANALYTICS_TREND_DAYS - 1 - i)).strftime("%Y-%m-%d")
+        enrollment_trend.append({"date": date_str, "count": trend_rows.get(date_str, 0)})
     
+    enrolled = funnel["enrolled"]
     return {
-        "course": course,
         "summary": {
-            "total_enrollments": len(enrollments),
-            "completions": completed,
-            "completion_rate": round((completed / len(enrollments) * 100) if enrollments else 0, 1),
+            "total_enrollments": enrolled,
+            "started": funnel["started"],
+            "completions": funnel["completed"],
+            "completion_rate": round((funnel["completed"] / enrolled * 100) if enrolled else 0, 1),
             "total_lessons": len(lessons),
             "total_quizzes": len(quizzes)
         },
@@ -1410,6 +2218,67 @@ async def get_course_analytics(course_id: str, user: dict = Depends(get_current_
         "enrollment_trend": enrollment_trend
     }
 
+async def refresh_course_analytics(course_id: str) -> dict:
+    analytics = await compute_course_analytics(course_id)
+    snapshot = {"course_id": course_id, "computed_at": now_iso(), **analytics}
+    await db.course_analytics_snapshots.update_one(
+        {"course_id": course_id},
+        {"$set": snapshot, "$setOnInsert": {"viewed_at": now_iso()}},
+        upsert=True
+    )
+    return snapshot
+
+async def course_analytics_refresh_loop():
+    """Refresh snapshots that instructors have looked at recently"""
+    while True:
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
+        try:
+            active_since = (datetime.now(timezone.utc) - timedelta(days=ANALYTICS_ACTIVE_DAYS)).isoformat()
+            async for snapshot in db.course_analytics_snapshots.find(
+                {"viewed_at": {"$gte": active_since}}, {"_id": 0, "course_id": 1}
+            ):
+                await refresh_course_analytics(snapshot["course_id"])
+        except Exception as e:
+            logging.error(f"Course analytics refresh error: {e}")
+
+_course_analytics_refresh_task = None
+
+@router.on_event("startup")
+async def start_course_analytics_refresh():
+    global _course_analytics_refresh_task
+    await db.course_analytics_snapshots.create_index("course_id", unique=True)
+    await db.lesson_progress.create_index("course_id")
+    await db.quiz_attempts.create_index("quiz_id")
+    _course_analytics_refresh_task = asyncio.create_task(course_analytics_refresh_loop())
+
+@router.on_event("shutdown")
+async def stop_course_analytics_refresh():
+    await cancel_task(_course_analytics_refresh_task)
+
+@router.get("/instructor/course/{course_id}/analytics")
+async def get_course_analytics(course_id: str, refresh: bool = False, user: dict = Depends(get_current_user)):
+    """Get detailed analytics for a course"""
+    if user.get("role") not in ["admin", "instructor"]:
+        raise HTTPException(status_code=403, detail="Instructor access required")
+    
+    # Course info
+    course, snapshot = await asyncio.gather(
+        db.courses.find_one({"id": course_id}, {"_id": 0}),
+        db.course_analytics_snapshots.find_one({"course_id": course_id}, {"_id": 0})
+    )
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    if snapshot is None or refresh:
+        snapshot = await refresh_course_analytics(course_id)
+    elif snapshot.get("viewed_at", "") < (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat():
+        # Keep the snapshot on the refresh schedule
+        await db.course_analytics_snapshots.update_one({"course_id": course_id}, {"$set": {"viewed_at": now_iso()}})
+    
+    snapshot.pop("viewed_at", None)
+    snapshot.pop("course_id", None)
+    return {"course": course, **snapshot}
+
 @router.put("/instructor/lessons/{lesson_id}")
 async def instructor_update_lesson(lesson_id: str, updates: dict, user: dict = Depends(get_current_user)):
     """Update a lesson"""
@@ -1425,6 +2294,7 @@ async def instructor_update_lesson(lesson_id: str, updates: dict, user: dict = D
         raise HTTPException(status_code=404, detail="Lesson not found")
     
     updated = await db.lessons.find_one({"id": lesson_id}, {"_id": 0})
+    await bump_course_version(updated.get("course_id"))
     return {"success": True, "lesson": updated}
 
 @router.delete("/instructor/lessons/{lesson_id}")
@@ -1433,8 +2303,10 @@ async def instructor_delete_lesson(lesson_id: str, user: dict = Depends(get_curr
     if user.get("role") not in ["admin", "instructor"]:
         raise HTTPException(status_code=403, detail="Instructor access required")
     
-    result = await db.lessons.delete_one({"id": lesson_id})
-    return {"success": True, "deleted": result.deleted_count > 0}
+    lesson = await db.lessons.find_one_and_delete({"id": lesson_id})
+    if lesson:
+        await remove_lesson_from_course(lesson)
+    return {"success": True, "deleted": lesson is not None}
 
 @router.delete("/instructor/courses/{course_id}")
 async def delete_course(course_id: str, user: dict = Depends(get_current_user)):
@@ -1444,12 +2316,23 @@ async def delete_course(course_id: str, user: dict = Depends(get_current_user)):
     
     # Delete course
     await db.courses.delete_one({"id": course_id})
+    invalidate_course_search()
+    _bundle_cache.pop(course_id, None)
     
     # Delete related data
-    await db.lessons.delete_many({"course_id": course_id})
-    await db.quizzes.delete_many({"course_id": course_id})
-    await db.enrollments.delete_many({"course_id": course_id})
-    await db.lesson_progress.delete_many({"course_id": course_id})
+    quiz_ids = await db.quizzes.distinct("id", {"course_id": course_id})
+    for quiz_id in quiz_ids:
+        _compiled_quizzes.pop(quiz_id, None)
+    await asyncio.gather(
+        db.lessons.delete_many({"course_id": course_id}),
+        db.quizzes.delete_many({"course_id": course_id}),
+        db.quiz_attempts.delete_many({"quiz_id": {"$in": quiz_ids}}),
+        db.quiz_stats.delete_many({"quiz_id": {"$in": quiz_ids}}),
+        db.quiz_item_stats.delete_many({"quiz_id": {"$in": quiz_ids}}),
+        db.enrollments.delete_many({"course_id": course_id}),
+        db.lesson_progress.delete_many({"course_id": course_id}),
+        db.course_analytics_snapshots.delete_many({"course_id": course_id})
+    )
     
     return {"success": True, "message": "Course and all related data deleted"}
 
@@ -1463,11 +2346,17 @@ async def update_quiz(quiz_id: str, updates: dict, user: dict = Depends(get_curr
     updates.pop("_id", None)
     updates["updated_at"] = now_iso()
     
-    result = await db.quizzes.update_one({"id": quiz_id}, {"$set": updates})
+    updates.pop("version", None)
+    for question in updates.get("questions") or []:
+        question.setdefault("id", generate_id())
+    
+    result = await db.quizzes.update_one({"id": quiz_id}, {"$set": updates, "$inc": {"version": 1}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    _compiled_quizzes.pop(quiz_id, None)
     
     updated = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+    await bump_course_version(updated.get("course_id"))
     return {"success": True, "quiz": updated}
 
 @router.delete("/instructor/quizzes/{quiz_id}")
@@ -1476,10 +2365,17 @@ async def delete_quiz(quiz_id: str, user: dict = Depends(get_current_user)):
     if user.get("role") not in ["admin", "instructor"]:
         raise HTTPException(status_code=403, detail="Instructor access required")
     
-    result = await db.quizzes.delete_one({"id": quiz_id})
-    await db.quiz_attempts.delete_many({"quiz_id": quiz_id})
+    quiz = await db.quizzes.find_one_and_delete({"id": quiz_id})
+    _compiled_quizzes.pop(quiz_id, None)
+    await asyncio.gather(
+        db.quiz_attempts.delete_many({"quiz_id": quiz_id}),
+        db.quiz_stats.delete_many({"quiz_id": quiz_id}),
+        db.quiz_item_stats.delete_many({"quiz_id": quiz_id})
+    )
+    if quiz:
+        await bump_course_version(quiz.get("course_id"))
     
-    return {"success": True, "deleted": result.deleted_count > 0}
+    return {"success": True, "deleted": quiz is not None}
 
 # ============== SCHOLARSHIP ROUTES ==============
 
@@ -1582,23 +2478,13 @@ async def update_scholarship_application(
     
     # If approved, enroll the user in the course
     if status == "approved":
-        existing_enrollment = await db.enrollments.find_one({
-            "user_id": application["user_id"],
-            "course_id": application["course_id"]
-        })
-        
-        if not existing_enrollment:
-            enrollment = {
-                "id": generate_id(),
-                "user_id": application["user_id"],
-                "course_id": application["course_id"],
-                "enrolled_at": now_iso(),
-                "scholarship_id": application_id,
-                "is_scholarship": True,
-                "completed_lessons": [],
-                "last_accessed": now_iso()
-            }
-            await db.enrollments.insert_one(enrollment)
+        await create_enrollment(
+            application["user_id"],
+            application["course_id"],
+            scholarship_id=application_id,
+            is_scholarship=True,
+            last_accessed=now_iso()
+        )
     
     return {"success": True, "status": status}
 
@@ -1708,6 +2594,7 @@ async def seed_education_data(user: dict = Depends(get_current_user)):
     for course in sample_courses:
         existing = await db.courses.find_one({"title": course["title"]})
         if not existing:
-            await db.courses.insert_one(course)
+            await db.courses.insert_one({**course, **COURSE_COUNTER_DEFAULTS})
+    invalidate_course_search()
     
     return {"success": True, "message": f"Seeded {len(sample_courses)} courses"}
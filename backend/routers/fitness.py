@@ -1,9 +1,20 @@
 """Kaizer Fit Router - Fitness tracking, activities, challenges"""
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+import asyncio
+import json
+import logging
 from .utils import db, generate_id, now_iso, get_current_user, calculate_calories, estimate_steps
+from .cubes import apply_fitness_day_to_cubes
+from .vitals import (
+    VITAL_METRICS, ROLLUP_RESOLUTIONS, LOG_VITAL_FIELDS, ensure_vitals_storage, migrate_vital_logs,
+    is_number, parse_sample_time, record_vital_samples, get_vital_series
+)
 
 router = APIRouter(prefix="/fitness", tags=["Kaizer Fit"])
 
@@ -25,6 +36,18 @@ class WearableSync(BaseModel):
     activities: List[dict]
     sync_date: str
 
+class WearableSample(BaseModel):
+    kind: str  # activity, heart_rate, spo2, stress, sleep
+    sample_id: str  # device-local id, stable across retries
+    recorded_at: str
+    date: Optional[str] = None  # YYYY-MM-DD, defaults to recorded_at's date
+    values: dict
+
+class WearableBatch(BaseModel):
+    device_id: str
+    device_type: str
+    samples: List[WearableSample]
+
 class CreateChallenge(BaseModel):
     title: str
     description: str
@@ -114,6 +137,38 @@ FITNESS_POINTS_CONFIG = {
     "max_daily_points": 200
 }
 
+async def reserve_daily_fitness_points(user_id: str, date: str, points: int) -> int:
+    """Atomically add up to `points` to the user's daily counter without passing the cap.
+    
+    Returns the number of points actually granted (0 once the cap is reached).
+    """
+    max_daily = FITNESS_POINTS_CONFIG["max_daily_points"]
+    current = {"$ifNull": ["$points", 0]}
+    pipeline = [
+        {"$set": {
+            "last_granted": {"$max": [0, {"$min": [points, {"$subtract": [max_daily, current]}]}]}
+        }},
+        {"$set": {
+            "points": {"$add": [current, "$last_granted"]},
+            "updated_at": now_iso()
+        }}
+    ]
+    
+    for attempt in range(2):
+        try:
+            counter = await db.fitness_points_daily.find_one_and_update(
+                {"user_id": user_id, "date": date},
+                pipeline,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return counter.get("last_granted", 0)
+        except DuplicateKeyError:
+            # Two first-of-the-day awards raced on the upsert; retry against the winner
+            if attempt:
+                raise
+    return 0
+
 async def award_fitness_points(user_id: str, activity_data: dict):
     """Award points based on fitness activity"""
     if not FITNESS_POINTS_CONFIG["enabled"]:
@@ -136,63 +191,197 @@ async def award_fitness_points(user_id: str, activity_data: dict):
     if calories > 0:
         points += (calories // 100) * FITNESS_POINTS_CONFIG["points_per_100_calories"]
     
-    # Check daily limit
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    daily_points = await db.fitness_points_log.aggregate([
-        {"$match": {"user_id": user_id, "date": today}},
-        {"$group": {"_id": None, "total": {"$sum": "$points"}}}
-    ]).to_list(1)
+    if points <= 0:
+        return 0
     
-    current_daily = daily_points[0]["total"] if daily_points else 0
-    remaining_daily = FITNESS_POINTS_CONFIG["max_daily_points"] - current_daily
-    points = min(points, remaining_daily)
+    # Reserve points against today's counter; the cap is enforced inside a single
+    # document update so concurrent activity ends cannot both overshoot it
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    points = await reserve_daily_fitness_points(user_id, today, points)
     
     if points > 0:
-        # Log the fitness points
-        await db.fitness_points_log.insert_one({
+        # The ledger entry is written first and is the record of the award; the wallet,
+        # transaction and lifetime total are credited from it
+        entry = {
             "id": generate_id(),
             "user_id": user_id,
             "points": points,
             "activity_type": activity_data.get("activity_type"),
+            "description": f"Fitness: {activity_data.get('activity_type', 'activity')} ({duration}min, {steps} steps)",
             "date": today,
+            "credited": [],
+            "credit_pending": True,
             "created_at": now_iso()
-        })
-        
-        # Add to user's wallet (normal points)
-        wallet = await db.wallets.find_one({"user_id": user_id})
-        if wallet:
-            await db.wallets.update_one(
-                {"user_id": user_id},
-                {"$inc": {"balance": points, "total_earned": points}}
-            )
-        else:
-            await db.wallets.insert_one({
+        }
+        try:
+            await db.fitness_points_log.insert_one(entry)
+        except Exception:
+            # Nothing was paid, so give the day's allowance back
+            await release_daily_fitness_points(user_id, today, points)
+            raise
+        await credit_fitness_award(entry)
+        invalidate_fitness_snapshot(user_id)
+    
+    return points
+
+async def release_daily_fitness_points(user_id: str, date: str, points: int):
+    await db.fitness_points_daily.update_one({"user_id": user_id, "date": date}, {"$inc": {"points": -points}})
+
+# Writes that follow a ledger entry; each is recorded in the entry's `credited` list once done
+FITNESS_CREDIT_STEPS = ("wallet", "transaction", "total")
+
+# A pending award younger than this may still be in flight in its request
+FITNESS_CREDIT_RETRY_AFTER_SECONDS = 300
+
+async def credit_fitness_award(entry: dict, steps=FITNESS_CREDIT_STEPS) -> bool:
+    """Apply an award's follow-up writes; failed ones stay pending for retry_pending_fitness_credits"""
+    user_id, points, created_at = entry["user_id"], entry["points"], entry["created_at"]
+    writes = {
+        # User's wallet (normal points), created on first award
+        "wallet": lambda: db.wallets.update_one(
+            {"user_id": user_id},
+            {
+                "$inc": {"balance": points, "total_earned": points},
+                "$setOnInsert": {
+                    "id": generate_id(),
+                    "privilege_balance": 0,
+                    "total_privilege_earned": 0,
+                    "total_spent": 0,
+                    "created_at": created_at
+                }
+            },
+            upsert=True
+        ),
+        # Keyed by the ledger entry, so a retry can't log it twice
+        "transaction": lambda: db.points_transactions.update_one(
+            {"source_id": entry["id"]},
+            {"$setOnInsert": {
                 "id": generate_id(),
+                "source_id": entry["id"],
                 "user_id": user_id,
-                "balance": points,
-                "privilege_balance": 0,
-                "total_earned": points,
-                "total_privilege_earned": 0,
-                "total_spent": 0,
-                "created_at": now_iso()
-            })
-        
-        # Add points transaction
-        await db.points_transactions.insert_one({
-            "id": generate_id(),
-            "user_id": user_id,
-            "points": points,
-            "point_type": "normal",
-            "transaction_type": "earned",
-            "description": f"Fitness: {activity_data.get('activity_type', 'activity')} ({duration}min, {steps} steps)",
-            "created_at": now_iso()
-        })
+                "points": points,
+                "point_type": "normal",
+                "transaction_type": "earned",
+                "description": entry.get("description"),
+                "created_at": created_at
+            }},
+            upsert=True
+        ),
+        # Lifetime fitness points counter
+        "total": lambda: db.fitness_points_totals.update_one(
+            {"user_id": user_id},
+            {"$inc": {"total": points}, "$set": {"updated_at": now_iso()}},
+            upsert=True
+        )
+    }
+    results = await asyncio.gather(*(writes[step]() for step in steps), return_exceptions=True)
+    done = [step for step, result in zip(steps, results) if not isinstance(result, Exception)]
+    failed = [result for result in results if isinstance(result, Exception)]
+    
+    update = {"$addToSet": {"credited": {"$each": done}}}
+    if not failed:
+        update["$set"] = {"credit_pending": False}
+    await db.fitness_points_log.update_one({"id": entry["id"]}, update)
+    if failed:
+        logging.error(f"Fitness award {entry['id']} left partly uncredited: {failed[0]}")
+    return not failed
+
+async def retry_pending_fitness_credits() -> int:
+    """Finish awards whose follow-up writes failed, redoing only the missing steps"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=FITNESS_CREDIT_RETRY_AFTER_SECONDS)).isoformat()
+    retried = 0
+    async for pending in db.fitness_points_log.find(
+        {"credit_pending": True, "created_at": {"$lt": cutoff}}, {"_id": 0, "id": 1}
+    ):
+        # Claimed first, so two workers starting together don't both credit it
+        entry = await db.fitness_points_log.find_one_and_update(
+            {"id": pending["id"], "credit_pending": True, "$or": [
+                {"credit_claimed_at": {"$exists": False}}, {"credit_claimed_at": {"$lt": cutoff}}
+            ]},
+            {"$set": {"credit_claimed_at": now_iso()}},
+            projection={"_id": 0}
+        )
+        if not entry:
+            continue
+        missing = [step for step in FITNESS_CREDIT_STEPS if step not in entry.get("credited", [])]
+        await credit_fitness_award(entry, missing)
+        retried += 1
+    return retried
+
+async def get_fitness_points_summary(user_id: str) -> dict:
+    """Today's, this week's and all-time fitness points, read from the counters"""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    week_start = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
     
-    return points
+    week_counters, totals = await asyncio.gather(
+        db.fitness_points_daily.find(
+            {"user_id": user_id, "date": {"$gte": week_start}},
+            {"_id": 0, "date": 1, "points": 1}
+        ).to_list(8),
+        db.fitness_points_totals.find_one({"user_id": user_id}, {"_id": 0, "total": 1})
+    )
+    
+    # Counters for points earned before they existed are seeded at startup (backfill_fitness_points_totals)
+    all_time = totals.get("total", 0) if totals else 0
+    
+    today_points = next((c.get("points", 0) for c in week_counters if c["date"] == today), 0)
+    
+    return {
+        "today": today_points,
+        "today_remaining": FITNESS_POINTS_CONFIG["max_daily_points"] - today_points,
+        "this_week": sum(c.get("points", 0) for c in week_counters),
+        "all_time": all_time
+    }
+
+async def backfill_fitness_points_totals():
+    """Seed lifetime counters from the points ledger, once, before awards rely on $inc alone"""
+    if await db.fitness_points_totals.find_one({"seeded_from_ledger": True}, {"_id": 1}):
+        return
+    if not await db.fitness_points_log.find_one({}, {"_id": 1}):
+        return
+    
+    seeded_at = now_iso()
+    ops = [
+        # $max: an award that raced ahead of the seed is already part of the ledger sum
+        UpdateOne(
+            {"user_id": row["_id"]},
+            {"$max": {"total": row["total"]}, "$set": {"seeded_from_ledger": True, "updated_at": seeded_at}},
+            upsert=True
+        )
+        async for row in db.fitness_points_log.aggregate([
+            {"$group": {"_id": "$user_id", "total": {"$sum": "$points"}}}
+        ])
+        if row["_id"]
+    ]
+    if ops:
+        await db.fitness_points_totals.bulk_write(ops, ordered=False)
+
+async def seed_daily_fitness_points():
+    """Raise today's daily counters to what the ledger already awarded today.
+    Awards logged before the counters existed would otherwise not count against the cap."""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    seeded_at = now_iso()
+    ops = [
+        UpdateOne(
+            {"user_id": row["_id"], "date": today},
+            {"$max": {"points": row["points"]}, "$setOnInsert": {"updated_at": seeded_at}},
+            upsert=True
+        )
+        async for row in db.fitness_points_log.aggregate([
+            {"$match": {"date": today}},
+            {"$group": {"_id": "$user_id", "points": {"$sum": "$points"}}}
+        ])
+        if row["_id"]
+    ]
+    if ops:
+        await db.fitness_points_daily.bulk_write(ops, ordered=False)
 
 async def update_daily_fitness_summary(user_id: str, date: str):
     """Update daily fitness summary"""
-    activities = await db.activities.find({"user_id": user_id, "date": date}, {"_id": 0}).to_list(100)
+    activities, step_rows = await asyncio.gather(
+        db.activities.find({"user_id": user_id, "date": date}, {"_id": 0}).to_list(100),
+        db.step_counts.find({"user_id": user_id, "date": date}, {"_id": 0, "steps": 1}).to_list(None)
+    )
     
     total_steps = sum(a.get("steps", 0) or 0 for a in activities)
     total_calories = sum(a.get("calories_burned", 0) for a in activities)
@@ -213,17 +402,259 @@ async def update_daily_fitness_summary(user_id: str, date: str):
         "total_distance_km": round(total_distance, 2),
         "activity_count": len(activities),
         "fitness_score": fitness_score,
+        # Steps counted towards the step goal: activities or the step counter, whichever is higher
+        "goal_steps": max([total_steps] + [row.get("steps", 0) or 0 for row in step_rows]),
         "updated_at": now_iso()
     }
     
-    await db.fitness_daily.update_one(
+    previous = await db.fitness_daily.find_one_and_update(
         {"user_id": user_id, "date": date},
         {"$set": summary},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
     )
     
+    await asyncio.gather(
+        apply_day_to_streaks(user_id, date, previous, summary),
+        apply_challenge_progress(user_id, date, previous or {}, summary),
+        apply_fitness_day_to_cubes(user_id, date, previous or {}, summary)
+    )
+    invalidate_fitness_snapshot(user_id)
+    
     return summary
 
+# ============== CHALLENGE PROGRESS ==============
+
+# Challenge type -> fitness_daily field summed for progress (None counts active days)
+CHALLENGE_METRICS = {
+    "steps": "total_steps",
+    "calories": "total_calories",
+    "distance": "total_distance_km",
+    "duration": "total_duration_minutes",
+    "active_days": None
+}
+
+def challenge_day_value(challenge_type: str, day: dict):
+    """A single fitness_daily row's contribution to a challenge of this type"""
+    field = CHALLENGE_METRICS[challenge_type]
+    if field is None:
+        return 1 if day.get("activity_count", 0) > 0 else 0
+    return day.get(field, 0) or 0
+
+async def apply_challenge_progress(user_id: str, date: str, previous: dict, summary: dict):
+    """Apply the change in one day's rollup to every challenge the user is in for that date"""
+    window = {"user_id": user_id, "start_date": {"$lte": date}, "end_date": {"$gte": date}}
+    updated = False
+    
+    for challenge_type in CHALLENGE_METRICS:
+        delta = challenge_day_value(challenge_type, summary) - challenge_day_value(challenge_type, previous)
+        if delta:
+            result = await db.challenge_participants.update_many(
+                {**window, "challenge_type": challenge_type},
+                {"$inc": {"progress": delta}, "$set": {"updated_at": now_iso()}}
+            )
+            updated = updated or result.modified_count > 0
+    
+    if updated:
+        await db.challenge_participants.update_many(
+            {"user_id": user_id, "completed": False, "$expr": {"$gte": ["$progress", "$target_value"]}},
+            {"$set": {"completed": True, "completed_at": now_iso()}}
+        )
+
+async def compute_challenge_progress(user_id: str, challenge: dict):
+    """Progress so far from the user's daily rollups within the challenge window"""
+    days = await db.fitness_daily.find(
+        {"user_id": user_id, "date": {"$gte": challenge["start_date"], "$lte": challenge["end_date"]}},
+        {"_id": 0, "activity_count": 1, "total_steps": 1, "total_calories": 1, "total_distance_km": 1, "total_duration_minutes": 1}
+    ).to_list(None)
+    return sum(challenge_day_value(challenge["challenge_type"], d) for d in days)
+
+async def migrate_challenge_participants():
+    """Move participants embedded in challenge documents into challenge_participants"""
+    async for challenge in db.challenges.find({"participants.0": {"$exists": True}}):
+        ops = [
+            UpdateOne(
+                {"challenge_id": challenge["id"], "user_id": p["user_id"]},
+                {"$setOnInsert": {
+                    "id": generate_id(),
+                    "challenge_id": challenge["id"],
+                    "user_id": p["user_id"],
+                    "user_name": p.get("user_name"),
+                    "challenge_type": challenge.get("challenge_type"),
+                    "target_value": challenge.get("target_value"),
+                    "start_date": challenge.get("start_date"),
+                    "end_date": challenge.get("end_date"),
+                    "progress": p.get("progress", 0),
+                    "completed": False,
+                    "joined_at": p.get("joined_at") or now_iso()
+                }},
+                upsert=True
+            )
+            for p in challenge["participants"] if p.get("user_id")
+        ]
+        if ops:
+            await db.challenge_participants.bulk_write(ops, ordered=False)
+        await db.challenges.update_one(
+            {"id": challenge["id"]},
+            {"$unset": {"participants": ""}, "$set": {"participant_count": len(ops)}}
+        )
+
+# ============== STREAK STATE & SNAPSHOT CACHE ==============
+
+DEFAULT_STEP_GOAL = 10000
+STREAK_LOOKBACK_DAYS = 366
+STEP_GOAL_MILESTONES = [3, 7, 14, 30]
+
+def summarize_streak(dates: List[str]) -> dict:
+    """Run length ending at the latest date, plus the longest run, for sorted YYYY-MM-DD dates"""
+    days = [datetime.strptime(d, "%Y-%m-%d").date() for d in dates]
+    current = longest = 0
+    for i, day in enumerate(days):
+        current = current + 1 if i and (day - days[i - 1]).days == 1 else 1
+        longest = max(longest, current)
+    return {"current": current, "longest": longest, "last_date": dates[-1] if dates else None, "total_days": len(days)}
+
+async def refresh_fitness_streaks(user_id: str):
+    """Recompute the user's activity and step-goal streak state from the daily rollups"""
+    start_date = (datetime.now(timezone.utc) - timedelta(days=STREAK_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    
+    goal_pref, daily_rows, step_rows = await asyncio.gather(
+        db.user_preferences.find_one({"user_id": user_id, "type": "step_goal"}, {"_id": 0, "value": 1}),
+        db.fitness_daily.find(
+            {"user_id": user_id, "date": {"$gte": start_date}},
+            {"_id": 0, "date": 1, "activity_count": 1, "total_steps": 1}
+        ).to_list(None),
+        db.step_counts.find(
+            {"user_id": user_id, "date": {"$gte": start_date}},
+            {"_id": 0, "date": 1, "steps": 1}
+        ).to_list(None)
+    )
+    step_goal = goal_pref.get("value", DEFAULT_STEP_GOAL) if goal_pref else DEFAULT_STEP_GOAL
+    
+    # Merge step data by date (take max)
+    steps_by_date = {}
+    for row in daily_rows:
+        steps_by_date[row["date"]] = max(steps_by_date.get(row["date"], 0), row.get("total_steps", 0) or 0)
+    for row in step_rows:
+        steps_by_date[row["date"]] = max(steps_by_date.get(row["date"], 0), row.get("steps", 0) or 0)
+    
+    activity = summarize_streak(sorted(r["date"] for r in daily_rows if r.get("activity_count", 0) > 0))
+    goal = summarize_streak(sorted(d for d, steps in steps_by_date.items() if steps >= step_goal))
+    
+    await db.fitness_streaks.update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "user_id": user_id,
+                "activity": activity,
+                "step_goal": step_goal,
+                "goal": goal,
+                "updated_at": now_iso()
+            },
+            "$max": {"longest_activity_streak": activity["longest"], "longest_goal_streak": goal["longest"]}
+        },
+        upsert=True
+    )
+
+def advance_streak(summary: Optional[dict], date: str, was_qualifying: Optional[bool], qualifies: bool) -> Optional[dict]:
+    """Streak summary after one day's qualification changed; None when only a rescan can tell"""
+    if was_qualifying is not None and was_qualifying == qualifies:
+        return summary
+    # A day dropping out can split a run, and a past day filling in can join two
+    if summary is None or was_qualifying is None or not qualifies:
+        return None
+    last = summary.get("last_date")
+    if last and date <= last:
+        return None
+    
+    day = datetime.strptime(date, "%Y-%m-%d").date()
+    follows = last and (day - datetime.strptime(last, "%Y-%m-%d").date()).days == 1
+    current = summary.get("current", 0) + 1 if follows else 1
+    return {
+        "current": current,
+        "longest": max(summary.get("longest", 0), current),
+        "last_date": date,
+        "total_days": summary.get("total_days", 0) + 1
+    }
+
+async def apply_day_to_streaks(user_id: str, date: str, previous: Optional[dict], summary: dict):
+    """Extend the stored streaks with one day's rollup, rescanning only when the change isn't an append"""
+    streaks = await db.fitness_streaks.find_one({"user_id": user_id}, {"_id": 0})
+    if streaks is None:
+        return await refresh_fitness_streaks(user_id)
+    
+    step_goal = streaks.get("step_goal", DEFAULT_STEP_GOAL)
+    previous = previous or {"activity_count": 0, "goal_steps": 0}
+    activity = advance_streak(
+        streaks.get("activity"), date, previous.get("activity_count", 0) > 0, summary["activity_count"] > 0
+    )
+    # Rollups written before goal_steps was stored can't say whether the day met the goal
+    previous_goal_steps = previous.get("goal_steps")
+    goal = advance_streak(
+        streaks.get("goal"), date,
+        None if previous_goal_steps is None else previous_goal_steps >= step_goal,
+        summary["goal_steps"] >= step_goal
+    )
+    if activity is None or goal is None:
+        return await refresh_fitness_streaks(user_id)
+    if activity is streaks.get("activity") and goal is streaks.get("goal"):
+        return
+    
+    result = await db.fitness_streaks.update_one(
+        # Guard against a concurrent update of the same state; the loser rescans
+        {"user_id": user_id, "updated_at": streaks.get("updated_at")},
+        {
+            "$set": {"activity": activity, "goal": goal, "updated_at": now_iso()},
+            "$max": {"longest_activity_streak": activity["longest"], "longest_goal_streak": goal["longest"]}
+        }
+    )
+    if result.matched_count == 0:
+        await refresh_fitness_streaks(user_id)
+
+# Per-user cache of /fitness/snapshot payloads, least recently used first. Writes that change
+# the snapshot invalidate the entry in this worker; the TTL bounds staleness across workers.
+SNAPSHOT_CACHE_TTL_SECONDS = 60
+SNAPSHOT_CACHE_MAX_USERS = 1000
+_snapshot_cache = {}
+
+def invalidate_fitness_snapshot(user_id: str):
+    _snapshot_cache.pop(user_id, None)
+
+@router.on_event("startup")
+async def ensure_fitness_indexes():
+    """Create indexes the fitness counters rely on"""
+    await db.fitness_points_daily.create_index([("user_id", 1), ("date", 1)], unique=True)
+    await db.fitness_points_totals.create_index("user_id", unique=True)
+    await db.fitness_streaks.create_index("user_id", unique=True)
+    await db.fitness_points_log.create_index("date")
+    await db.fitness_points_log.create_index(
+        "created_at", name="credit_pending_created_at", partialFilterExpression={"credit_pending": True}
+    )
+    await db.points_transactions.create_index(
+        "source_id", unique=True, partialFilterExpression={"source_id": {"$type": "string"}}
+    )
+    await backfill_fitness_points_totals()
+    await seed_daily_fitness_points()
+    await retry_pending_fitness_credits()
+    await db.fitness_daily.create_index([("user_id", 1), ("date", 1)])
+    await db.step_counts.create_index([("user_id", 1), ("date", 1)])
+    await db.challenge_participants.create_index([("challenge_id", 1), ("user_id", 1)], unique=True)
+    await db.challenge_participants.create_index([("challenge_id", 1), ("progress", -1), ("joined_at", 1)])
+    await db.challenge_participants.create_index([("user_id", 1), ("end_date", 1)])
+    await migrate_challenge_participants()
+    
+    # Batch-ingested wearable samples carry a device-scoped dedupe key
+    for collection, _ in WEARABLE_SAMPLE_KINDS.values():
+        await db[collection].create_index(
+            "dedupe_key", unique=True, partialFilterExpression={"dedupe_key": {"$exists": True}}
+        )
+    
+    await ensure_vitals_storage()
+    try:
+        await migrate_vital_logs()
+    except Exception as e:
+        logging.error(f"Vital log migration error: {e}")
+
 # ============== ROUTES ==============
 
 # Activity type configurations with MET values and icons
@@ -260,37 +691,9 @@ async def get_fitness_points_config():
 @router.get("/my-points")
 async def get_my_fitness_points(user: dict = Depends(get_current_user)):
     """Get user's fitness points summary"""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    
-    # Today's points
-    today_log = await db.fitness_points_log.aggregate([
-        {"$match": {"user_id": user["id"], "date": today}},
-        {"$group": {"_id": None, "total": {"$sum": "$points"}}}
-    ]).to_list(1)
-    today_points = today_log[0]["total"] if today_log else 0
-    
-    # This week's points
-    week_start = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
-    week_log = await db.fitness_points_log.aggregate([
-        {"$match": {"user_id": user["id"], "date": {"$gte": week_start}}},
-        {"$group": {"_id": None, "total": {"$sum": "$points"}}}
-    ]).to_list(1)
-    week_points = week_log[0]["total"] if week_log else 0
-    
-    # All time points from fitness
-    all_time_log = await db.fitness_points_log.aggregate([
-        {"$match": {"user_id": user["id"]}},
-        {"$group": {"_id": None, "total": {"$sum": "$points"}}}
-    ]).to_list(1)
-    all_time_points = all_time_log[0]["total"] if all_time_log else 0
+    summary = await get_fitness_points_summary(user["id"])
     
-    return {
-        "today": today_points,
-        "today_remaining": FITNESS_POINTS_CONFIG["max_daily_points"] - today_points,
-        "this_week": week_points,
-        "all_time": all_time_points,
-        "config": FITNESS_POINTS_CONFIG
-    }
+    return {**summary, "config": FITNESS_POINTS_CONFIG}
 
 
 # ============== LIVE ACTIVITY TRACKING ==============
@@ -610,7 +1013,7 @@ async def get_challenges(status: str = "active"):
     else:
         query = {"end_date": {"$lt": now}}
     
-    challenges = await db.challenges.find(query, {"_id": 0}).sort("start_date", 1).to_list(20)
+    challenges = await db.challenges.find(query, {"_id": 0, "participants": 0}).sort("start_date", 1).to_list(20)
     
     return challenges
 
@@ -620,6 +1023,9 @@ async def create_challenge(challenge: CreateChallenge, user: dict = Depends(get_
     if user.get("role") not in ["admin", "volunteer"]:
         raise HTTPException(status_code=403, detail="Only admins can create challenges")
     
+    if challenge.challenge_type not in CHALLENGE_METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid challenge type. Choose from: {list(CHALLENGE_METRICS)}")
+    
     new_challenge = {
         "id": generate_id(),
         "title": challenge.title,
@@ -628,7 +1034,7 @@ async def create_challenge(challenge: CreateChallenge, user: dict = Depends(get_
         "target_value": challenge.target_value,
         "start_date": challenge.start_date,
         "end_date": challenge.end_date,
-        "participants": [],
+        "participant_count": 0,
         "created_by": user["id"],
         "created_at": now_iso()
     }
@@ -641,26 +1047,78 @@ async def create_challenge(challenge: CreateChallenge, user: dict = Depends(get_
 @router.post("/challenges/{challenge_id}/join")
 async def join_challenge(challenge_id: str, user: dict = Depends(get_current_user)):
     """Join a challenge"""
-    challenge = await db.challenges.find_one({"id": challenge_id})
+    challenge = await db.challenges.find_one({"id": challenge_id}, {"_id": 0, "participants": 0})
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
-    if user["id"] in [p.get("user_id") for p in challenge.get("participants", [])]:
-        raise HTTPException(status_code=400, detail="Already joined")
+    progress = 0
+    if challenge.get("challenge_type") in CHALLENGE_METRICS:
+        progress = await compute_challenge_progress(user["id"], challenge)
     
     participant = {
+        "id": generate_id(),
+        "challenge_id": challenge_id,
         "user_id": user["id"],
         "user_name": user.get("name"),
-        "joined_at": now_iso(),
-        "progress": 0
+        "challenge_type": challenge.get("challenge_type"),
+        "target_value": challenge.get("target_value"),
+        "start_date": challenge.get("start_date"),
+        "end_date": challenge.get("end_date"),
+        "progress": progress,
+        "completed": progress >= (challenge.get("target_value") or 0) > 0,
+        "joined_at": now_iso()
     }
     
-    await db.challenges.update_one(
-        {"id": challenge_id},
-        {"$push": {"participants": participant}}
+    try:
+        await db.challenge_participants.insert_one(participant)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already joined")
+    
+    await db.challenges.update_one({"id": challenge_id}, {"$inc": {"participant_count": 1}})
+    
+    return {"success": True, "message": "Joined challenge", "progress": progress}
+
+@router.get("/challenges/{challenge_id}/leaderboard")
+async def get_challenge_leaderboard(challenge_id: str, limit: int = Query(20, le=100), user: dict = Depends(get_current_user)):
+    """Get a challenge's ranked participants and the caller's own rank"""
+    challenge = await db.challenges.find_one({"id": challenge_id}, {"_id": 0, "participants": 0})
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    
+    top, mine = await asyncio.gather(
+        db.challenge_participants.find(
+            {"challenge_id": challenge_id},
+            {"_id": 0, "user_id": 1, "user_name": 1, "progress": 1, "completed": 1}
+        ).sort([("progress", -1), ("joined_at", 1)]).limit(limit).to_list(limit),
+        db.challenge_participants.find_one(
+            {"challenge_id": challenge_id, "user_id": user["id"]},
+            {"_id": 0, "progress": 1, "completed": 1}
+        )
     )
     
-    return {"success": True, "message": "Joined challenge"}
+    my_rank = None
+    if mine:
+        my_rank = await db.challenge_participants.count_documents(
+            {"challenge_id": challenge_id, "progress": {"$gt": mine["progress"]}}
+        ) + 1
+    
+    leaderboard = [
+        {
+            "rank": i + 1,
+            "name": (p.get("user_name") or "Anonymous")[:2] + "***",
+            "progress": p["progress"],
+            "completed": p.get("completed", False),
+            "is_me": p["user_id"] == user["id"]
+        }
+        for i, p in enumerate(top)
+    ]
+    
+    return {
+        "challenge": challenge,
+        "leaderboard": leaderboard,
+        "my_progress": mine,
+        "my_rank": my_rank
+    }
 
 @router.get("/stats/ward")
 async def get_ward_stats():
@@ -717,6 +1175,155 @@ async def sync_wearable_data(sync_data: WearableSync, user: dict = Depends(get_c
     
     return {"success": True, "synced_activities": synced_count}
 
+# ============== BATCH WEARABLE INGESTION ==============
+
+MAX_BATCH_SAMPLES = 1000
+
+# Sample kind -> (collection, fields copied from sample values)
+WEARABLE_SAMPLE_KINDS = {
+    "activity": ("activities", ["activity_type", "duration_minutes", "distance_km", "calories_burned", "steps", "heart_rate_avg", "heart_rate_max"]),
+    "heart_rate": ("heart_rate_logs", ["current", "resting", "min", "max"]),
+    "spo2": ("spo2_logs", ["spo2"]),
+    "stress": ("stress_logs", ["stress_level"]),
+    "sleep": ("sleep_logs", ["duration_hours", "deep_sleep_mins", "light_sleep_mins", "rem_sleep_mins", "awake_mins", "sleep_score"])
+}
+
+# Sample kind -> {vital metric: value field} folded into the vitals rollups
+WEARABLE_VITAL_FIELDS = {
+    kind: LOG_VITAL_FIELDS[collection]
+    for kind, (collection, _) in WEARABLE_SAMPLE_KINDS.items() if collection in LOG_VITAL_FIELDS
+}
+
+# Sample fields holding text; every other field must be a number (or absent)
+WEARABLE_TEXT_FIELDS = {"activity_type"}
+
+def build_wearable_sample_doc(user_id: str, batch: WearableBatch, sample: WearableSample) -> dict:
+    """Build the stored document for one batch sample, raising ValueError if it is unusable"""
+    if sample.kind not in WEARABLE_SAMPLE_KINDS:
+        raise ValueError(f"Unknown sample kind: {sample.kind}")
+    
+    # Checked here rather than left to parse_sample_time, which would file it under "now"
+    try:
+        datetime.fromisoformat(sample.recorded_at.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("Invalid recorded_at. Use an ISO 8601 timestamp")
+    
+    date = sample.date or sample.recorded_at[:10]
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Invalid date. Use YYYY-MM-DD")
+    
+    _, fields = WEARABLE_SAMPLE_KINDS[sample.kind]
+    doc = {field: sample.values.get(field) for field in fields}
+    # Rollups and daily summaries $inc and add these; a string would fail after the sample is stored
+    for field, value in doc.items():
+        if field in WEARABLE_TEXT_FIELDS:
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{field} must be a string")
+        elif value is not None and not is_number(value):
+            raise ValueError(f"{field} must be a number")
+    
+    if sample.kind == "activity":
+        doc["activity_type"] = doc["activity_type"] or "walking"
+        doc["duration_minutes"] = doc["duration_minutes"] or 0
+        doc["source"] = batch.device_type
+    else:
+        doc["device_brand"] = batch.device_type
+    if sample.kind in WEARABLE_VITAL_FIELDS:
+        # Rolled up by ingest_wearable_samples; keeps migrate_vital_logs from folding it in again
+        doc["in_vitals"] = True
+    
+    doc.update({
+        "id": generate_id(),
+        "user_id": user_id,
+        "device_id": batch.device_id,
+        "sample_id": sample.sample_id,
+        "dedupe_key": f"{user_id}:{batch.device_id}:{sample.sample_id}",
+        "date": date,
+        "recorded_at": sample.recorded_at,
+        "created_at": now_iso()
+    })
+    return doc
+
+async def ingest_wearable_samples(user_id: str, batch: WearableBatch) -> List[dict]:
+    """Upsert a batch of samples, one unordered bulk write per collection.
+    
+    Samples are inserted only if their dedupe key is new, so a retried sync is a no-op.
+    Returns one status entry per sample, in request order.
+    """
+    results = [{"index": i, "sample_id": s.sample_id, "status": "created"} for i, s in enumerate(batch.samples)]
+    ops_by_collection = {}
+    
+    for i, sample in enumerate(batch.samples):
+        try:
+            doc = build_wearable_sample_doc(user_id, batch, sample)
+        except ValueError as e:
+            results[i].update({"status": "rejected", "error": str(e)})
+            continue
+        collection, _ = WEARABLE_SAMPLE_KINDS[sample.kind]
+        ops_by_collection.setdefault(collection, []).append(
+            (i, doc["date"], UpdateOne({"dedupe_key": doc["dedupe_key"]}, {"$setOnInsert": doc}, upsert=True))
+        )
+    
+    async def write_collection(collection: str, entries: list):
+        ops = [op for _, _, op in entries]
+        upserted = set()
+        failed = {}
+        try:
+            result = await db[collection].bulk_write(ops, ordered=False)
+            upserted = set(result.upserted_ids.keys())
+        except BulkWriteError as e:
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+            failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        
+        for op_index, (i, _, _) in enumerate(entries):
+            if op_index in failed:
+                # A concurrent retry of the same sample can lose the upsert race
+                if failed[op_index].get("code") == 11000:
+                    results[i]["status"] = "duplicate"
+                else:
+                    results[i].update({"status": "error", "error": failed[op_index].get("errmsg")})
+            elif op_index not in upserted:
+                results[i]["status"] = "duplicate"
+    
+    await asyncio.gather(*(write_collection(c, e) for c, e in ops_by_collection.items()))
+    
+    # Refresh each touched day's summary once for the whole batch
+    activity_dates = {
+        date for i, date, _ in ops_by_collection.get("activities", [])
+        if results[i]["status"] == "created"
+    }
+    
+    # Only newly created vitals are rolled up, so retries don't double count
+    vitals = [
+        {"metric": metric, "ts": parse_sample_time(sample.recorded_at), "value": sample.values.get(field)}
+        for sample, result in zip(batch.samples, results)
+        if sample.kind in WEARABLE_VITAL_FIELDS and result["status"] == "created"
+        for metric, field in WEARABLE_VITAL_FIELDS[sample.kind].items()
+    ]
+    
+    await asyncio.gather(
+        record_vital_samples(user_id, vitals, source=batch.device_type),
+        *(update_daily_fitness_summary(user_id, d) for d in activity_dates)
+    )
+    
+    return results
+
+@router.post("/sync/batch")
+async def sync_wearable_batch(batch: WearableBatch, user: dict = Depends(get_current_user)):
+    """Ingest a batch of wearable samples with device-scoped dedupe keys"""
+    if len(batch.samples) > MAX_BATCH_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SAMPLES} samples per batch")
+    
+    results = await ingest_wearable_samples(user["id"], batch)
+    
+    counts = {"created": 0, "duplicate": 0, "rejected": 0, "error": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    
+    return {"success": counts["error"] == 0, "counts": counts, "results": results}
+
 # ============== SMART DEVICE INTEGRATION ==============
 
 class PhoneSensorData(BaseModel):
@@ -889,6 +1496,9 @@ async def set_step_goal(data: StepGoalData, user: dict = Depends(get_current_use
         upsert=True
     )
     
+    await refresh_fitness_streaks(user["id"])
+    invalidate_fitness_snapshot(user["id"])
+    
     return {"success": True, "goal": data.goal}
 
 @router.post("/sync/smartwatch")
@@ -896,47 +1506,16 @@ async def sync_smartwatch_data(data: SmartWatchData, user: dict = Depends(get_cu
     """Sync comprehensive health data from smartwatch"""
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
-    # Store heart rate data
-    if data.heart_rate_current:
-        heart_rate_record = {
-            "id": generate_id(),
-            "user_id": user["id"],
-            "date": today,
-            "device_brand": data.device_brand,
-            "current": data.heart_rate_current,
-            "resting": data.heart_rate_resting,
-            "min": data.heart_rate_min,
-            "max": data.heart_rate_max,
-            "recorded_at": data.sync_timestamp,
-            "created_at": now_iso()
-        }
-        await db.heart_rate_logs.insert_one(heart_rate_record)
-    
-    # Store blood oxygen if available
-    if data.blood_oxygen:
-        spo2_record = {
-            "id": generate_id(),
-            "user_id": user["id"],
-            "date": today,
-            "spo2": data.blood_oxygen,
-            "device_brand": data.device_brand,
-            "recorded_at": data.sync_timestamp,
-            "created_at": now_iso()
-        }
-        await db.spo2_logs.insert_one(spo2_record)
-    
-    # Store stress level if available
-    if data.stress_level:
-        stress_record = {
-            "id": generate_id(),
-            "user_id": user["id"],
-            "date": today,
-            "stress_level": data.stress_level,
-            "device_brand": data.device_brand,
-            "recorded_at": data.sync_timestamp,
-            "created_at": now_iso()
-        }
-        await db.stress_logs.insert_one(stress_record)
+    # Store heart rate, blood oxygen and stress readings as vitals samples
+    sample_time = parse_sample_time(data.sync_timestamp)
+    await record_vital_samples(user["id"], [
+        {"metric": "heart_rate", "ts": sample_time, "value": data.heart_rate_current},
+        {"metric": "heart_rate_resting", "ts": sample_time, "value": data.heart_rate_resting},
+        {"metric": "heart_rate_min", "ts": sample_time, "value": data.heart_rate_min},
+        {"metric": "heart_rate_max", "ts": sample_time, "value": data.heart_rate_max},
+        {"metric": "spo2", "ts": sample_time, "value": data.blood_oxygen},
+        {"metric": "stress", "ts": sample_time, "value": data.stress_level}
+    ], source=f"smartwatch_{data.device_brand}")
     
     # Store sleep data if available
     if data.sleep_data:
@@ -1024,8 +1603,19 @@ async def get_heart_rate_history(days: int = 7, user: dict = Depends(get_current
         {"user_id": user["id"], "date": {"$gte": cutoff}},
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
+    series = await get_vital_series(user["id"], "heart_rate", days)
     
-    return {"records": records, "count": len(records)}
+    return {"records": records, "count": len(records), "series": series["points"], "resolution": series["resolution"]}
+
+@router.get("/health-data/vitals/{metric}")
+async def get_vital_history(metric: str, days: int = 7, resolution: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """Get min/max/avg history for a vital (heart_rate, heart_rate_resting/min/max, spo2, stress)"""
+    if metric not in VITAL_METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric. Choose from: {VITAL_METRICS}")
+    if resolution and resolution not in ROLLUP_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution. Choose from: {list(ROLLUP_RESOLUTIONS)}")
+    
+    return await get_vital_series(user["id"], metric, days, resolution)
 
 # ============== SLEEP TRACKING ==============
 
@@ -1536,10 +2126,26 @@ async def sync_single_device(device_id: str, user: dict = Depends(get_current_us
         "sync_result": sync_result
     }
 
-async def perform_device_sync(user_id: str, device: dict) -> dict:
-    """Perform actual sync with device API"""
+async def import_pending_device_data(user_id: str, device: dict, activities: list, pending_ids: list, progress: dict):
+    """Import activities and everything derived from them; runs to completion even past a sync timeout"""
+    await db.activities.insert_many(activities)
+    await db.pending_device_data.update_many(
+        {"_id": {"$in": pending_ids}},
+        {"$set": {"processed": True}}
+    )
+    progress["activities_imported"] = len(activities)
+    
+    await db.fitness_devices.update_one(
+        {"id": device["id"]},
+        {"$set": {"last_synced_at": now_iso()}}
+    )
+    for date in sorted({a["date"] for a in activities}):
+        await update_daily_fitness_summary(user_id, date)
+
+async def perform_device_sync(user_id: str, device: dict, progress: Optional[dict] = None) -> dict:
+    """Perform actual sync with device API; progress records imports that have committed"""
     device_type = device.get("device_type")
-    activities_imported = 0
+    progress = {} if progress is None else progress
     
     # Google Fit sync (if connected via OAuth)
     if device_type == "google_fit" and device.get("access_token"):
@@ -1549,75 +2155,85 @@ async def perform_device_sync(user_id: str, device: dict) -> dict:
             {"user_id": user_id, "device_type": "google_fit", "processed": False}
         ).to_list(100)
         
-        for data in pending:
-            # Import the activity
-            activity = {
-                "id": generate_id(),
-                "user_id": user_id,
-                "activity_type": data.get("activity_type", "walking"),
-                "duration_minutes": data.get("duration_minutes", 0),
-                "calories_burned": data.get("calories", 0),
-                "steps": data.get("steps", 0),
-                "distance_km": data.get("distance_km", 0),
-                "source": "google_fit",
-                "date": data.get("date", datetime.now(timezone.utc).strftime("%Y-%m-%d")),
-                "created_at": now_iso()
-            }
-            await db.activities.insert_one(activity)
-            await db.pending_device_data.update_one({"_id": data["_id"]}, {"$set": {"processed": True}})
-            activities_imported += 1
+        if pending:
+            # Import all pending activities, then mark them processed
+            activities = [
+                {
+                    "id": generate_id(),
+                    "user_id": user_id,
+                    "activity_type": data.get("activity_type", "walking"),
+                    "duration_minutes": data.get("duration_minutes", 0),
+                    "calories_burned": data.get("calories", 0),
+                    "steps": data.get("steps", 0),
+                    "distance_km": data.get("distance_km", 0),
+                    "source": "google_fit",
+                    "date": data.get("date", datetime.now(timezone.utc).strftime("%Y-%m-%d")),
+                    "created_at": now_iso()
+                }
+                for data in pending
+            ]
+            # Shielded so a sync timeout can't land between the insert and the rollups that follow it
+            await asyncio.shield(import_pending_device_data(
+                user_id, device, activities, [data["_id"] for data in pending], progress
+            ))
     
     # Samsung Health / Mi Band / Fitbit - similar pattern
     # These would need their respective APIs integrated
     
     return {
         "device_type": device_type,
-        "activities_imported": activities_imported,
+        "activities_imported": progress.get("activities_imported", 0),
         "synced_at": now_iso()
     }
 
-@router.post("/sync-all")
-async def sync_all_devices(user: dict = Depends(get_current_user)):
-    """Sync data from all connected devices"""
-    devices = await db.fitness_devices.find(
-        {"user_id": user["id"], "status": "connected"},
-        {"_id": 0}
-    ).to_list(10)
-    
-    total_activities = 0
-    sync_results = []
-    
-    for device in devices:
-        try:
-            result = await perform_device_sync(user["id"], device)
-            total_activities += result["activities_imported"]
-            sync_results.append({
-                "device": device["device_name"],
-                "status": "success",
-                "activities": result["activities_imported"]
-            })
-            
-            # Update sync timestamp
-            await db.fitness_devices.update_one(
-                {"id": device["id"]},
-                {"$set": {"last_synced_at": now_iso()}}
-            )
-        except Exception as e:
-            sync_results.append({
-                "device": device["device_name"],
-                "status": "error",
-                "error": str(e)
-            })
-    
-    # Log the sync
+DEVICE_SYNC_TIMEOUT_SECONDS = 20
+
+async def sync_device_with_timeout(user_id: str, device: dict) -> dict:
+    """Sync one device under its own timeout and return its result entry"""
+    progress = {}
+    try:
+        result = await asyncio.wait_for(perform_device_sync(user_id, device, progress), DEVICE_SYNC_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # An import that committed before the timeout still counts
+        return {"device": device["device_name"], "status": "timeout", "activities": progress.get("activities_imported", 0)}
+    except Exception as e:
+        return {"device": device["device_name"], "status": "error", "error": str(e), "activities": progress.get("activities_imported", 0)}
+    
+    # Update sync timestamp
+    await db.fitness_devices.update_one(
+        {"id": device["id"]},
+        {"$set": {"last_synced_at": now_iso()}}
+    )
+    return {"device": device["device_name"], "status": "success", "activities": result["activities_imported"]}
+
+async def log_device_sync(user_id: str, devices_synced: int, sync_results: list) -> int:
+    """Record a sync-all run and return the total activities imported"""
+    total_activities = sum(r["activities"] for r in sync_results)
     await db.device_syncs.insert_one({
         "id": generate_id(),
-        "user_id": user["id"],
+        "user_id": user_id,
         "synced_at": now_iso(),
-        "devices_synced": len(devices),
+        "devices_synced": devices_synced,
         "activities_imported": total_activities,
         "results": sync_results
     })
+    return total_activities
+
+async def get_syncable_devices(user_id: str) -> list:
+    return await db.fitness_devices.find(
+        {"user_id": user_id, "status": "connected"},
+        {"_id": 0}
+    ).to_list(10)
+
+@router.post("/sync-all")
+async def sync_all_devices(user: dict = Depends(get_current_user)):
+    """Sync data from all connected devices"""
+    devices = await get_syncable_devices(user["id"])
+    
+    # Devices sync concurrently, each bounded by its own timeout
+    sync_results = list(await asyncio.gather(*(sync_device_with_timeout(user["id"], d) for d in devices)))
+    
+    total_activities = await log_device_sync(user["id"], len(devices), sync_results)
     
     return {
         "message": "Sync complete",
@@ -1626,6 +2242,27 @@ async def sync_all_devices(user: dict = Depends(get_current_user)):
         "results": sync_results
     }
 
+@router.post("/sync-all/stream")
+async def sync_all_devices_stream(user: dict = Depends(get_current_user)):
+    """Sync all connected devices, streaming one NDJSON line per device as it finishes"""
+    devices = await get_syncable_devices(user["id"])
+    
+    async def stream():
+        sync_results = []
+        for finished in asyncio.as_completed([sync_device_with_timeout(user["id"], d) for d in devices]):
+            result = await finished
+            sync_results.append(result)
+            yield json.dumps({"type": "device", **result}) + "\n"
+        
+        total_activities = await log_device_sync(user["id"], len(devices), sync_results)
+        yield json.dumps({
+            "type": "complete",
+            "synced_count": len(devices),
+            "activities_imported": total_activities
+        }) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
 # ============== FITNESS PROFILE ONBOARDING ==============
 
@@ -1869,20 +2506,19 @@ async def delete_activity_record(activity_id: str, user: dict = Depends(get_curr
     
     return {"success": True, "message": "Activity deleted"}
 
-@router.get("/streaks")
-async def get_user_streaks(user: dict = Depends(get_current_user)):
-    """Get user's current streak and streak history"""
+async def get_activity_streak_summary(user_id: str) -> dict:
+    """Current and longest activity streak from logged activities and completed live sessions"""
     today = datetime.now(timezone.utc).date()
     
     # Get all activity dates for the user
     activities = await db.fitness_activities.find(
-        {"user_id": user["id"]},
+        {"user_id": user_id},
         {"_id": 0, "date": 1}
     ).to_list(365)
     
     # Also count live activities
     live_activities = await db.fitness_live_sessions.find(
-        {"user_id": user["id"], "status": "completed"},
+        {"user_id": user_id, "status": "completed"},
         {"_id": 0, "ended_at": 1}
     ).to_list(365)
     
@@ -1950,11 +2586,14 @@ async def get_user_streaks(user: dict = Depends(get_current_user)):
         "streak_status": "active" if current_streak > 0 else "broken"
     }
 
-@router.get("/step-goal-streak")
-async def get_step_goal_streak(user: dict = Depends(get_current_user)):
-    """Get user's step goal streak - days hitting daily step goal in a row"""
+@router.get("/streaks")
+async def get_user_streaks(user: dict = Depends(get_current_user)):
+    """Get user's current streak and streak history"""
+    return await get_activity_streak_summary(user["id"])
+
+async def get_step_goal_streak_summary(user_id: str) -> dict:
+    """Days in a row the user hit their daily step goal, with milestone progress"""
     today = datetime.now(timezone.utc).date()
-    user_id = user["id"]
     
     # Get user's step goal (default 10000)
     goal_pref = await db.user_preferences.find_one(
@@ -2035,10 +2674,9 @@ async def get_step_goal_streak(user: dict = Depends(get_current_user)):
     total_steps = sum(steps_by_date.values())
     
     # Next milestone calculation
-    milestones = [3, 7, 14, 30]
     next_milestone = None
     days_to_next = None
-    for m in milestones:
+    for m in STEP_GOAL_MILESTONES:
         if current_goal_streak < m:
             next_milestone = m
             days_to_next = m - current_goal_streak
@@ -2062,12 +2700,16 @@ async def get_step_goal_streak(user: dict = Depends(get_current_user)):
         }
     }
 
-@router.get("/badges")
-async def get_user_badges(user: dict = Depends(get_current_user)):
-    """Get all badges - earned and locked"""
+@router.get("/step-goal-streak")
+async def get_step_goal_streak(user: dict = Depends(get_current_user)):
+    """Get user's step goal streak - days hitting daily step goal in a row"""
+    return await get_step_goal_streak_summary(user["id"])
+
+async def get_badges_summary(user_id: str) -> dict:
+    """Every badge, earned ones first, with the user's earned_at"""
     # Get user's earned badges
     earned_badges = await db.user_badges.find(
-        {"user_id": user["id"]},
+        {"user_id": user_id},
         {"_id": 0}
     ).to_list(100)
     
@@ -2095,6 +2737,11 @@ async def get_user_badges(user: dict = Depends(get_current_user)):
         "total_count": len(BADGES)
     }
 
+@router.get("/badges")
+async def get_user_badges(user: dict = Depends(get_current_user)):
+    """Get all badges - earned and locked"""
+    return await get_badges_summary(user["id"])
+
 @router.post("/badges/check")
 async def check_and_award_badges(user: dict = Depends(get_current_user)):
     """Check if user has earned any new badges"""
@@ -2282,6 +2929,9 @@ async def check_and_award_badges(user: dict = Depends(get_current_user)):
         awarded.append(BADGES[badge_id])
         existing_ids.add(badge_id)  # Prevent duplicates
     
+    if awarded:
+        invalidate_fitness_snapshot(user_id)
+    
     return {
         "new_badges": awarded,
         "new_badges_count": len(awarded)
@@ -2385,3 +3035,84 @@ async def get_weekly_summary(user: dict = Depends(get_current_user)):
     
     return {"days": days}
 
+
+# ============== HOME SNAPSHOT ==============
+
+async def build_fitness_snapshot(user: dict) -> dict:
+    """Build the fitness home screen from the daily rollups and the streak, badge and points summaries"""
+    user_id = user["id"]
+    now = datetime.now(timezone.utc)
+    today = now.strftime("%Y-%m-%d")
+    monday = now - timedelta(days=now.weekday())
+    range_start = min(monday, now - timedelta(days=7)).strftime("%Y-%m-%d")
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    daily_rows, streak, step_goal_streak, points, badges, sleep_record, heart_rate = await asyncio.gather(
+        db.fitness_daily.find(
+            {"user_id": user_id, "date": {"$gte": range_start}}, {"_id": 0}
+        ).sort("date", 1).to_list(None),
+        get_activity_streak_summary(user_id),
+        get_step_goal_streak_summary(user_id),
+        get_fitness_points_summary(user_id),
+        get_badges_summary(user_id),
+        db.sleep_logs.find_one({"user_id": user_id, "date": today}, {"_id": 0, "total_hours": 1, "sleep_score": 1}),
+        db.vital_rollups.find_one(
+            {"user_id": user_id, "metric": "heart_rate", "resolution": "1d", "bucket": today_start},
+            {"_id": 0, "sum": 1, "count": 1}
+        )
+    )
+    
+    by_date = {row["date"]: row for row in daily_rows}
+    today_row = by_date.get(today, {})
+    week_start = (now - timedelta(days=7)).strftime("%Y-%m-%d")
+    
+    day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    week_days = []
+    for i in range(7):
+        date_str = (monday + timedelta(days=i)).strftime("%Y-%m-%d")
+        week_days.append({
+            "day": day_names[i],
+            "date": date_str,
+            "steps": by_date.get(date_str, {}).get("total_steps", 0),
+            "active": date_str <= today
+        })
+    
+    return {
+        "today": {
+            "steps": today_row.get("total_steps", 0),
+            "calories": today_row.get("total_calories", 0),
+            "distance": round(today_row.get("total_distance_km", 0), 1),
+            "activeMinutes": today_row.get("total_duration_minutes", 0),
+            "fitness_score": today_row.get("fitness_score", 0),
+            "sleepHours": sleep_record.get("total_hours", 0) if sleep_record else 0,
+            "sleepScore": sleep_record.get("sleep_score", 0) if sleep_record else 0,
+            "heartRateAvg": round(heart_rate["sum"] / heart_rate["count"]) if heart_rate and heart_rate.get("count") else 72
+        },
+        "weekly": [row for row in daily_rows if row["date"] >= week_start],
+        "week_days": week_days,
+        # Same payloads as /streaks, /step-goal-streak and /badges
+        "streak": streak,
+        "step_goal_streak": step_goal_streak,
+        "points": points,
+        "badges": badges,
+        "generated_at": now_iso()
+    }
+
+@router.get("/snapshot")
+async def get_fitness_snapshot(user: dict = Depends(get_current_user)):
+    """Everything the fitness home screen needs in one call"""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    cached = _snapshot_cache.pop(user["id"], None)
+    if cached and cached["date"] == today and cached["expires_at"] > datetime.now(timezone.utc):
+        _snapshot_cache[user["id"]] = cached
+        return cached["snapshot"]
+    
+    snapshot = await build_fitness_snapshot(user)
+    if len(_snapshot_cache) >= SNAPSHOT_CACHE_MAX_USERS:
+        _snapshot_cache.pop(next(iter(_snapshot_cache)))
+    _snapshot_cache[user["id"]] = {
+        "date": today,
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=SNAPSHOT_CACHE_TTL_SECONDS),
+        "snapshot": snapshot
+    }
+    return snapshot
@@ -4,14 +4,18 @@ from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
+from pymongo import UpdateOne
 import os
+import asyncio
+import logging
 import httpx
 from dotenv import load_dotenv
-from .utils import db, generate_id, now_iso, get_current_user
+from .utils import db, generate_id, now_iso, get_current_user, cancel_task
 
 load_dotenv()
 
 router = APIRouter(prefix="/fitness/google-fit", tags=["Google Fit"])
+logger = logging.getLogger(__name__)
 
 # Google Fit OAuth Config
 GOOGLE_FIT_CLIENT_ID = os.environ.get("GOOGLE_FIT_CLIENT_ID")
@@ -21,7 +25,12 @@ GOOGLE_FIT_REDIRECT_URI = os.environ.get("GOOGLE_FIT_REDIRECT_URI")
 # Google OAuth endpoints
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_FIT_API_URL = "https://www.googleapis.com/fitness/v1/users/me"
+GOOGLE_FIT_API_URL = os.environ.get("GOOGLE_FIT_API_URL", "https://www.googleapis.com/fitness/v1/users/me")
+
+# Background sync: interval (0 disables), parallel users, and first-sync window
+GOOGLE_FIT_SYNC_INTERVAL_MINUTES = int(os.environ.get("GOOGLE_FIT_SYNC_INTERVAL_MINUTES", "30"))
+GOOGLE_FIT_SYNC_CONCURRENCY = int(os.environ.get("GOOGLE_FIT_SYNC_CONCURRENCY", "8"))
+GOOGLE_FIT_SYNC_LOOKBACK_DAYS = 30
 
 # Scopes for Google Fit
 GOOGLE_FIT_SCOPES = [
@@ -614,3 +623,184 @@ async def get_google_fit_summary(user: dict = Depends(get_current_user)):
             
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Google Fit API error: {str(e)}")
+
+# ============== Incremental Background Sync ==============
+
+DAY_MS = 86400000
+
+# Data types fetched together in one aggregate request, in response dataset order
+SYNC_DATA_TYPES = [
+    ("com.google.step_count.delta", "steps"),
+    ("com.google.calories.expended", "calories"),
+    ("com.google.heart_rate.bpm", "heart_rate"),
+    ("com.google.distance.delta", "distance")
+]
+
+async def fetch_google_fit_buckets(client: httpx.AsyncClient, access_token: str, start_ms: int, end_ms: int) -> list:
+    """Fetch daily buckets for every sync data type in a single aggregate request"""
+    response = await client.post(
+        f"{GOOGLE_FIT_API_URL}/dataset:aggregate",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "aggregateBy": [{"dataTypeName": name} for name, _ in SYNC_DATA_TYPES],
+            "bucketByTime": {"durationMillis": DAY_MS},
+            "startTimeMillis": start_ms,
+            "endTimeMillis": end_ms
+        }
+    )
+    data = response.json()
+    
+    if "error" in data:
+        raise ValueError(data["error"].get("message", "Google Fit API error"))
+    
+    return data.get("bucket", [])
+
+def parse_google_fit_buckets(buckets: list) -> List[dict]:
+    """Turn aggregate buckets into fitness_data rows ({date, type, value, ...})"""
+    rows = []
+    for bucket in buckets:
+        date = datetime.fromtimestamp(int(bucket["startTimeMillis"]) / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+        
+        for (_, data_type), dataset in zip(SYNC_DATA_TYPES, bucket.get("dataset", [])):
+            points = [
+                [v.get("intVal", v.get("fpVal", 0)) for v in point.get("value", [])]
+                for point in dataset.get("point", [])
+            ]
+            if not points:
+                continue
+            
+            if data_type == "heart_rate":
+                # Aggregated heart rate points carry [avg, max, min]
+                avgs = [p[0] for p in points if p]
+                rows.append({
+                    "date": date,
+                    "type": data_type,
+                    "value": int(sum(avgs) / len(avgs)),
+                    "max": int(max(p[1] if len(p) > 1 else p[0] for p in points if p)),
+                    "min": int(min(p[2] if len(p) > 2 else p[0] for p in points if p))
+                })
+            else:
+                rows.append({"date": date, "type": data_type, "value": int(sum(sum(p) for p in points))})
+    return rows
+
+async def sync_google_fit_user(client: httpx.AsyncClient, user_id: str) -> dict:
+    """Fetch buckets newer than the user's watermark and upsert them in one bulk write"""
+    access_token = await get_valid_token(user_id)
+    if not access_token:
+        return {"user_id": user_id, "status": "not_connected", "rows": 0}
+    
+    now = datetime.now(timezone.utc)
+    end_ms = int(now.timestamp() * 1000)
+    earliest_ms = end_ms - GOOGLE_FIT_SYNC_LOOKBACK_DAYS * DAY_MS
+    
+    state = await db.google_fit_sync_state.find_one({"user_id": user_id}, {"_id": 0})
+    start_ms = max(state["watermark_ms"], earliest_ms) if state else earliest_ms
+    # Align to whole days so bucket dates line up with earlier syncs
+    start_ms -= start_ms % DAY_MS
+    
+    rows = parse_google_fit_buckets(await fetch_google_fit_buckets(client, access_token, start_ms, end_ms))
+    
+    if rows:
+        updated_at = now_iso()
+        await db.fitness_data.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "date": row["date"], "type": row["type"]},
+                {"$set": {**row, "source": "google_fit", "updated_at": updated_at}},
+                upsert=True
+            )
+            for row in rows
+        ], ordered=False)
+    
+    # Today's bucket is still filling up, so the next sync starts again from it
+    await db.google_fit_sync_state.update_one(
+        {"user_id": user_id},
+        {"$set": {"watermark_ms": end_ms - end_ms % DAY_MS, "last_synced_at": now_iso()}},
+        upsert=True
+    )
+    
+    return {"user_id": user_id, "status": "success", "rows": len(rows)}
+
+async def sync_all_google_fit_users() -> dict:
+    """Sync every connected user with bounded concurrency"""
+    semaphore = asyncio.Semaphore(GOOGLE_FIT_SYNC_CONCURRENCY)
+    
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def sync_one(user_id: str):
+            async with semaphore:
+                try:
+                    return await sync_google_fit_user(client, user_id)
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.warning(f"Google Fit sync failed for {user_id}: {e}")
+                except Exception:
+                    # One user's bad data or a failed write must not abort everyone else's sync
+                    logger.exception(f"Google Fit sync error for {user_id}")
+                return {"user_id": user_id, "status": "error", "rows": 0}
+        
+        user_ids = [t["user_id"] async for t in db.google_fit_tokens.find({}, {"_id": 0, "user_id": 1})]
+        results = await asyncio.gather(*(sync_one(u) for u in user_ids))
+    
+    return {
+        "users": len(results),
+        "synced": sum(1 for r in results if r["status"] == "success"),
+        "rows": sum(r["rows"] for r in results)
+    }
+
+async def google_fit_sync_loop():
+    """Run the all-users sync on a fixed interval"""
+    while True:
+        try:
+            result = await sync_all_google_fit_users()
+            logger.info(f"Google Fit sync: {result}")
+        except Exception as e:
+            logger.error(f"Google Fit sync loop error: {e}")
+        await asyncio.sleep(GOOGLE_FIT_SYNC_INTERVAL_MINUTES * 60)
+
+_google_fit_sync_task = None
+
+@router.on_event("startup")
+async def start_google_fit_sync():
+    """Start the background sync task"""
+    global _google_fit_sync_task
+    await db.google_fit_sync_state.create_index("user_id", unique=True)
+    if GOOGLE_FIT_SYNC_INTERVAL_MINUTES > 0:
+        _google_fit_sync_task = asyncio.create_task(google_fit_sync_loop())
+
+@router.on_event("shutdown")
+async def stop_google_fit_sync():
+    """Stop the background sync task"""
+    await cancel_task(_google_fit_sync_task)
+
+@router.post("/sync")
+async def sync_google_fit_now(user: dict = Depends(get_current_user)):
+    """Incrementally sync the current user's Google Fit data"""
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            result = await sync_google_fit_user(client, user["id"])
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Google Fit API error: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result["status"] == "not_connected":
+        raise HTTPException(status_code=401, detail="Google Fit not connected")
+    
+    return {"success": True, "rows_synced": result["rows"]}
+
+@router.get("/synced")
+async def get_synced_google_fit_data(days: int = 7, user: dict = Depends(get_current_user)):
+    """Get Google Fit data already synced into our database (no call to Google)"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    rows = await db.fitness_data.find(
+        {"user_id": user["id"], "source": "google_fit", "date": {"$gte": cutoff}, "type": {"$in": [t for _, t in SYNC_DATA_TYPES]}},
+        {"_id": 0, "user_id": 0}
+    ).sort("date", 1).to_list(len(SYNC_DATA_TYPES) * (days + 1))
+    
+    state = await db.google_fit_sync_state.find_one({"user_id": user["id"]}, {"_id": 0})
+    
+    return {
+        "source": "google_fit",
+        "days": days,
+        "data": rows,
+        "last_synced_at": state.get("last_synced_at") if state else None
+    }
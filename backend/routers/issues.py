@@ -3,7 +3,9 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone
+from pymongo import ReturnDocument
 from .utils import db, generate_id, now_iso, get_current_user
+from .cubes import bump_cube, CLOSED_ISSUE_STATUSES
 
 router = APIRouter(prefix="/issues", tags=["Issues"])
 
@@ -76,6 +78,8 @@ async def create_issue(issue: CreateIssue, user: dict = Depends(get_current_user
     await db.issues.insert_one(new_issue)
     new_issue.pop("_id", None)
     
+    await bump_cube(new_issue["reporter_colony"], "issues_reported")
+    
     return new_issue
 
 @router.get("")
@@ -148,17 +152,22 @@ async def update_issue_status(issue_id: str, update: UpdateIssueStatus, user: di
         "by_name": user.get("name")
     }
     
-    result = await db.issues.update_one(
+    previous = await db.issues.find_one_and_update(
         {"id": issue_id},
         {
             "$set": {"status": update.status, "updated_at": now_iso()},
             "$push": {"history": history_entry}
-        }
+        },
+        projection={"_id": 0, "status": 1, "reporter_colony": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Issue not found")
     
+    if update.status in CLOSED_ISSUE_STATUSES and previous.get("status") not in CLOSED_ISSUE_STATUSES:
+        await bump_cube(previous.get("reporter_colony"), "issues_closed")
+    
     return {"success": True, "status": update.status}
 
 @router.get("/stats/summary")
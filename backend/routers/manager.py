@@ -3,7 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, List
 from .utils import db, generate_id, now_iso, get_current_user
-from datetime import datetime
+from .cubes import bump_cube, query_colony_cubes, CLOSED_ISSUE_STATUSES, CUBE_METRICS
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/manager", tags=["Manager"])
 
@@ -109,8 +110,34 @@ async def update_grievance(
         }
     )
     
+    if action.action in CLOSED_ISSUE_STATUSES and grievance.get("status") not in CLOSED_ISSUE_STATUSES:
+        await bump_cube(grievance.get("reporter_colony"), "issues_closed")
+    
     return {"success": True, "message": f"Grievance {action.action}"}
 
+@router.get("/trends")
+async def get_area_trends(days: int = 30, manager: dict = Depends(get_current_manager)):
+    """Get daily activity, issue and enrollment trends for manager's area"""
+    area = manager.get("assigned_area", "")
+    end_date = datetime.utcnow().strftime("%Y-%m-%d")
+    start_date = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    # Same colony match as /stats, so both count the same members
+    cells = await query_colony_cubes(start_date, end_date, colony_pattern=area)
+    
+    series = {metric: {} for metric in CUBE_METRICS}
+    for cell in cells:
+        by_date = series[cell["metric"]]
+        by_date[cell["date"]] = by_date.get(cell["date"], 0) + cell["value"]
+    
+    return {
+        "area": area,
+        "start_date": start_date,
+        "end_date": end_date,
+        "series": series,
+        "totals": {metric: sum(values.values()) for metric, values in series.items()}
+    }
+
 @router.get("/enrollments")
 async def get_enrollments(manager: dict = Depends(get_current_manager)):
     """Get course enrollments for manager's area"""
@@ -1,17 +1,29 @@
 """News Router - Multi-source news aggregation with AI rephrasing and admin push"""
-from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks, Response
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timezone
 import httpx
 from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
 import logging
+import io
 import time
 import re
 import os
 import asyncio
 from dotenv import load_dotenv
-from .utils import db, generate_id, now_iso, get_current_user
+from .utils import db, generate_id, now_iso, get_current_user, cancel_task
+from .news_ingest import fetch_all_feeds, merge_articles, article_upserts, feed_state_updates
+from .news_rephrase import rephrase_articles, ensure_rephrase_cache_indexes
+from .news_dedupe import CLUSTER_FIELDS, cluster_ingested_articles, ensure_news_dedupe_indexes
+from .news_feed import (
+    NEWS_FEED_CACHE_SIZE, get_feed, rendered_feed, news_changed, invalidate_news_feeds, normalize_categories,
+    ensure_news_feed_indexes, migrate_news_categories
+)
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 load_dotenv()
 
@@ -49,44 +61,11 @@ def get_time_ago(date_str: str) -> str:
 # ============== AI REPHRASING SETUP ==============
 
 async def rephrase_with_ai(title: str, summary: str) -> Dict:
-    """Use AI to rephrase news article for originality"""
-    openai_key = os.environ.get("OPENAI_API_KEY")
-    if not openai_key:
-        return {"title": title, "summary": summary}
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {openai_key}", "Content-Type": "application/json"},
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": "You are a professional news editor. Rephrase the given news title and summary to be original while preserving all key facts. Keep it concise and professional. Output format: TITLE: [rephrased title]\nSUMMARY: [rephrased summary in 2-3 sentences]"},
-                        {"role": "user", "content": f"Rephrase this news:\nTitle: {title}\nSummary: {summary}"}
-                    ],
-                    "max_tokens": 500
-                },
-                timeout=30.0
-            )
-            resp.raise_for_status()
-            response = resp.json()["choices"][0]["message"]["content"]
-        
-        # Parse response
-        lines = response.strip().split('\n')
-        rephrased_title = title
-        rephrased_summary = summary
-        
-        for line in lines:
-            if line.startswith("TITLE:"):
-                rephrased_title = line.replace("TITLE:", "").strip()
-            elif line.startswith("SUMMARY:"):
-                rephrased_summary = line.replace("SUMMARY:", "").strip()
-        
-        return {"title": rephrased_title, "summary": rephrased_summary}
-    except Exception as e:
-        logging.error(f"AI rephrase error: {str(e)}")
-        return {"title": title, "summary": summary}
+    """Use AI to rephrase news article for originality (cached; see news_rephrase)"""
+    return (await rephrase_articles([{"title": title, "summary": summary}]))[0]
+
+# Articles rephrased per on-demand scrape
+AI_REPHRASE_LIMIT = 5
 
 # ============== NEWS SOURCES CONFIG ==============
 
@@ -156,10 +135,10 @@ RSS_FEEDS = {
 
 # Telugu news sources for web scraping - Prioritize Siasat
 TELUGU_SOURCES = {
-    "siasat": {"name": "Siasat", "url": "https://www.siasat.com/hyderabad/", "selector": "article", "priority": 1},
-    "siasat_telangana": {"name": "Siasat Telangana", "url": "https://www.siasat.com/telangana/", "selector": "article", "priority": 1},
-    "eenadu": {"name": "Eenadu", "url": "https://www.eenadu.net/telangana", "selector": ".news-item", "priority": 2},
-    "sakshi": {"name": "Sakshi", "url": "https://www.sakshi.com/telugu/telangana", "selector": ".story-card", "priority": 3},
+    "siasat": {"name": "Siasat", "url": "https://www.siasat.com/hyderabad/", "selector": "article", "priority": 1, "categories": ["city"]},
+    "siasat_telangana": {"name": "Siasat Telangana", "url": "https://www.siasat.com/telangana/", "selector": "article", "priority": 1, "categories": ["state"]},
+    "eenadu": {"name": "Eenadu", "url": "https://www.eenadu.net/telangana", "selector": ".news-item", "priority": 2, "categories": ["local", "state"]},
+    "sakshi": {"name": "Sakshi", "url": "https://www.sakshi.com/telugu/telangana", "selector": ".story-card", "priority": 3, "categories": ["local", "state"]},
 }
 
 # YouTube Shorts channel to fetch videos from
@@ -183,6 +162,13 @@ class AdminNewsPush(BaseModel):
     priority: int = 1  # 1=highest
     content_type: str = "text"  # "text" or "video"
 
+class AdminNewsBulkItem(AdminNewsPush):
+    idempotency_key: str
+    source: Optional[str] = None
+
+class AdminNewsBulkPush(BaseModel):
+    articles: List[AdminNewsBulkItem]
+
 class AdminNewsUpdate(BaseModel):
     title: Optional[str] = None
     title_te: Optional[str] = None
@@ -197,6 +183,36 @@ class AdminNewsUpdate(BaseModel):
 
 # ============== HELPER FUNCTIONS ==============
 
+# Articles accepted per bulk push
+MAX_BULK_NEWS = 100
+
+def build_admin_news(news: AdminNewsPush, user: dict) -> Dict:
+    """admin_news document for a pushed article"""
+    return {
+        "id": generate_id(),
+        "title": news.title,
+        "title_te": news.title_te or news.title,
+        "summary": news.summary,
+        "summary_te": news.summary_te or news.summary,
+        "category": news.category,
+        "categories": normalize_categories(news.category),
+        "category_label": NEWS_CATEGORIES[news.category]["en"],
+        "category_label_te": NEWS_CATEGORIES[news.category]["te"],
+        "image": news.image_url,
+        "video_url": news.video_url,
+        "content_type": news.content_type,
+        "link": news.link,
+        "is_pinned": news.is_pinned,
+        "priority": news.priority,
+        "is_active": True,
+        "is_admin_pushed": True,
+        "source": "My Dammaiguda Admin",
+        "pushed_by": user["id"],
+        "pushed_by_name": user.get("name"),
+        "published_at": now_iso(),
+        "created_at": now_iso()
+    }
+
 async def fetch_youtube_shorts(channel_url: str = YOUTUBE_SHORTS_CHANNEL, limit: int = 10) -> List[Dict]:
     """Fetch latest YouTube Shorts from Kaizer Nigha channel"""
     shorts = []
@@ -231,10 +247,194 @@ async def fetch_youtube_shorts(channel_url: str = YOUTUBE_SHORTS_CHANNEL, limit:
     
     return shorts
 
+def feed_source_name(url: str) -> str:
+    """Publisher name for a feed URL"""
+    if "thehindu" in url:
+        return "The Hindu"
+    elif "timesofindia" in url:
+        return "Times of India"
+    elif "deccan" in url:
+        return "Deccan Chronicle"
+    elif "hansindia" in url:
+        return "The Hans India"
+    elif "telangana" in url.lower():
+        return "Telangana Today"
+    elif "siasat" in url:
+        return "Siasat"
+    elif "tv9" in url:
+        return "TV9"
+    elif "eenadu" in url:
+        return "Eenadu"
+    return "News Feed"
+
+def parse_siasat_articles(html_text, base_url: str = "https://www.siasat.com", limit: int = 8) -> List[Dict]:
+    """Pull title/link/image from the <article> cards of a Siasat listing page"""
+    items = []
+    soup = BeautifulSoup(html_text, 'html.parser')
+    for article in soup.find_all('article', limit=limit):
+        try:
+            title_el = article.find(['h2', 'h3', 'h4'])
+            link_el = article.find('a', href=True)
+            img_el = article.find('img')
+            if not (title_el and link_el):
+                continue
+
+            title = title_el.get_text(strip=True)
+            link = link_el['href']
+            if not link.startswith('http'):
+                link = f"{base_url}{link}"
+
+            image = None
+            if img_el:
+                image = img_el.get('data-src') or img_el.get('src')
+
+            items.append({
+                "title": title,
+                "summary": title[:150] + "..." if len(title) > 150 else title,
+                "link": link,
+                "image": image,
+                "source": "Siasat"
+            })
+        except Exception as e:
+            logging.error(f"Error parsing Siasat article: {e}")
+    return items
+
+# Plain-text summary length kept per item
+SUMMARY_MAX_CHARS = 400
+
+def _localname(tag) -> str:
+    # Comments and processing instructions have non-string tags
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _element_text(elem) -> str:
+    return "".join(elem.itertext()).strip()
+
+def html_to_text(fragment: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Whitespace-collapsed text and first <img src> of an HTML description"""
+    if not fragment or not fragment.strip():
+        return "", None
+    if "<" not in fragment and "&" not in fragment:
+        return " ".join(fragment.split()), None
+    try:
+        root = lxml.html.fragment_fromstring(fragment, create_parent="div")
+    except (etree.ParserError, ValueError):
+        return " ".join(fragment.split()), None
+    img = root.find(".//img")
+    return " ".join(root.text_content().split()), img.get("src") if img is not None else None
+
+def parse_rss_items(content, url: str, limit: int = 10) -> List[Dict]:
+    """Stream title/link/summary/image/date out of the <item>s (or Atom <entry>s) of a feed
+
+    Each item is cleared once read, so memory stays bounded by one item rather than the
+    whole document, and parsing stops after `limit` items. CPU-bound: call it through
+    asyncio.to_thread from async code.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    items = []
+    source = feed_source_name(url)
+    events = etree.iterparse(
+        io.BytesIO(content), events=("end",), tag=("{*}item", "{*}entry"),
+        recover=True, resolve_entities=False, no_network=True, huge_tree=False
+    )
+
+    try:
+        for _, elem in events:
+            title = link = description = fallback_description = pub_date = image = None
+            for child in elem:
+                name = _localname(child.tag)
+                if name == "title":
+                    title = _element_text(child)
+                elif name == "link":
+                    # RSS puts the URL in the text, Atom in href (prefer rel="alternate")
+                    if child.get("href"):
+                        if link is None or child.get("rel", "alternate") == "alternate":
+                            link = child.get("href")
+                    elif child.text:
+                        link = child.text.strip()
+                elif name in ("description", "summary"):
+                    description = child.text
+                elif name in ("encoded", "content") and not child.get("url"):
+                    fallback_description = _element_text(child)
+                elif name in ("pubDate", "date", "published", "updated") and not pub_date:
+                    pub_date = (child.text or "").strip() or None
+
+            # media:content / media:thumbnail / enclosure, including inside media:group
+            for media in elem.iter("{*}content", "{*}thumbnail", "{*}enclosure"):
+                if media.get("url"):
+                    image = media.get("url")
+                    break
+
+            summary, description_image = html_to_text(description or fallback_description)
+            items.append({
+                "title": title or "No title",
+                "summary": summary[:SUMMARY_MAX_CHARS].strip() or "Read more...",
+                "link": link or "",
+                "image": image or description_image,
+                "published_at": pub_date,
+                "source": source
+            })
+
+            # Drop the finished item and anything before it
+            elem.clear(keep_tail=False)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+            if len(items) >= limit:
+                break
+    except etree.XMLSyntaxError as e:
+        logging.error(f"RSS parse error for {url}: {e}")
+    return items
+
+def parse_website_articles(html_text, source: Dict, limit: int = 5) -> List[Dict]:
+    """Generic news-card extraction for the Telugu news sites"""
+    items = []
+    soup = BeautifulSoup(html_text, 'html.parser')
+    base_url = source["url"].rstrip('/')
+
+    articles = soup.find_all(['article', 'div'], class_=lambda x: x and any(
+        term in str(x).lower() for term in ['news', 'story', 'article', 'post', 'card']
+    ))[:limit]
+
+    for article in articles:
+        # Extract title
+        title_elem = article.find(['h1', 'h2', 'h3', 'h4', 'a'])
+        title = title_elem.get_text().strip() if title_elem else ""
+        if not title or len(title) <= 10:
+            continue
+
+        # Extract link
+        link_elem = article.find('a', href=True)
+        link = link_elem['href'] if link_elem else ""
+        if link and not link.startswith('http'):
+            link = base_url + '/' + link.lstrip('/')
+
+        # Extract image
+        img_elem = article.find('img', src=True)
+        image = img_elem['src'] if img_elem else None
+        if image and not image.startswith('http'):
+            image = base_url + '/' + image.lstrip('/')
+
+        # Extract summary
+        summary_elem = article.find(['p', 'span', 'div'], class_=lambda x: x and any(
+            term in str(x).lower() for term in ['desc', 'summary', 'excerpt', 'text']
+        ))
+        summary = summary_elem.get_text().strip()[:300] if summary_elem else ""
+
+        items.append({
+            "title": title,
+            "title_te": title,  # Already in Telugu
+            "summary": summary or title[:100],
+            "summary_te": summary or title[:100],
+            "link": link,
+            "image": image,
+            "source": source["name"],
+            "is_telugu_source": True
+        })
+    return items
+
 async def scrape_siasat_news(limit: int = 15) -> List[Dict]:
     """Scrape latest news from Siasat.com with AI summarization"""
     news_items = []
-    openai_key = os.environ.get("OPENAI_API_KEY")
     
     try:
         urls = [
@@ -244,60 +444,32 @@ async def scrape_siasat_news(limit: int = 15) -> List[Dict]:
         
         async with httpx.AsyncClient() as client:
             headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+            responses = await asyncio.gather(
+                *(client.get(url, headers=headers, timeout=20.0, follow_redirects=True) for url in urls),
+                return_exceptions=True
+            )
             
-            for url in urls:
-                try:
-                    response = await client.get(url, headers=headers, timeout=20.0, follow_redirects=True)
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        articles = soup.find_all('article', limit=limit // 2)
-                        
-                        for article in articles:
-                            try:
-                                title_el = article.find(['h2', 'h3', 'h4'])
-                                link_el = article.find('a', href=True)
-                                img_el = article.find('img')
-                                
-                                if title_el and link_el:
-                                    title = title_el.get_text(strip=True)
-                                    link = link_el['href']
-                                    if not link.startswith('http'):
-                                        link = f"https://www.siasat.com{link}"
-                                    
-                                    image = None
-                                    if img_el:
-                                        image = img_el.get('data-src') or img_el.get('src')
-                                    
-                                    # Create concise summary
-                                    summary = title[:150] + "..." if len(title) > 150 else title
-                                    
-                                    # Use AI to create better summary if available
-                                    if openai_key and len(news_items) < 5:
-                                        try:
-                                            result = await rephrase_with_ai(title, summary)
-                                            title = result.get("title", title)
-                                            summary = result.get("summary", summary)
-                                        except:
-                                            pass
-                                    
-                                    news_items.append({
-                                        "id": generate_id(),
-                                        "title": title,
-                                        "summary": summary,
-                                        "link": link,
-                                        "image": image,
-                                        "source": "Siasat",
-                                        "category": "city" if "hyderabad" in url else "state",
-                                        "time_ago": "Just now",
-                                        "content_type": "text"
-                                    })
-                            except Exception as e:
-                                logging.error(f"Error parsing Siasat article: {e}")
-                                continue
-                except Exception as e:
-                    logging.error(f"Error fetching {url}: {e}")
+            for url, response in zip(urls, responses):
+                if isinstance(response, Exception):
+                    logging.error(f"Error fetching {url}: {response}")
                     continue
+                if response.status_code != 200:
+                    continue
+                
+                for item in parse_siasat_articles(response.text, limit=limit // 2):
+                    news_items.append({
+                        **item,
+                        "id": generate_id(),
+                        "category": "city" if "hyderabad" in url else "state",
+                        "time_ago": "Just now",
+                        "content_type": "text"
+                    })
+        
+        # Use AI to create better summaries for the top items, in one batch
+        news_items = news_items[:limit]
+        head = news_items[:AI_REPHRASE_LIMIT]
+        for item, result in zip(head, await rephrase_articles(head)):
+            item["title"], item["summary"] = result["title"], result["summary"]
     except Exception as e:
         logging.error(f"Error in scrape_siasat_news: {str(e)}")
     
@@ -316,77 +488,27 @@ async def scrape_rss_feed(url: str, category: str, limit: int = 10, use_ai: bool
             response = await client.get(url, headers=headers, timeout=20.0, follow_redirects=True)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'lxml-xml')
-                items = soup.find_all('item')[:limit]
+                items = await asyncio.to_thread(parse_rss_items, response.content, url, limit)
+                
+                # Apply AI rephrasing if enabled: first few items, one batched call
+                rephrased = await rephrase_articles(items[:AI_REPHRASE_LIMIT]) if use_ai else []
                 
                 for idx, item in enumerate(items):
-                    title = item.find('title')
-                    link = item.find('link')
-                    description = item.find('description')
-                    pub_date = item.find('pubDate')
-                    
-                    # Extract image from various possible locations
-                    image = None
-                    media = item.find('media:content') or item.find('enclosure') or item.find('media:thumbnail')
-                    if media and media.get('url'):
-                        image = media.get('url')
-                    
-                    # Try to extract image from description HTML
-                    if not image and description:
-                        desc_soup = BeautifulSoup(description.text, 'html.parser')
-                        img_tag = desc_soup.find('img')
-                        if img_tag and img_tag.get('src'):
-                            image = img_tag.get('src')
-                    
-                    # Clean description
-                    desc_text = ""
-                    if description:
-                        desc_soup = BeautifulSoup(description.text, 'html.parser')
-                        desc_text = desc_soup.get_text()[:400].strip()
-                    
-                    # Determine source from URL
-                    source = "News Feed"
-                    if "thehindu" in url:
-                        source = "The Hindu"
-                    elif "timesofindia" in url:
-                        source = "Times of India"
-                    elif "deccan" in url:
-                        source = "Deccan Chronicle"
-                    elif "hansindia" in url:
-                        source = "The Hans India"
-                    elif "telangana" in url.lower():
-                        source = "Telangana Today"
-                    elif "siasat" in url:
-                        source = "Siasat"
-                    elif "tv9" in url:
-                        source = "TV9"
-                    elif "eenadu" in url:
-                        source = "Eenadu"
-                    
-                    title_text = title.text.strip() if title else "No title"
-                    summary_text = desc_text or "Read more..."
-                    
-                    # Apply AI rephrasing if enabled
-                    openai_key = os.environ.get("OPENAI_API_KEY")
-                    if use_ai and openai_key and idx < 5:  # Limit AI calls to first 5 items
-                        rephrased = await rephrase_with_ai(title_text, summary_text)
-                        title_text = rephrased["title"]
-                        summary_text = rephrased["summary"]
+                    ai = rephrased[idx] if idx < len(rephrased) else {}
+                    title_text = ai.get("title", item["title"])
                     
                     news_items.append({
+                        **item,
                         "id": f"{category}_{idx}_{int(time.time())}_{hash(title_text) % 10000}",
                         "title": title_text,
-                        "summary": summary_text,
-                        "link": link.text.strip() if link else "",
-                        "image": image,
+                        "summary": ai.get("summary", item["summary"]),
                         "category": category,
                         "category_label": NEWS_CATEGORIES.get(category, {}).get("en", category),
                         "category_label_te": NEWS_CATEGORIES.get(category, {}).get("te", category),
-                        "published_at": pub_date.text if pub_date else datetime.now(timezone.utc).isoformat(),
-                        "source": source,
+                        "published_at": item["published_at"] or datetime.now(timezone.utc).isoformat(),
                         "is_admin_pushed": False,
                         "is_pinned": False,
-                        "is_ai_rephrased": use_ai
+                        "is_ai_rephrased": ai.get("is_ai_rephrased", False)
                     })
     except Exception as e:
         logging.error(f"RSS scrape error for {url}: {str(e)}")
@@ -411,59 +533,149 @@ async def scrape_website(source_key: str, category: str = "local", limit: int =
             response = await client.get(source["url"], headers=headers, timeout=15.0, follow_redirects=True)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Generic news item extraction
-                articles = soup.find_all(['article', 'div'], class_=lambda x: x and any(
-                    term in str(x).lower() for term in ['news', 'story', 'article', 'post', 'card']
-                ))[:limit]
-                
-                for idx, article in enumerate(articles):
-                    # Extract title
-                    title_elem = article.find(['h1', 'h2', 'h3', 'h4', 'a'])
-                    title = title_elem.get_text().strip() if title_elem else ""
-                    
-                    # Extract link
-                    link_elem = article.find('a', href=True)
-                    link = link_elem['href'] if link_elem else ""
-                    if link and not link.startswith('http'):
-                        link = source["url"].rstrip('/') + '/' + link.lstrip('/')
-                    
-                    # Extract image
-                    img_elem = article.find('img', src=True)
-                    image = img_elem['src'] if img_elem else None
-                    if image and not image.startswith('http'):
-                        image = source["url"].rstrip('/') + '/' + image.lstrip('/')
-                    
-                    # Extract summary
-                    summary_elem = article.find(['p', 'span', 'div'], class_=lambda x: x and any(
-                        term in str(x).lower() for term in ['desc', 'summary', 'excerpt', 'text']
-                    ))
-                    summary = summary_elem.get_text().strip()[:300] if summary_elem else ""
-                    
-                    if title and len(title) > 10:
-                        news_items.append({
-                            "id": f"{source_key}_{idx}_{int(time.time())}",
-                            "title": title,
-                            "title_te": title,  # Already in Telugu
-                            "summary": summary or title[:100],
-                            "summary_te": summary or title[:100],
-                            "link": link,
-                            "image": image,
-                            "category": category,
-                            "category_label": NEWS_CATEGORIES.get(category, {}).get("en", category),
-                            "category_label_te": NEWS_CATEGORIES.get(category, {}).get("te", category),
-                            "published_at": datetime.now(timezone.utc).isoformat(),
-                            "source": source["name"],
-                            "is_admin_pushed": False,
-                            "is_pinned": False,
-                            "is_telugu_source": True
-                        })
+                for idx, item in enumerate(parse_website_articles(response.text, source, limit)):
+                    news_items.append({
+                        **item,
+                        "id": f"{source_key}_{idx}_{int(time.time())}",
+                        "category": category,
+                        "category_label": NEWS_CATEGORIES.get(category, {}).get("en", category),
+                        "category_label_te": NEWS_CATEGORIES.get(category, {}).get("te", category),
+                        "published_at": datetime.now(timezone.utc).isoformat(),
+                        "is_admin_pushed": False,
+                        "is_pinned": False
+                    })
     except Exception as e:
         logging.error(f"Website scrape error for {source_key}: {str(e)}")
     
     return news_items
 
+# ============== NEWS INGESTION ==============
+
+# Minutes between ingestion cycles; 0 disables the background loop
+NEWS_INGEST_INTERVAL_MINUTES = int(os.environ.get("NEWS_INGEST_INTERVAL_MINUTES", "60"))
+
+# Items taken from each feed/page per cycle
+INGEST_ITEMS_PER_FEED = 25
+
+# Rephrase ingested articles with AI (cached, so only new articles cost a call)
+NEWS_INGEST_USE_AI = os.environ.get("NEWS_INGEST_USE_AI", "").lower() in ("1", "true", "yes")
+
+def news_feed_sources() -> Dict[str, Dict]:
+    """Every distinct URL to poll, with the parser to use and all the categories it feeds"""
+    sources = {}
+    for category, urls in RSS_FEEDS.items():
+        for url in urls:
+            source = sources.setdefault(url, {"kind": "rss", "categories": []})
+            if category not in source["categories"]:
+                source["categories"].append(category)
+    for key, site in TELUGU_SOURCES.items():
+        source = sources.setdefault(site["url"], {
+            "kind": "siasat" if key.startswith("siasat") else "website",
+            "site": site,
+            "categories": []
+        })
+        for category in site["categories"]:
+            if category not in source["categories"]:
+                source["categories"].append(category)
+    return sources
+
+def parse_feed_body(url: str, source: Dict, content: bytes) -> List[Dict]:
+    if source["kind"] == "rss":
+        return parse_rss_items(content, url, INGEST_ITEMS_PER_FEED)
+    if source["kind"] == "siasat":
+        return parse_siasat_articles(content, limit=INGEST_ITEMS_PER_FEED)
+    return parse_website_articles(content, source["site"], INGEST_ITEMS_PER_FEED)
+
+def collect_ingested_articles(sources: Dict[str, Dict], results: List[Dict]) -> Dict[str, Dict]:
+    """Parse every changed feed body and merge the items by canonical URL"""
+    batches = []
+    for result in results:
+        if result["status"] != "ok":
+            continue
+        source = sources[result["url"]]
+        try:
+            batches.append((source["categories"], parse_feed_body(result["url"], source, result["content"])))
+        except Exception as e:
+            logging.error(f"News ingest parse error for {result['url']}: {e}")
+            result["status"] = "error"
+            result["error"] = f"parse: {e}"
+    return merge_articles(batches)
+
+async def ensure_news_ingest_indexes():
+    await db.news_feed_state.create_index("url", unique=True)
+    await db.ingested_news.create_index("url_hash", unique=True)
+    await db.ingested_news.create_index([("categories", 1), ("published_at", -1)])
+
+async def run_news_ingestion(client: Optional[httpx.AsyncClient] = None) -> Dict:
+    """One ingestion cycle over every distinct feed"""
+    sources = news_feed_sources()
+    states = {
+        s["url"]: s async for s in db.news_feed_state.find({"url": {"$in": list(sources)}}, {"_id": 0})
+    }
+    results = await fetch_all_feeds(sources, states, client=client)
+    # Parsing is CPU-bound; keep it off the event loop
+    articles = await asyncio.to_thread(collect_ingested_articles, sources, results)
+    # Clustered on the source wording, before any rephrasing
+    representative_ops = await cluster_ingested_articles(articles) if articles else []
+    if NEWS_INGEST_USE_AI and articles:
+        # Duplicates are hidden behind their representative; don't pay to rephrase them
+        shown = [article for article in articles.values() if not article.get("is_duplicate")]
+        for article, result in zip(shown, await rephrase_articles(shown)):
+            if result["is_ai_rephrased"]:
+                article.update({"original_title": article["title"], "original_summary": article["summary"], **result})
+
+    now = now_iso()
+    upserted = modified = 0
+    if articles:
+        write = await db.ingested_news.bulk_write(article_upserts(articles, now, insert_only=CLUSTER_FIELDS), ordered=False)
+        upserted, modified = write.upserted_count, write.modified_count
+    if representative_ops:
+        await db.ingested_news.bulk_write(representative_ops, ordered=False)
+    await db.news_feed_state.bulk_write(feed_state_updates(results, now), ordered=False)
+
+    statuses = [r["status"] for r in results]
+    return {
+        "feeds": len(results),
+        "fetched": statuses.count("ok"),
+        "not_modified": statuses.count("not_modified") + statuses.count("unchanged"),
+        "failed": statuses.count("error"),
+        "articles": len(articles),
+        "new_articles": upserted,
+        "updated_articles": modified,
+        "near_duplicates": sum(1 for article in articles.values() if article.get("is_duplicate"))
+    }
+
+async def news_ingest_loop():
+    """Run an ingestion cycle on a fixed interval"""
+    while True:
+        try:
+            result = await run_news_ingestion()
+            logging.info(f"News ingestion: {result}")
+        except Exception as e:
+            logging.error(f"News ingestion loop error: {e}")
+        await asyncio.sleep(NEWS_INGEST_INTERVAL_MINUTES * 60)
+
+_news_ingest_task = None
+
+@router.on_event("startup")
+async def init_news():
+    """Create news indexes, backfill feed categories and start the ingestion loop"""
+    global _news_ingest_task
+    await ensure_news_ingest_indexes()
+    await ensure_news_dedupe_indexes()
+    await ensure_rephrase_cache_indexes()
+    await ensure_news_feed_indexes()
+    migrated = await migrate_news_categories()
+    if migrated:
+        logging.info(f"Backfilled categories on {migrated} admin news articles")
+    if NEWS_INGEST_INTERVAL_MINUTES > 0:
+        _news_ingest_task = asyncio.create_task(news_ingest_loop())
+
+@router.on_event("shutdown")
+async def stop_news_ingest():
+    """Stop the ingestion loop"""
+    await cancel_task(_news_ingest_task)
+
 def generate_placeholder_news(category: str, limit: int = 10) -> List[Dict]:
     """Generate placeholder news when scraping fails"""
     placeholder_news = {
@@ -545,24 +757,29 @@ def generate_placeholder_news(category: str, limit: int = 10) -> List[Dict]:
 @router.get("/local")
 async def get_local_news(
     category: str = Query("local", description="News category"),
-    limit: int = Query(30, description="Number of items")
+    limit: int = Query(30, ge=1, le=NEWS_FEED_CACHE_SIZE, description="Number of items")
 ):
     """Get local news feed - only admin-pushed news"""
-    all_news = []
-    
-    # Get admin-pushed news only (no scraped news)
-    admin_news = await db.admin_news.find(
-        {"$or": [{"category": {"$regex": category, "$options": "i"}}, {"is_pinned": True}]},
-        {"_id": 0}
-    ).sort([("is_pinned", -1), ("created_at", -1)]).to_list(limit)
+    category = category.strip().lower() or "local"
+    # Every category seen gets a cached feed, so only real ones are accepted
+    if category not in NEWS_CATEGORIES:
+        raise HTTPException(status_code=400, detail="Invalid category")
     
-    for news in admin_news:
-        news["is_admin_pushed"] = True
-        news["time_ago"] = get_time_ago(news.get("created_at", ""))
-        news.setdefault("content_type", "text")
-        all_news.append(news)
+    async def build():
+        all_news = []
+        
+        # Get admin-pushed news only (no scraped news): pinned plus this category
+        admin_news = await get_feed(category, limit)
+        
+        for news in admin_news:
+            news["is_admin_pushed"] = True
+            news["time_ago"] = get_time_ago(news.get("created_at", ""))
+            news.setdefault("content_type", "text")
+            all_news.append(news)
+        
+        return {"news": all_news, "total": len(all_news), "fetched_at": now_iso()}
     
-    return {"news": all_news, "total": len(all_news)}
+    return Response(content=await rendered_feed(("local", category, limit), build), media_type="application/json")
 
 @router.get("/categories")
 async def get_news_categories():
@@ -572,64 +789,61 @@ async def get_news_categories():
 @router.get("/{category}")
 async def get_news_by_category(
     category: str, 
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=NEWS_FEED_CACHE_SIZE),
     use_ai: bool = Query(False, description="Use AI to rephrase articles")
 ):
     """Get news for a category - admin-pushed news only (no scraping)"""
     if category not in NEWS_CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid category")
     
-    all_news = []
-    
-    # Get admin-pushed news for this category only (no scraping)
-    admin_news = await db.admin_news.find(
-        {"$or": [
-            {"category": {"$regex": category, "$options": "i"}},
-            {"is_pinned": True}
-        ], "is_active": {"$ne": False}},
-        {"_id": 0}
-    ).sort([("is_pinned", -1), ("priority", 1), ("created_at", -1)]).to_list(limit)
-    
-    for news in admin_news:
-        news["is_admin_pushed"] = True
-        news["time_ago"] = get_time_ago(news.get("created_at", ""))
-        news.setdefault("content_type", "text")
-        all_news.append(news)
+    async def build():
+        all_news = []
+        
+        # Get admin-pushed news for this category only (no scraping)
+        admin_news = await get_feed(category, limit)
+        
+        for news in admin_news:
+            news["is_admin_pushed"] = True
+            news["time_ago"] = get_time_ago(news.get("created_at", ""))
+            news.setdefault("content_type", "text")
+            all_news.append(news)
+        
+        return {
+            "category": category,
+            "category_info": NEWS_CATEGORIES[category],
+            "news": all_news,
+            "count": len(all_news),
+            "ai_enabled": use_ai,
+            "fetched_at": now_iso()
+        }
     
-    return {
-        "category": category,
-        "category_info": NEWS_CATEGORIES[category],
-        "news": all_news,
-        "count": len(all_news),
-        "ai_enabled": use_ai,
-        "fetched_at": now_iso()
-    }
+    return Response(content=await rendered_feed(("category", category, limit, use_ai), build), media_type="application/json")
 
 @router.get("/feed/all")
 async def get_all_news(
-    limit: int = 30,
+    limit: int = Query(30, ge=1, le=NEWS_FEED_CACHE_SIZE),
     use_ai: bool = Query(False, description="Use AI to rephrase articles")
 ):
     """Get all news - admin-pushed only (no scraping)"""
-    all_news = []
-    
-    # Get all admin-pushed news
-    admin_news = await db.admin_news.find(
-        {"is_active": {"$ne": False}},
-        {"_id": 0}
-    ).sort([("is_pinned", -1), ("priority", 1), ("created_at", -1)]).to_list(limit)
-    
-    for news in admin_news:
-        news["is_admin_pushed"] = True
-        news["time_ago"] = get_time_ago(news.get("created_at", ""))
-        news.setdefault("content_type", "text")
-        all_news.append(news)
+    async def build():
+        all_news = []
+        
+        # Get all admin-pushed news
+        admin_news = await get_feed(None, limit)
+        
+        for news in admin_news:
+            news["is_admin_pushed"] = True
+            news["time_ago"] = get_time_ago(news.get("created_at", ""))
+            news.setdefault("content_type", "text")
+            all_news.append(news)
+        
+        return {
+            "news": all_news,
+            "categories": list(NEWS_CATEGORIES.keys()),
+            "fetched_at": now_iso()
+        }
     
-    return {
-        "news": all_news,
-        "categories": list(NEWS_CATEGORIES.keys()),
-        "fetched_at": now_iso()
-    }
+    return Response(content=await rendered_feed(("all", limit), build), media_type="application/json")
 
 # ============== ADMIN ROUTES ==============
 
@@ -643,35 +857,73 @@ async def admin_push_news(news: AdminNewsPush, user: dict = Depends(get_current_
     if news.category not in NEWS_CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid category")
     
-    new_news = {
-        "id": generate_id(),
-        "title": news.title,
-        "title_te": news.title_te or news.title,
-        "summary": news.summary,
-        "summary_te": news.summary_te or news.summary,
-        "category": news.category,
-        "category_label": NEWS_CATEGORIES[news.category]["en"],
-        "category_label_te": NEWS_CATEGORIES[news.category]["te"],
-        "image": news.image_url,
-        "video_url": news.video_url,
-        "content_type": news.content_type,
-        "link": news.link,
-        "is_pinned": news.is_pinned,
-        "priority": news.priority,
-        "is_active": True,
-        "is_admin_pushed": True,
-        "source": "My Dammaiguda Admin",
-        "pushed_by": user["id"],
-        "pushed_by_name": user.get("name"),
-        "published_at": now_iso(),
-        "created_at": now_iso()
-    }
-    
+    new_news = build_admin_news(news, user)
     await db.admin_news.insert_one(new_news)
     new_news.pop("_id", None)
+    await news_changed(None, new_news)
     
     return {"success": True, "news": new_news}
 
+@router.post("/admin/push/bulk")
+async def admin_push_news_bulk(payload: AdminNewsBulkPush, user: dict = Depends(get_current_user)):
+    """Admin: Create many articles at once; replays of an idempotency_key return the existing article"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if len(payload.articles) > MAX_BULK_NEWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_NEWS} articles per request")
+    
+    results = [None] * len(payload.articles)
+    ops, op_items = [], []
+    for index, item in enumerate(payload.articles):
+        if item.category not in NEWS_CATEGORIES:
+            results[index] = {"idempotency_key": item.idempotency_key, "status": "error", "detail": "Invalid category"}
+            continue
+        doc = build_admin_news(item, user)
+        doc["idempotency_key"] = item.idempotency_key
+        if item.source:
+            doc["source"] = item.source
+        ops.append(UpdateOne({"idempotency_key": item.idempotency_key}, {"$setOnInsert": doc}, upsert=True))
+        op_items.append((index, doc))
+    
+    upserted = set()
+    if ops:
+        try:
+            write = await db.admin_news.bulk_write(ops, ordered=False)
+            upserted = set(write.upserted_ids)
+        except BulkWriteError as e:
+            # A concurrent replay of the same key loses the unique-index race: that is a duplicate
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != 11000:
+                    index, doc = op_items[error["index"]]
+                    results[index] = {"idempotency_key": doc["idempotency_key"], "status": "error", "detail": error.get("errmsg")}
+    
+    created = [doc for op_index, (_, doc) in enumerate(op_items) if op_index in upserted]
+    duplicate_keys = [doc["idempotency_key"] for op_index, (index, doc) in enumerate(op_items) if op_index not in upserted and results[index] is None]
+    existing = {}
+    if duplicate_keys:
+        async for doc in db.admin_news.find({"idempotency_key": {"$in": duplicate_keys}}, {"_id": 0, "id": 1, "idempotency_key": 1}):
+            existing[doc["idempotency_key"]] = doc["id"]
+    
+    for op_index, (index, doc) in enumerate(op_items):
+        if results[index] is not None:
+            continue
+        if op_index in upserted:
+            results[index] = {"idempotency_key": doc["idempotency_key"], "status": "created", "id": doc["id"]}
+        else:
+            results[index] = {"idempotency_key": doc["idempotency_key"], "status": "duplicate", "id": existing.get(doc["idempotency_key"])}
+    
+    if created:
+        await invalidate_news_feeds()
+    
+    return {
+        "success": True,
+        "created": len(created),
+        "duplicates": len(duplicate_keys),
+        "results": results
+    }
+
 @router.get("/admin/pushed")
 @router.get("/admin/all")
 async def get_admin_pushed_news(user: dict = Depends(get_current_user)):
@@ -693,9 +945,15 @@ async def update_admin_news(news_id: str, updates: AdminNewsUpdate, user: dict =
     if update_data:
         update_data["updated_at"] = now_iso()
         update_data["updated_by"] = user["id"]
-        await db.admin_news.update_one({"id": news_id}, {"$set": update_data})
+        updated = await db.admin_news.find_one_and_update(
+            {"id": news_id}, {"$set": update_data},
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+        if updated:
+            await news_changed(None, updated)
+    else:
+        updated = await db.admin_news.find_one({"id": news_id}, {"_id": 0})
     
-    updated = await db.admin_news.find_one({"id": news_id}, {"_id": 0})
     return {"success": True, "news": updated}
 
 @router.post("/admin/news/{news_id}/pin")
@@ -709,10 +967,12 @@ async def toggle_pin_news(news_id: str, user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="News not found")
     
     new_pinned = not news.get("is_pinned", False)
+    updated_at = now_iso()
     await db.admin_news.update_one(
         {"id": news_id}, 
-        {"$set": {"is_pinned": new_pinned, "updated_at": now_iso()}}
+        {"$set": {"is_pinned": new_pinned, "updated_at": updated_at}}
     )
+    await news_changed(None, {**news, "is_pinned": new_pinned, "updated_at": updated_at})
     
     return {"success": True, "is_pinned": new_pinned}
 
@@ -722,9 +982,40 @@ async def delete_admin_news(news_id: str, user: dict = Depends(get_current_user)
     if user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    result = await db.admin_news.delete_one({"id": news_id})
+    deleted = await db.admin_news.find_one_and_delete({"id": news_id}, projection={"_id": 0})
+    if deleted:
+        await news_changed(deleted, None)
+    
+    return {"success": True, "deleted": deleted is not None}
+
+@router.post("/admin/ingest")
+async def trigger_news_ingestion(user: dict = Depends(get_current_user)):
+    """Admin: Run a news ingestion cycle now"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {"success": True, **(await run_news_ingestion())}
+
+@router.get("/admin/ingested")
+async def get_ingested_news(
+    category: Optional[str] = None,
+    cluster_id: Optional[str] = None,
+    include_duplicates: bool = Query(False, description="Also list articles clustered under another report of the same story"),
+    limit: int = Query(50, ge=1, le=200),
+    user: dict = Depends(get_current_user)
+):
+    """Admin: Browse ingested feed articles, newest first, one per story unless asked otherwise"""
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    return {"success": True, "deleted": result.deleted_count > 0}
+    query = {"categories": category} if category else {}
+    if cluster_id:
+        query["cluster_id"] = cluster_id
+    elif not include_duplicates:
+        query["is_duplicate"] = {"$ne": True}
+    news = await db.ingested_news.find(query, {"_id": 0, "minhash": 0, "lsh_bands": 0}).sort("published_at", -1).to_list(limit)
+    feeds = await db.news_feed_state.find({}, {"_id": 0, "content_hash": 0}).to_list(None)
+    return {"news": news, "total": len(news), "feeds": feeds}
 
 # ============== USER ROUTES ==============
 
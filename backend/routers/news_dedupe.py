@@ -0,0 +1,182 @@
+"""Near-duplicate news detection - MinHash signatures in a banded LSH index
+
+The same story reaches us from several sites with different wording. Each ingested
+article gets a MinHash signature over character 4-gram shingles of its normalized
+title and summary (robust to reordering and inflection, and it works the same for
+Telugu text). The signature is cut into LSH_BANDS bands; each band's hash is stored
+in the indexed `lsh_bands` array, so finding candidates for a new article is one
+index lookup per band instead of a scan. Candidates whose estimated Jaccard
+similarity reaches NEAR_DUPLICATE_THRESHOLD join the earliest article's cluster,
+which stays the representative shown in feeds.
+"""
+import hashlib
+import os
+import random
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from pymongo import UpdateOne
+from .utils import db
+from .news_ingest import parse_published
+
+SHINGLE_SIZE = 4
+MINHASH_PERMUTATIONS = 128
+# 32 bands x 4 rows: pairs above ~0.5 similarity share a band with high probability
+LSH_BANDS = 32
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEWS_DUPLICATE_THRESHOLD", "0.5"))
+
+# Only stories this recent are clustered together
+DEDUPE_WINDOW_HOURS = 72
+
+# Fields written once, when an article is first ingested
+CLUSTER_FIELDS = ("cluster_id", "is_duplicate", "cluster_size", "cluster_sources", "minhash", "lsh_bands")
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "and", "or", "is", "are", "was",
+    "were", "be", "been", "by", "with", "from", "as", "that", "this", "it", "its", "into",
+    "after", "over", "has", "have", "had", "will", "said", "says", "read", "more"
+}
+
+# Word characters plus the combining marks of Indic scripts, which \w does not match
+TOKEN_RE = re.compile(r"[\wऀ-෿]+")
+
+# (a * x + b) mod p permutations with fixed seeds, so signatures stay comparable across runs
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20251018)
+_A = np.array([_rng.randrange(1, _PRIME) for _ in range(MINHASH_PERMUTATIONS)], dtype=np.uint64)
+_B = np.array([_rng.randrange(0, _PRIME) for _ in range(MINHASH_PERMUTATIONS)], dtype=np.uint64)
+
+def text_shingles(title: str, summary: str) -> set:
+    """Character n-grams of each distinct non-stopword token"""
+    shingles = set()
+    for token in set(TOKEN_RE.findall(f"{title or ''} {summary or ''}".lower())):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        padded = f" {token} "
+        shingles.update(padded[i:i + SHINGLE_SIZE] for i in range(max(1, len(padded) - SHINGLE_SIZE + 1)))
+    return shingles
+
+def minhash_signature(shingles: Iterable[str]) -> Optional[List[int]]:
+    """MINHASH_PERMUTATIONS minimum hashes; None for an article with no usable text"""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles), dtype=np.uint64)
+    if not hashes.size:
+        return None
+    # Every term is below 2^31, so a * x + b cannot overflow 64 bits
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % np.uint64(_PRIME)
+    return permuted.min(axis=1).tolist()
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    bands = []
+    for band in range(LSH_BANDS):
+        chunk = ",".join(map(str, signature[band * rows:(band + 1) * rows]))
+        bands.append(f"{band}:{hashlib.blake2b(chunk.encode(), digest_size=8).hexdigest()}")
+    return bands
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+def sign_articles(articles: Iterable[dict]):
+    for article in articles:
+        signature = minhash_signature(text_shingles(article.get("title"), article.get("summary")))
+        if signature is not None:
+            article["minhash"] = signature
+            article["lsh_bands"] = lsh_bands(signature)
+
+def assign_clusters(new: List[dict], known: List[dict]) -> Dict[str, dict]:
+    """Put each new article in the cluster of its most similar earlier article, or its own
+
+    `new` articles are signed, keyed by url_hash and not yet stored; `known` are stored
+    articles sharing at least one band with them. Returns {representative url_hash:
+    {count, categories, sources}} for representatives that are already stored.
+    """
+    buckets: Dict[str, List[dict]] = {}
+    for doc in known:
+        for band in doc.get("lsh_bands", []):
+            buckets.setdefault(band, []).append(doc)
+
+    stored_reps: Dict[str, dict] = {}
+    new_reps: Dict[str, dict] = {}
+    # Earliest first, so a cluster's representative is the first report of the story;
+    # undated articles are stored as first seen now, so they sort last
+    for article in sorted(new, key=lambda a: (not a.get("published_at"), a.get("published_at") or "")):
+        best, best_score = None, NEAR_DUPLICATE_THRESHOLD
+        seen = set()
+        for band in article.get("lsh_bands", []):
+            for candidate in buckets.get(band, []):
+                if candidate["url_hash"] in seen:
+                    continue
+                seen.add(candidate["url_hash"])
+                score = similarity(article["minhash"], candidate["minhash"])
+                if score >= best_score:
+                    best, best_score = candidate, score
+
+        source = article.get("source")
+        if best is None:
+            article.update({"cluster_id": article["url_hash"], "is_duplicate": False,
+                            "cluster_size": 1, "cluster_sources": [source] if source else []})
+            new_reps[article["url_hash"]] = article
+        else:
+            cluster_id = best.get("cluster_id") or best["url_hash"]
+            article.update({"cluster_id": cluster_id, "is_duplicate": True})
+            if cluster_id in new_reps:
+                rep = new_reps[cluster_id]
+                rep["cluster_size"] += 1
+                categories, sources = rep["categories"], rep["cluster_sources"]
+            else:
+                tally = stored_reps.setdefault(cluster_id, {"count": 0, "categories": [], "sources": []})
+                tally["count"] += 1
+                categories, sources = tally["categories"], tally["sources"]
+            # The representative is listed under every category its duplicates came from
+            categories.extend(c for c in article["categories"] if c not in categories)
+            if source and source not in sources:
+                sources.append(source)
+
+        for band in article.get("lsh_bands", []):
+            buckets.setdefault(band, []).append(article)
+    return stored_reps
+
+def representative_updates(stored_reps: Dict[str, dict]) -> List[UpdateOne]:
+    """Grow stored representatives by the duplicates found this cycle"""
+    return [
+        UpdateOne({"url_hash": url_hash}, {
+            "$inc": {"cluster_size": rep["count"]},
+            "$addToSet": {"categories": {"$each": rep["categories"]}, "cluster_sources": {"$each": rep["sources"]}}
+        })
+        for url_hash, rep in stored_reps.items()
+    ]
+
+async def cluster_ingested_articles(articles: Dict[str, dict]) -> List[UpdateOne]:
+    """Cluster the articles of an ingestion cycle that are not stored yet
+
+    Sets the CLUSTER_FIELDS on those articles and returns the updates for stored
+    representatives that gained duplicates. Articles seen in an earlier cycle keep
+    the cluster they were given then.
+    """
+    stored = {
+        doc["url_hash"] async for doc in db.ingested_news.find(
+            {"url_hash": {"$in": list(articles)}}, {"_id": 0, "url_hash": 1}
+        )
+    }
+    new = [article for key, article in articles.items() if key not in stored]
+    if not new:
+        return []
+    for article in new:
+        # Missing dates stay missing, so article_upserts can tell them from supplied ones
+        article["published_at"] = parse_published(article.get("published_at"))
+    sign_articles(new)
+
+    bands = list({band for article in new for band in article.get("lsh_bands", [])})
+    since = (datetime.now(timezone.utc) - timedelta(hours=DEDUPE_WINDOW_HOURS)).isoformat()
+    known = await db.ingested_news.find(
+        {"lsh_bands": {"$in": bands}, "published_at": {"$gte": since}},
+        {"_id": 0, "url_hash": 1, "cluster_id": 1, "minhash": 1, "lsh_bands": 1}
+    ).to_list(None) if bands else []
+    return representative_updates(assign_clusters(new, known))
+
+async def ensure_news_dedupe_indexes():
+    await db.ingested_news.create_index("lsh_bands")
+    await db.ingested_news.create_index("cluster_id")
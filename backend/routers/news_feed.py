@@ -0,0 +1,200 @@
+"""News feeds - indexed category queries with an in-memory top-N per feed
+
+admin_news documents carry a normalized `categories` array (backfilled by
+migrate_news_categories) indexed together with the feed sort keys, so a category
+feed is an index walk instead of a $regex scan. Each worker also keeps the top
+NEWS_FEED_CACHE_SIZE active articles per feed: admin writes patch those lists in
+place and bump a shared version so other workers reload within
+FEED_VERSION_CHECK_SECONDS. The public endpoints go one step further and keep each
+response variant as serialized JSON bytes (rendered_feed), so a hit does no query,
+no time_ago formatting and no serialization.
+"""
+import json
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
+from .utils import db
+
+FEED_SORT = [("is_pinned", -1), ("priority", 1), ("created_at", -1)]
+
+# Feed keys besides the category names
+ALL_FEED = "__all__"
+PINNED_FEED = "__pinned__"
+
+NEWS_FEED_CACHE_SIZE = 100
+FEED_VERSION_CHECK_SECONDS = 5
+
+# Rendered responses are rebuilt after an admin write, or after this long so that
+# time_ago (computed against the render time, sent as fetched_at) stays current
+FEED_RENDER_TTL_SECONDS = 60
+MAX_RENDERED_FEEDS = 512
+
+_feeds: Dict[str, List[dict]] = {}
+# (endpoint, params...) -> (feed version, rendered at, JSON bytes)
+_rendered: Dict[tuple, Tuple[Optional[int], float, bytes]] = {}
+_feed_version: Optional[int] = None
+_version_checked_at: Optional[float] = None
+
+def normalize_categories(value) -> List[str]:
+    """'Local' or ['local', ' City '] -> lower-cased, de-duplicated list"""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return list(dict.fromkeys(v.strip().lower() for v in values if isinstance(v, str) and v.strip()))
+
+def feed_query(feed: str) -> dict:
+    query = {"is_active": {"$ne": False}}
+    if feed == PINNED_FEED:
+        query["is_pinned"] = True
+    elif feed != ALL_FEED:
+        query["categories"] = feed
+    return query
+
+def in_feed(feed: str, doc: dict) -> bool:
+    if doc.get("is_active") is False:
+        return False
+    if feed == PINNED_FEED:
+        return bool(doc.get("is_pinned"))
+    return feed == ALL_FEED or feed in doc.get("categories", [])
+
+def sort_feed(docs: List[dict]) -> List[dict]:
+    """Python equivalent of FEED_SORT (missing priority sorts first, as in Mongo)"""
+    newest_first = sorted(docs, key=lambda d: d.get("created_at") or "", reverse=True)
+    return sorted(newest_first, key=lambda d: (
+        not d.get("is_pinned", False),
+        d.get("priority") is not None,
+        d.get("priority") or 0
+    ))
+
+def patch_feed(docs: List[dict], feed: str, article_id: str, after: Optional[dict]) -> Optional[List[dict]]:
+    """Cached feed with one article replaced/removed; None when only Mongo knows the new tail"""
+    was_full = len(docs) >= NEWS_FEED_CACHE_SIZE
+    patched = [d for d in docs if d["id"] != article_id]
+    removed = len(patched) < len(docs)
+
+    if after is not None and in_feed(feed, after):
+        patched = sort_feed(patched + [after])
+        # An article that moved down to the end of a full list may now rank below
+        # articles that were never cached
+        if was_full and removed and patched[-1]["id"] == article_id:
+            return None
+        return patched[:NEWS_FEED_CACHE_SIZE]
+    if was_full and removed:
+        return None
+    return patched
+
+async def ensure_news_feed_indexes():
+    await db.admin_news.create_index("id")
+    await db.admin_news.create_index([("categories", 1), ("is_pinned", -1), ("priority", 1), ("created_at", -1)])
+    await db.admin_news.create_index([("is_pinned", -1), ("priority", 1), ("created_at", -1)])
+    # Bulk pushes from other services replay safely on the same key
+    await db.admin_news.create_index(
+        "idempotency_key", unique=True,
+        partialFilterExpression={"idempotency_key": {"$type": "string"}}
+    )
+
+async def migrate_news_categories() -> int:
+    """Backfill `categories` from the legacy free-text `category` field"""
+    result = await db.admin_news.update_many(
+        {"categories": {"$exists": False}},
+        [{"$set": {"categories": [{"$toLower": {"$trim": {"input": {"$ifNull": ["$category", "local"]}}}}]}}]
+    )
+    return result.modified_count
+
+async def _sync_feed_version():
+    """Drop cached feeds when another worker has written since we last looked"""
+    global _feed_version, _version_checked_at
+    if _version_checked_at is not None and time.monotonic() - _version_checked_at < FEED_VERSION_CHECK_SECONDS:
+        return
+    meta = await db.news_feed_meta.find_one({"id": "feed_version"}, {"_id": 0, "version": 1})
+    version = meta["version"] if meta else 0
+    if version != _feed_version:
+        _feeds.clear()
+        _rendered.clear()
+        _feed_version = version
+    _version_checked_at = time.monotonic()
+
+async def load_feed(feed: str) -> List[dict]:
+    await _sync_feed_version()
+    if feed in _feeds:
+        return _feeds[feed]
+    version = _feed_version
+    docs = await db.admin_news.find(feed_query(feed), {"_id": 0}).sort(FEED_SORT).to_list(NEWS_FEED_CACHE_SIZE)
+    # A write that landed while we were reading makes this copy stale; don't keep it
+    if version == _feed_version:
+        _feeds[feed] = docs
+    return docs
+
+async def get_feed(category: Optional[str], limit: int) -> List[dict]:
+    """Active articles in feed order: everything, or pinned ones plus the category's own"""
+    if limit > NEWS_FEED_CACHE_SIZE:
+        query = feed_query(ALL_FEED)
+        if category:
+            query["$or"] = [{"categories": category}, {"is_pinned": True}]
+        return await db.admin_news.find(query, {"_id": 0}).sort(FEED_SORT).to_list(limit)
+
+    if not category:
+        docs = await load_feed(ALL_FEED)
+    else:
+        pinned = await load_feed(PINNED_FEED)
+        own = await load_feed(category)
+        docs = sort_feed(list({d["id"]: d for d in pinned + own}.values()))
+    # Callers decorate the items; keep the cached documents untouched
+    return [dict(d) for d in docs[:limit]]
+
+async def news_changed(before: Optional[dict], after: Optional[dict]):
+    """Patch cached feeds after an admin write and bump the version other workers watch"""
+    global _feed_version, _version_checked_at
+    meta = await db.news_feed_meta.find_one_and_update(
+        {"id": "feed_version"}, {"$inc": {"version": 1}},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    in_step = _feed_version is not None and meta["version"] == _feed_version + 1
+    _feed_version = meta["version"]
+    _version_checked_at = time.monotonic()
+    _rendered.clear()
+    if not in_step:
+        # Another worker wrote in between; reload lazily rather than patch a stale copy
+        _feeds.clear()
+        return
+
+    article_id = (after or before)["id"]
+    after = {k: v for k, v in after.items() if k != "_id"} if after else None
+    affected = {ALL_FEED, PINNED_FEED}
+    for doc in (before, after):
+        if doc:
+            affected.update(doc.get("categories", []))
+
+    for feed in affected:
+        if feed in _feeds:
+            patched = patch_feed(_feeds[feed], feed, article_id, after)
+            if patched is None:
+                _feeds.pop(feed)
+            else:
+                _feeds[feed] = patched
+
+async def invalidate_news_feeds():
+    """Drop every cached feed after a bulk write, here and (via the version) elsewhere"""
+    global _feed_version, _version_checked_at
+    meta = await db.news_feed_meta.find_one_and_update(
+        {"id": "feed_version"}, {"$inc": {"version": 1}},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    _feeds.clear()
+    _rendered.clear()
+    _feed_version = meta["version"]
+    _version_checked_at = time.monotonic()
+
+async def rendered_feed(key: tuple, build: Callable[[], Awaitable[dict]]) -> bytes:
+    """Serialized response for one feed variant, built at most once per version and TTL"""
+    await _sync_feed_version()
+    entry = _rendered.get(key)
+    if entry and entry[0] == _feed_version and time.monotonic() - entry[1] < FEED_RENDER_TTL_SECONDS:
+        return entry[2]
+
+    version = _feed_version
+    rendered_at = time.monotonic()
+    body = json.dumps(await build(), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if version == _feed_version:
+        if key not in _rendered and len(_rendered) >= MAX_RENDERED_FEEDS:
+            _rendered.pop(next(iter(_rendered)))
+        _rendered[key] = (version, rendered_at, body)
+    return body
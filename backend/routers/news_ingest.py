@@ -0,0 +1,173 @@
+"""News ingestion - fetch every distinct feed once per cycle and upsert articles in bulk
+
+Feeds are fetched concurrently (bounded by FEED_FETCH_CONCURRENCY) with conditional
+GET: the ETag / Last-Modified from the previous cycle is sent back, and a body whose
+hash has not changed is treated like a 304 for servers that ignore those headers.
+Articles are keyed by a hash of their canonical URL, so the same story reached from
+several feeds becomes one document listing all of its categories.
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httpx
+from pymongo import UpdateOne
+
+FEED_FETCH_CONCURRENCY = int(os.environ.get("NEWS_FEED_CONCURRENCY", "6"))
+FEED_TIMEOUT_SECONDS = 20.0
+
+FEED_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/rss+xml, application/xml, text/xml, text/html;q=0.9, */*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5,te;q=0.3"
+}
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src", "cmpid", "ito", "from", "source"}
+
+def canonical_url(url: str) -> str:
+    """Lower-case scheme/host, drop fragment, tracking params and trailing slash, sort the query"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, urlencode(query), ""))
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()[:32]
+
+def parse_published(value) -> Optional[str]:
+    """RSS pubDate (RFC 822) or ISO string -> UTC ISO string; None when missing or unparseable"""
+    if value:
+        for parse in (parsedate_to_datetime, lambda v: datetime.fromisoformat(v.replace("Z", "+00:00"))):
+            try:
+                dt = parse(value.strip())
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                return dt.astimezone(timezone.utc).isoformat()
+            except (TypeError, ValueError, IndexError):
+                continue
+    return None
+
+def normalize_published(value) -> str:
+    """parse_published, falling back to now"""
+    return parse_published(value) or datetime.now(timezone.utc).isoformat()
+
+def conditional_headers(state: Optional[dict]) -> dict:
+    headers = dict(FEED_HEADERS)
+    if state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+async def fetch_feed(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str, state: Optional[dict]) -> dict:
+    """Conditional GET of one feed; status is ok, not_modified, unchanged or error"""
+    result = {"url": url, "status": "error", "content": None}
+    try:
+        async with semaphore:
+            response = await client.get(url, headers=conditional_headers(state), timeout=FEED_TIMEOUT_SECONDS, follow_redirects=True)
+    except httpx.HTTPError as e:
+        result["error"] = str(e) or type(e).__name__
+        return result
+
+    if response.status_code == 304:
+        result["status"] = "not_modified"
+        return result
+    if response.status_code != 200:
+        result["error"] = f"HTTP {response.status_code}"
+        return result
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    result.update({
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": content_hash
+    })
+    if state and state.get("content_hash") == content_hash:
+        result["status"] = "unchanged"
+        return result
+
+    result["status"] = "ok"
+    result["content"] = response.content
+    return result
+
+async def fetch_all_feeds(urls: Iterable[str], states: Dict[str, dict], client: Optional[httpx.AsyncClient] = None) -> List[dict]:
+    """Fetch each distinct URL once, at most FEED_FETCH_CONCURRENCY at a time"""
+    semaphore = asyncio.Semaphore(FEED_FETCH_CONCURRENCY)
+    distinct = list(dict.fromkeys(urls))
+    if client is not None:
+        return await asyncio.gather(*(fetch_feed(client, semaphore, url, states.get(url)) for url in distinct))
+    async with httpx.AsyncClient() as own_client:
+        return await asyncio.gather(*(fetch_feed(own_client, semaphore, url, states.get(url)) for url in distinct))
+
+def merge_articles(batches: Iterable[Tuple[List[str], List[dict]]]) -> Dict[str, dict]:
+    """Dedupe parsed items by canonical-URL hash, unioning the categories of every feed they came from"""
+    merged = {}
+    for categories, items in batches:
+        for item in items:
+            link = (item.get("link") or "").strip()
+            if not link.startswith("http"):
+                continue
+            key = url_hash(link)
+            article = merged.get(key)
+            if article is None:
+                article = {**item, "url_hash": key, "canonical_url": canonical_url(link), "categories": []}
+                merged[key] = article
+            else:
+                # Fill gaps from a later feed without overwriting what the first one had
+                for field, value in item.items():
+                    if value and not article.get(field):
+                        article[field] = value
+            for category in categories:
+                if category not in article["categories"]:
+                    article["categories"].append(category)
+    return merged
+
+def article_upserts(articles: Dict[str, dict], now: str, insert_only: Iterable[str] = ()) -> List[UpdateOne]:
+    """One upsert per article; categories only ever grow, id/created_at and insert_only fields are set once.
+    published_at is overwritten only by a date the feed supplied; undated items keep their first-seen time."""
+    ops = []
+    for key, article in articles.items():
+        once = {k: article[k] for k in insert_only if k in article}
+        fields = {k: v for k, v in article.items() if k not in ("url_hash", "categories", "id", "category") and k not in once}
+        published = parse_published(article.get("published_at"))
+        if published:
+            fields["published_at"] = published
+        else:
+            fields.pop("published_at", None)
+            once["published_at"] = now
+        fields["last_seen_at"] = now
+        ops.append(UpdateOne(
+            {"url_hash": key},
+            {
+                "$set": fields,
+                "$setOnInsert": {**once, "id": key, "created_at": now},
+                "$addToSet": {"categories": {"$each": article["categories"]}}
+            },
+            upsert=True
+        ))
+    return ops
+
+def feed_state_updates(results: List[dict], now: str) -> List[UpdateOne]:
+    ops = []
+    for result in results:
+        update = {"last_status": result["status"], "last_checked_at": now, "last_error": result.get("error")}
+        if result["status"] in ("ok", "unchanged"):
+            update.update({
+                "etag": result.get("etag"),
+                "last_modified": result.get("last_modified"),
+                "content_hash": result.get("content_hash"),
+                "last_fetched_at": now
+            })
+        ops.append(UpdateOne({"url": result["url"]}, {"$set": update}, upsert=True))
+    return ops
@@ -0,0 +1,196 @@
+"""AI rephrasing for news - cached, rate-limited and batched
+
+Results are stored in ai_rephrase_cache under a hash of (prompt version, title, summary),
+so a rerun or a repeated use_ai request never pays for the same article twice. Cache
+misses go to the model REPHRASE_BATCH_SIZE articles per chat call (JSON in, JSON out)
+with at most REPHRASE_CONCURRENCY calls in flight. NEWS_AI_BACKEND=stub swaps the model
+for a local echo so the whole path runs offline.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+import httpx
+from pymongo import UpdateOne
+from .utils import db, now_iso
+
+# Bump whenever the prompt or model changes so old cache entries stop matching
+REPHRASE_PROMPT_VERSION = "2"
+REPHRASE_MODEL = "gpt-4o-mini"
+
+OPENAI_CHAT_URL = os.environ.get("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+
+REPHRASE_BATCH_SIZE = int(os.environ.get("NEWS_AI_BATCH_SIZE", "8"))
+REPHRASE_CONCURRENCY = int(os.environ.get("NEWS_AI_CONCURRENCY", "3"))
+
+# In-process copy of recent cache entries in front of Mongo
+MEMORY_CACHE_SIZE = 2000
+
+REPHRASE_SYSTEM_PROMPT = (
+    "You are a professional news editor. Rephrase each news title and summary to be original "
+    "while preserving all key facts. Keep it concise and professional; summaries are 2-3 sentences. "
+    "The input is JSON {\"articles\": [{\"i\": number, \"title\": string, \"summary\": string}]}. "
+    "Reply with JSON {\"articles\": [{\"i\": number, \"title\": string, \"summary\": string}]} "
+    "containing every input i exactly once."
+)
+
+_memory_cache: Dict[str, Dict] = {}
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop = None
+
+def rephrase_backend() -> Optional[str]:
+    """openai, stub, or None when rephrasing is unavailable"""
+    backend = os.environ.get("NEWS_AI_BACKEND", "openai")
+    if backend == "stub":
+        return "stub"
+    return "openai" if os.environ.get("OPENAI_API_KEY") else None
+
+def rephrase_key(title: str, summary: str, backend: str = "openai") -> str:
+    # Stub output is keyed apart so it can never be served as a model result
+    model = REPHRASE_MODEL if backend == "openai" else backend
+    payload = json.dumps([REPHRASE_PROMPT_VERSION, model, title or "", summary or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _remember(key: str, result: Dict):
+    _memory_cache[key] = result
+    if len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.pop(next(iter(_memory_cache)))
+
+def _rephrase_semaphore() -> asyncio.Semaphore:
+    # One limiter per event loop; tests and CLI runs create fresh loops
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore, _semaphore_loop = asyncio.Semaphore(REPHRASE_CONCURRENCY), loop
+    return _semaphore
+
+def parse_batch_output(content: str, batch: List[Dict]) -> Dict[int, Dict]:
+    """Split the model's JSON reply into {i: {title, summary}}, dropping anything malformed"""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    try:
+        articles = json.loads(text).get("articles", [])
+    except (ValueError, AttributeError):
+        return {}
+
+    expected = {item["i"] for item in batch}
+    results = {}
+    for article in articles if isinstance(articles, list) else []:
+        if not isinstance(article, dict):
+            continue
+        i, title, summary = article.get("i"), article.get("title"), article.get("summary")
+        if i in expected and isinstance(title, str) and isinstance(summary, str) and title.strip() and summary.strip():
+            results[i] = {"title": title.strip(), "summary": summary.strip()}
+    return results
+
+def stub_batch_reply(batch: List[Dict]) -> str:
+    """Offline stand-in for the model: echoes each article with whitespace normalized"""
+    return json.dumps({"articles": [
+        {"i": item["i"], "title": " ".join(item["title"].split()), "summary": " ".join(item["summary"].split())}
+        for item in batch
+    ]}, ensure_ascii=False)
+
+async def request_batch(client: httpx.AsyncClient, batch: List[Dict]) -> Dict[int, Dict]:
+    """One model call for a batch of {i, title, summary}"""
+    if rephrase_backend() == "stub":
+        return parse_batch_output(stub_batch_reply(batch), batch)
+
+    async with _rephrase_semaphore():
+        resp = await client.post(
+            OPENAI_CHAT_URL,
+            headers={"Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY')}", "Content-Type": "application/json"},
+            json={
+                "model": REPHRASE_MODEL,
+                "messages": [
+                    {"role": "system", "content": REPHRASE_SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps({"articles": batch}, ensure_ascii=False)}
+                ],
+                "response_format": {"type": "json_object"},
+                "max_tokens": 250 * len(batch)
+            },
+            timeout=60.0
+        )
+    resp.raise_for_status()
+    return parse_batch_output(resp.json()["choices"][0]["message"]["content"], batch)
+
+async def rephrase_uncached(articles: Dict[str, Dict], client: Optional[httpx.AsyncClient] = None) -> Dict[str, Dict]:
+    """Rephrase {key: {title, summary}} in batches; keys the model fails on are left out"""
+    keys = list(articles)
+    batches = [keys[start:start + REPHRASE_BATCH_SIZE] for start in range(0, len(keys), REPHRASE_BATCH_SIZE)]
+
+    async def run_batch(http: httpx.AsyncClient, batch_keys: List[str]) -> Dict[str, Dict]:
+        batch = [
+            {"i": i, "title": articles[key].get("title") or "", "summary": articles[key].get("summary") or ""}
+            for i, key in enumerate(batch_keys)
+        ]
+        try:
+            by_index = await request_batch(http, batch)
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logging.error(f"AI rephrase batch error: {e}")
+            return {}
+        return {batch_keys[i]: result for i, result in by_index.items()}
+
+    async def run_all(http: httpx.AsyncClient) -> Dict[str, Dict]:
+        results = {}
+        for part in await asyncio.gather(*(run_batch(http, batch_keys) for batch_keys in batches)):
+            results.update(part)
+        return results
+
+    if client is not None:
+        return await run_all(client)
+    async with httpx.AsyncClient() as own_client:
+        return await run_all(own_client)
+
+async def rephrase_articles(articles: List[Dict]) -> List[Dict]:
+    """{title, summary, is_ai_rephrased} for each article, from cache where possible"""
+    originals = [
+        {"title": a.get("title") or "", "summary": a.get("summary") or "", "is_ai_rephrased": False}
+        for a in articles
+    ]
+    backend = rephrase_backend()
+    if not articles or not backend:
+        return originals
+
+    keys = [rephrase_key(o["title"], o["summary"], backend) for o in originals]
+    found = {key: _memory_cache[key] for key in keys if key in _memory_cache}
+
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        try:
+            async for doc in db.ai_rephrase_cache.find({"key": {"$in": missing}}, {"_id": 0, "key": 1, "title": 1, "summary": 1}):
+                found[doc["key"]] = {"title": doc["title"], "summary": doc["summary"]}
+                _remember(doc["key"], found[doc["key"]])
+        except Exception as e:
+            logging.error(f"AI rephrase cache read error: {e}")
+
+    todo = {key: original for key, original in zip(keys, originals) if key not in found}
+    if todo:
+        fresh = await rephrase_uncached(todo)
+        for key, result in fresh.items():
+            _remember(key, result)
+        found.update(fresh)
+        if fresh:
+            created_at = now_iso()
+            try:
+                await db.ai_rephrase_cache.bulk_write([
+                    UpdateOne(
+                        {"key": key},
+                        {"$setOnInsert": {**result, "key": key, "prompt_version": REPHRASE_PROMPT_VERSION, "created_at": created_at}},
+                        upsert=True
+                    )
+                    for key, result in fresh.items()
+                ], ordered=False)
+            except Exception as e:
+                logging.error(f"AI rephrase cache write error: {e}")
+
+    return [
+        {**found[key], "is_ai_rephrased": True} if key in found else original
+        for key, original in zip(keys, originals)
+    ]
+
+async def ensure_rephrase_cache_indexes():
+    await db.ai_rephrase_cache.create_index("key", unique=True)
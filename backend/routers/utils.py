@@ -5,6 +5,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
+import asyncio
 import os
 import uuid
 import jwt
@@ -35,6 +36,16 @@ def generate_id():
 def now_iso():
     return datetime.now(timezone.utc).isoformat()
 
+async def cancel_task(task):
+    """Cancel a background loop started with asyncio.create_task and wait for it to stop"""
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
 def create_token(user_id: str, role: str):
     payload = {
         "user_id": user_id,
@@ -0,0 +1,203 @@
+"""Health vitals storage - heart rate, SpO2 and stress samples with multi-resolution rollups
+
+Raw samples go into a Mongo time-series collection. Every write also folds the samples
+into min/max/sum/count rollups at 5-minute, hourly and daily granularity, so history
+queries read a bounded number of rollup rows instead of raw samples.
+"""
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid
+from .utils import db, generate_id
+
+VITAL_METRICS = ["heart_rate", "heart_rate_resting", "heart_rate_min", "heart_rate_max", "spo2", "stress"]
+
+# Per-kind log documents (heart_rate_logs, ...) -> {metric: field holding its value}
+LOG_VITAL_FIELDS = {
+    "heart_rate_logs": {"heart_rate": "current", "heart_rate_resting": "resting", "heart_rate_min": "min", "heart_rate_max": "max"},
+    "spo2_logs": {"spo2": "spo2"},
+    "stress_logs": {"stress": "stress_level"}
+}
+
+LOG_MIGRATION_BATCH_SIZE = 1000
+
+# Resolution name -> bucket width in seconds, finest first
+ROLLUP_RESOLUTIONS = {
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60
+}
+
+# Queries use the finest resolution that returns at most this many rows
+MAX_SERIES_POINTS = 400
+
+VITAL_SAMPLE_RETENTION_DAYS = 90
+
+async def ensure_vitals_storage():
+    """Create the time-series collection and rollup indexes"""
+    try:
+        await db.create_collection(
+            "vital_samples",
+            timeseries={"timeField": "ts", "metaField": "meta", "granularity": "minutes"},
+            expireAfterSeconds=VITAL_SAMPLE_RETENTION_DAYS * 24 * 60 * 60
+        )
+    except CollectionInvalid:
+        pass  # Already exists
+
+    await db.vital_rollups.create_index(
+        [("user_id", 1), ("metric", 1), ("resolution", 1), ("bucket", 1)], unique=True
+    )
+
+def is_number(value) -> bool:
+    """int or float; bool is an int subclass but not a reading"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def parse_sample_time(value: Optional[str]) -> datetime:
+    """Parse an ISO timestamp from a device, falling back to now"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc)
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    """Floor a timestamp to the start of its rollup bucket"""
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+async def record_vital_samples(user_id: str, samples: List[dict], source: Optional[str] = None):
+    """Store samples ({metric, ts, value}) and fold them into every rollup resolution"""
+    samples = [s for s in samples if s["metric"] in VITAL_METRICS and is_number(s.get("value"))]
+    if not samples:
+        return
+
+    await db.vital_samples.insert_many([
+        {"ts": s["ts"], "meta": {"user_id": user_id, "metric": s["metric"]}, "value": s["value"], "source": source}
+        for s in samples
+    ])
+
+    # Pre-aggregate in memory so each bucket gets one upsert per batch
+    rollups = {}
+    for s in samples:
+        for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+            key = (s["metric"], resolution, bucket_start(s["ts"], seconds))
+            r = rollups.get(key)
+            if r:
+                r["min"] = min(r["min"], s["value"])
+                r["max"] = max(r["max"], s["value"])
+                r["sum"] += s["value"]
+                r["count"] += 1
+            else:
+                rollups[key] = {"min": s["value"], "max": s["value"], "sum": s["value"], "count": 1}
+
+    await db.vital_rollups.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "metric": metric, "resolution": resolution, "bucket": bucket},
+            {
+                "$min": {"min": r["min"]},
+                "$max": {"max": r["max"]},
+                "$inc": {"sum": r["sum"], "count": r["count"]}
+            },
+            upsert=True
+        )
+        for (metric, resolution, bucket), r in rollups.items()
+    ], ordered=False)
+
+def log_vital_samples(doc: dict, fields: dict) -> List[dict]:
+    """Vital samples held by one *_logs document"""
+    ts = parse_sample_time(doc.get("recorded_at") or doc.get("created_at"))
+    return [{"metric": metric, "ts": ts, "value": doc.get(field)} for metric, field in fields.items()]
+
+async def migrate_vital_logs() -> int:
+    """Fold *_logs documents written before vitals storage into samples and rollups, once each
+
+    Each batch is claimed as in_vitals "migrating" before it is rolled up, so a run that dies
+    mid-batch leaves those documents out of later runs rather than counting them twice.
+    Documents without a numeric reading are marked "skipped".
+    """
+    migrated = 0
+    projection = {"_id": 1, "user_id": 1, "device_brand": 1, "recorded_at": 1, "created_at": 1}
+    for collection, fields in LOG_VITAL_FIELDS.items():
+        while True:
+            pending = await db[collection].find(
+                {"in_vitals": {"$exists": False}}, {"_id": 1}
+            ).to_list(LOG_MIGRATION_BATCH_SIZE)
+            if not pending:
+                break
+            claim = generate_id()
+            await db[collection].update_many(
+                {"_id": {"$in": [d["_id"] for d in pending]}, "in_vitals": {"$exists": False}},
+                {"$set": {"in_vitals": "migrating", "vitals_claim": claim}}
+            )
+            docs = await db[collection].find(
+                {"vitals_claim": claim, "in_vitals": "migrating"}, {**projection, **{f: 1 for f in fields.values()}}
+            ).to_list(LOG_MIGRATION_BATCH_SIZE)
+
+            by_source = {}
+            done, skipped = [], []
+            for doc in docs:
+                samples = [s for s in log_vital_samples(doc, fields) if is_number(s["value"])]
+                if doc.get("user_id") and samples:
+                    by_source.setdefault((doc["user_id"], doc.get("device_brand")), []).extend(samples)
+                    done.append(doc["_id"])
+                else:
+                    skipped.append(doc["_id"])
+            for (user_id, source), samples in by_source.items():
+                await record_vital_samples(user_id, samples, source=source)
+
+            if done:
+                await db[collection].update_many({"_id": {"$in": done}}, {"$set": {"in_vitals": True}})
+            if skipped:
+                await db[collection].update_many({"_id": {"$in": skipped}}, {"$set": {"in_vitals": "skipped"}})
+            migrated += len(done)
+
+        stranded = await db[collection].count_documents({"in_vitals": "migrating"})
+        if stranded:
+            logging.warning(f"{stranded} {collection} documents were left mid-migration and are not in vitals")
+    return migrated
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """Finest resolution whose bucket count over the range stays within MAX_SERIES_POINTS"""
+    span = (end - start).total_seconds()
+    for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+        if span / seconds <= MAX_SERIES_POINTS:
+            return resolution
+    return list(ROLLUP_RESOLUTIONS)[-1]
+
+async def get_vital_series(user_id: str, metric: str, days: int, resolution: Optional[str] = None) -> dict:
+    """Read a metric's rollup series for the last N days"""
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    # An explicit resolution is honoured only while it stays within MAX_SERIES_POINTS
+    finest = pick_resolution(start, end)
+    resolutions = list(ROLLUP_RESOLUTIONS)
+    if not resolution or resolutions.index(resolution) < resolutions.index(finest):
+        resolution = finest
+
+    rows = await db.vital_rollups.find(
+        {
+            "user_id": user_id,
+            "metric": metric,
+            "resolution": resolution,
+            "bucket": {"$gte": bucket_start(start, ROLLUP_RESOLUTIONS[resolution])}
+        },
+        {"_id": 0, "bucket": 1, "min": 1, "max": 1, "sum": 1, "count": 1}
+    ).sort("bucket", 1).to_list(None)
+
+    points = [
+        {
+            "bucket": r["bucket"].replace(tzinfo=timezone.utc).isoformat(),
+            "min": r["min"],
+            "max": r["max"],
+            "avg": round(r["sum"] / r["count"], 1) if r["count"] else None,
+            "count": r["count"]
+        }
+        for r in rows
+    ]
+
+    return {"metric": metric, "resolution": resolution, "points": points}
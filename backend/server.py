@@ -125,76 +125,31 @@ app.include_router(benefits_router, prefix="/api")
 app.include_router(admin_users_router, prefix="/api")
 app.include_router(clone_router, prefix="/api")
 
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response
+from routers.certificate_render import get_share_html, get_share_image_path
+
+# Share pages and images are rendered when the certificate is issued
+CERTIFICATE_PAGE_CACHE = "public, max-age=86400"
+CERTIFICATE_ASSET_CACHE = "public, max-age=31536000, immutable"
 
 # Certificate OpenGraph preview endpoint
 @app.get("/certificate/{certificate_id}", response_class=HTMLResponse)
 async def certificate_og_page(certificate_id: str):
     """Certificate page with OpenGraph meta tags for social sharing"""
-    certificate = await db.certificates.find_one({"id": certificate_id}, {"_id": 0})
+    page = await get_share_html(certificate_id)
     
-    if not certificate:
+    if page is None:
         return HTMLResponse(content="<html><body><h1>Certificate not found</h1></body></html>", status_code=404)
     
-    user_name = certificate.get("user_name", "Student")
-    course_title = certificate.get("course_title", "Course")
-    cert_number = certificate.get("certificate_number", "")
-    issued_at = certificate.get("issued_at", "")[:10] if certificate.get("issued_at") else ""
-    
-    # Generate a dynamic certificate image URL (or use a placeholder)
-    og_image = "https://images.unsplash.com/photo-1589330694653-ded6df03f754?w=1200&h=630&fit=crop"
-    
-    frontend_url = os.environ.get("FRONTEND_URL", "https://www.mydammaiguda.in")
-    page_url = f"{frontend_url}/certificate/{certificate_id}"
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{user_name} - {course_title} Certificate | My Dammaiguda</title>
-        
-        <!-- OpenGraph Meta Tags -->
-        <meta property="og:title" content="{user_name} completed {course_title}!" />
-        <meta property="og:description" content="Certificate of Completion from AIT Education Platform. Certificate No: {cert_number}" />
-        <meta property="og:image" content="{og_image}" />
-        <meta property="og:url" content="{page_url}" />
-        <meta property="og:type" content="website" />
-        <meta property="og:site_name" content="My Dammaiguda - AIT Education" />
-        
-        <!-- Twitter Card Meta Tags -->
-        <meta name="twitter:card" content="summary_large_image" />
-        <meta name="twitter:title" content="{user_name} completed {course_title}!" />
-        <meta name="twitter:description" content="Certificate of Completion from AIT Education Platform" />
-        <meta name="twitter:image" content="{og_image}" />
-        
-        <!-- Redirect to frontend app -->
-        <meta http-equiv="refresh" content="0; url={frontend_url}/education/certificate/{certificate_id}">
-        
-        <style>
-            body {{ font-family: -apple-system, BlinkMacSystemFont, sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: linear-gradient(135deg, #0D9488 0%, #1e293b 100%); color: white; }}
-            .card {{ background: white; color: #333; padding: 40px; border-radius: 16px; max-width: 500px; text-align: center; box-shadow: 0 25px 50px rgba(0,0,0,0.3); }}
-            h1 {{ color: #0D9488; margin-bottom: 10px; }}
-            .cert-number {{ font-family: monospace; background: #f1f5f9; padding: 8px 16px; border-radius: 8px; display: inline-block; margin: 20px 0; }}
-            .link {{ color: #0D9488; text-decoration: none; }}
-        </style>
-    </head>
-    <body>
-        <div class="card">
-            <h1>Certificate of Completion</h1>
-            <h2>{user_name}</h2>
-            <p>has successfully completed</p>
-            <h3>{course_title}</h3>
-            <div class="cert-number">{cert_number}</div>
-            <p>Issued: {issued_at}</p>
-            <p><a href="{frontend_url}/education/certificate/{certificate_id}" class="link">View Full Certificate →</a></p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return HTMLResponse(content=html)
+    return Response(content=page, media_type="text/html; charset=utf-8", headers={"Cache-Control": CERTIFICATE_PAGE_CACHE})
+
+@app.get("/certificate/assets/{key}.png")
+async def certificate_share_image(key: str):
+    """Pre-rendered certificate share image (content-addressed)"""
+    path = get_share_image_path(key)
+    if path is None:
+        return Response(status_code=404)
+    return FileResponse(path, media_type="image/png", headers={"Cache-Control": CERTIFICATE_ASSET_CACHE})
 
 # Health check endpoint
 @app.get("/api/health")
@@ -222,6 +177,7 @@ async def root():
 
 # Additional static endpoints for backwards compatibility
 from routers.utils import db, now_iso
+from routers.cubes import query_colony_cubes
 
 @app.get("/api/dump-yard/info")
 async def get_dumpyard_info():
@@ -481,17 +437,17 @@ async def get_admin_stats():
     }
 
 @app.get("/api/admin/issues-heatmap")
-async def get_issues_heatmap():
+async def get_issues_heatmap(start_date: str = "0000-00-00", end_date: str = "9999-99-99"):
     """Get issues heatmap data by colony"""
-    pipeline = [
-        {"$match": {"reporter_colony": {"$ne": None}}},
-        {"$group": {"_id": "$reporter_colony", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 20}
-    ]
+    cells = await query_colony_cubes(start_date, end_date, metrics=["issues_reported"])
+    
+    counts = {}
+    for cell in cells:
+        counts[cell["colony"]] = counts.get(cell["colony"], 0) + cell["value"]
     
-    heatmap = await db.issues.aggregate(pipeline).to_list(20)
-    return heatmap
+    heatmap = [{"_id": colony, "count": count} for colony, count in counts.items()]
+    heatmap.sort(key=lambda row: row["count"], reverse=True)
+    return heatmap[:20]
 
 @app.get("/api/admin/users")
 async def get_admin_users():
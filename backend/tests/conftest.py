@@ -0,0 +1,127 @@
+"""
+Shared setup for the in-process tests
+- Makes the backend importable and gives it placeholder Mongo settings (no server is contacted)
+- FakeDb / FakeCollection / FakeCursor stand in for Motor
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+
+def matches(doc, query):
+    """Equality, $exists and $in filters; enough for the queries the routers issue"""
+    for field, cond in (query or {}).items():
+        if isinstance(cond, dict) and "$exists" in cond:
+            if (field in doc) != cond["$exists"]:
+                return False
+        elif isinstance(cond, dict) and "$in" in cond:
+            if doc.get(field) not in cond["$in"]:
+                return False
+        elif doc.get(field) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """In-memory collection that records every write as (method, *args) in `writes`
+
+    fail makes every write raise, failed_indexes makes bulk_write report those ops as
+    failed, and delay sleeps before each write. Updates apply $set to matching docs.
+    """
+
+    def __init__(self, docs=(), fail=False, failed_indexes=(), delay=0):
+        self.docs = list(docs)
+        self.fail = fail
+        self.failed_indexes = failed_indexes
+        self.delay = delay
+        self.queries = []
+        self.writes = []
+
+    def calls(self, method):
+        """Arguments of each recorded call to method; a lone argument is unwrapped"""
+        return [args[0] if len(args) == 1 else args for name, *args in self.writes if name == method]
+
+    async def _write(self, method, *args):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.writes.append((method, *args))
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def find_one(self, query=None, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    async def count_documents(self, query):
+        return sum(1 for d in self.docs if matches(d, query))
+
+    async def insert_one(self, doc):
+        await self._write("insert_one", doc)
+
+    async def insert_many(self, docs):
+        await self._write("insert_many", docs)
+
+    async def update_one(self, query, update, upsert=False):
+        await self._write("update_one", query, update)
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update.get("$set", {}))
+                break
+
+    async def update_many(self, query, update):
+        await self._write("update_many", query, update)
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update.get("$set", {}))
+
+    async def bulk_write(self, ops, ordered=True):
+        await self._write("bulk_write", ops)
+        if self.failed_indexes:
+            raise BulkWriteError({
+                "writeErrors": [{"index": i, "code": 11000, "errmsg": "duplicate key"} for i in self.failed_indexes],
+                "nUpserted": len(ops) - len(self.failed_indexes)
+            })
+
+
+class FakeDb:
+    """Collections passed by name, plus an empty FakeCollection for any other name on first use"""
+
+    def __init__(self, **collections):
+        self.__dict__.update(collections)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        collection = FakeCollection()
+        setattr(self, name, collection)
+        return collection
+
+    def __getitem__(self, name):
+        return getattr(self, name)
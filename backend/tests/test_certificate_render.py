@@ -0,0 +1,82 @@
+"""
+Certificate share asset tests (in-process, no server needed)
+- Share keys are stable for the same certificate and change with its fields or the template
+- Names and titles are HTML-escaped in the share page
+- The share image is rendered at the OpenGraph size
+- Re-rendering keeps files written after the run started
+"""
+import asyncio
+import io
+import os
+import time
+
+from PIL import Image
+
+from conftest import FakeCollection, FakeDb
+from routers import certificate_render
+from routers.certificate_render import (
+    IMAGE_SIZE, render_certificate_html, render_certificate_png, share_fields, share_key
+)
+
+CERTIFICATE = {
+    "id": "cert-1",
+    "user_name": "Ravi <script>alert(1)</script>",
+    "course_title": "Python & \"Data\" Basics",
+    "certificate_number": "AIT-2025-0001",
+    "issued_at": "2025-10-18T09:30:00+00:00"
+}
+
+
+class TestCertificateRender:
+    """Share keys, share page and share image"""
+
+    def test_share_key_is_stable(self):
+        fields = share_fields(CERTIFICATE)
+        assert share_key(fields) == share_key(share_fields(dict(CERTIFICATE)))
+        assert len(share_key(fields)) == 32
+        assert share_key({**fields, "user_name": "Someone Else"}) != share_key(fields)
+        print("✓ Same certificate, same key")
+
+    def test_template_version_changes_key(self, monkeypatch):
+        fields = share_fields(CERTIFICATE)
+        before = share_key(fields)
+        monkeypatch.setattr(certificate_render, "CERTIFICATE_TEMPLATE_VERSION", "test")
+        assert share_key(fields) != before
+        print("✓ Template bump changes every key")
+
+    def test_html_is_escaped(self):
+        fields = share_fields(CERTIFICATE)
+        page = render_certificate_html(fields, share_key(fields))
+        assert "<script>" not in page
+        assert "Ravi &lt;script&gt;alert(1)&lt;/script&gt;" in page
+        assert "Python &amp; &quot;Data&quot; Basics" in page
+        print("✓ User-supplied text is escaped")
+
+    def test_png_size(self):
+        for name in ("Ravi Kumar", "రవి కుమార్"):
+            png = render_certificate_png(share_fields({**CERTIFICATE, "user_name": name}))
+            image = Image.open(io.BytesIO(png))
+            assert image.format == "PNG" and image.size == IMAGE_SIZE
+        print("✓ Share image is 1200x630")
+
+    def test_rerender_keeps_files_newer_than_the_run(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(certificate_render, "CERTIFICATE_CACHE_DIR", tmp_path)
+        monkeypatch.setattr(certificate_render, "db", FakeDb(certificates=FakeCollection([CERTIFICATE])))
+        stale = tmp_path / "stale.png"
+        stale.write_bytes(b"old")
+        os.utime(stale, (time.time() - 60, time.time() - 60))
+
+        async def render_and_issue(certificate):
+            # Another certificate is issued mid-run
+            (tmp_path / "fresh.png").write_bytes(b"new")
+            return certificate_render.write_share_assets(certificate)
+
+        monkeypatch.setattr(certificate_render, "render_share_assets", render_and_issue)
+        result = asyncio.run(certificate_render.rerender_all_certificates())
+
+        key = share_key(share_fields(CERTIFICATE))
+        assert result == {"rendered": 1, "removed": 1}
+        assert not stale.exists()
+        assert (tmp_path / "fresh.png").exists()
+        assert (tmp_path / f"{key}.png").exists() and (tmp_path / f"{key}.html").exists()
+        print("✓ Only files older than the run are pruned")
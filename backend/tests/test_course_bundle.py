@@ -0,0 +1,67 @@
+"""
+Backend Tests for the Offline Course Bundle
+- GET /api/education/courses/{id}/bundle returns the course tree with a version ETag
+- If-None-Match with the current ETag returns 304
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+TEST_PHONE = "+919999999999"
+TEST_OTP = "123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get authorization headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/send-otp", json={"phone": TEST_PHONE})
+    assert response.status_code == 200, f"Failed to send OTP: {response.text}"
+    
+    response = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={"phone": TEST_PHONE, "otp": TEST_OTP})
+    assert response.status_code == 200, f"Failed to verify OTP: {response.text}"
+    
+    return {"Authorization": f"Bearer {response.json()['token']}", "Content-Type": "application/json"}
+
+
+@pytest.fixture(scope="module")
+def course_id():
+    response = requests.get(f"{BASE_URL}/api/education/courses?limit=1")
+    assert response.status_code == 200
+    courses = response.json()["courses"]
+    if not courses:
+        pytest.skip("No published courses")
+    return courses[0]["id"]
+
+
+class TestCourseBundle:
+    """Test /api/education/courses/{id}/bundle"""
+    
+    def test_bundle_contents(self, auth_headers, course_id):
+        response = requests.get(f"{BASE_URL}/api/education/courses/{course_id}/bundle", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers.get("ETag")
+        data = response.json()
+        for key in ["version", "course", "subjects", "lessons", "quizzes"]:
+            assert key in data, f"Missing {key}"
+        assert data["course"]["id"] == course_id
+        for quiz in data["quizzes"]:
+            assert "questions" not in quiz
+        print(f"✓ Bundle v{data['version']}: {len(data['subjects'])} subjects, {len(data['quizzes'])} quizzes")
+    
+    def test_bundle_not_modified(self, auth_headers, course_id):
+        first = requests.get(f"{BASE_URL}/api/education/courses/{course_id}/bundle", headers=auth_headers)
+        etag = first.headers["ETag"]
+        response = requests.get(
+            f"{BASE_URL}/api/education/courses/{course_id}/bundle",
+            headers={**auth_headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers.get("ETag") == etag
+        print("✓ Unchanged bundle revalidates with 304")
+    
+    def test_bundle_unknown_course(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/education/courses/does-not-exist/bundle", headers=auth_headers)
+        assert response.status_code == 404
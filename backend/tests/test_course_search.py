@@ -0,0 +1,69 @@
+"""
+Course search index tests (in-process, no server needed)
+- Prefix matching for search-as-you-type, including Telugu
+- Title matches rank above description matches
+- Multi-word queries require every word; category/featured filters apply
+"""
+from routers.course_search import CourseSearchIndex, tokenize
+
+COURSES = [
+    {
+        "id": "py", "title": "Python Programming Basics", "title_te": "పైథాన్ ప్రోగ్రామింగ్ బేసిక్స్",
+        "description": "Learn Python from scratch", "tags": ["python", "coding"],
+        "category": "tech", "is_featured": True, "created_at": "2025-01-01T00:00:00"
+    },
+    {
+        "id": "ds", "title": "Data Science", "description": "Pandas and Python for analysis",
+        "tags": ["data"], "category": "tech", "is_featured": False, "created_at": "2025-02-01T00:00:00"
+    },
+    {
+        "id": "en", "title": "Spoken English Course", "title_te": "స్పోకెన్ ఇంగ్లీష్ కోర్సు",
+        "description": "Daily speaking practice", "tags": ["english"],
+        "category": "language", "is_featured": True, "created_at": "2025-03-01T00:00:00"
+    }
+]
+
+
+class TestCourseSearch:
+    """Inverted index search over course fields"""
+
+    def test_tokenize_keeps_telugu_words_whole(self):
+        assert tokenize("పైథాన్ ప్రోగ్రామింగ్") == ["పైథాన్", "ప్రోగ్రామింగ్"]
+        assert tokenize("Python-Basics, 101!") == ["python", "basics", "101"]
+        print("✓ Tokenizer splits on whitespace/punctuation only")
+
+    def test_prefix_match_and_ranking(self):
+        index = CourseSearchIndex(COURSES)
+        ids, total = index.search("pyth")
+        assert total == 2
+        # Title hit beats a description-only hit
+        assert ids == ["py", "ds"]
+        print("✓ Prefix query ranks title matches first")
+
+    def test_telugu_prefix(self):
+        index = CourseSearchIndex(COURSES)
+        ids, _ = index.search("స్పోక")
+        assert ids == ["en"]
+        print("✓ Telugu prefix query matches title_te")
+
+    def test_all_words_required_and_filters(self):
+        index = CourseSearchIndex(COURSES)
+        assert index.search("python pandas")[0] == ["ds"]
+        assert index.search("python", featured=True)[0] == ["py"]
+        assert index.search("course", category="tech") == ([], 0)
+        assert index.search("   ") == ([], 0)
+        print("✓ Multi-word AND semantics and filters")
+
+    def test_pagination(self):
+        index = CourseSearchIndex(COURSES)
+        ids, total = index.search("python", limit=1, skip=1)
+        assert total == 2 and ids == ["ds"]
+        print("✓ skip/limit applied after ranking")
+
+    def test_wide_prefix_counts_every_match(self):
+        courses = [{"id": f"c{i}", "title": f"Batch{i:03d} Course"} for i in range(200)]
+        index = CourseSearchIndex(courses)
+        ids, total = index.search("batch", limit=5)
+        assert total == 200 and len(ids) == 5
+        assert index.search("batch1")[1] == 100
+        print("✓ A prefix covering many tokens matches all of them")
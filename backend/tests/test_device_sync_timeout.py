@@ -0,0 +1,44 @@
+"""
+Device sync timeout tests (in-process, no server needed)
+- An import that commits before the timeout is reported with its activity count
+- The shielded import still stamps last_synced_at and refreshes daily summaries
+"""
+import asyncio
+
+from conftest import FakeCollection, FakeDb
+from routers import fitness
+
+
+DEVICE = {"id": "d1", "device_name": "Pixel Watch", "device_type": "google_fit", "access_token": "t"}
+
+
+class TestSyncDeviceWithTimeout:
+    """sync_device_with_timeout when the timeout lands inside the shielded import"""
+
+    def test_committed_import_is_reported_and_finished(self, monkeypatch):
+        pending = [
+            {"_id": n, "user_id": "u1", "device_type": "google_fit", "processed": False, "steps": steps, "date": date}
+            for n, (steps, date) in enumerate([(500, "2025-10-17"), (700, "2025-10-18")])
+        ]
+        fake = FakeDb(pending_device_data=FakeCollection(pending))
+        summarized = []
+
+        async def slow_summary(user_id, date):
+            await asyncio.sleep(0.05)
+            summarized.append(date)
+
+        monkeypatch.setattr(fitness, "db", fake)
+        monkeypatch.setattr(fitness, "update_daily_fitness_summary", slow_summary)
+        monkeypatch.setattr(fitness, "DEVICE_SYNC_TIMEOUT_SECONDS", 0.01)
+
+        async def run():
+            result = await fitness.sync_device_with_timeout("u1", DEVICE)
+            await asyncio.sleep(0.2)  # let the shielded import finish
+            return result
+
+        result = asyncio.run(run())
+        assert result == {"device": "Pixel Watch", "status": "timeout", "activities": 2}
+        assert summarized == ["2025-10-17", "2025-10-18"]
+        [(query, update)] = fake.fitness_devices.calls("update_one")
+        assert query == {"id": "d1"} and "last_synced_at" in update["$set"]
+        print("✓ Timed-out sync reports its committed import and still refreshes summaries")
@@ -0,0 +1,68 @@
+"""
+Fitness points award tests (in-process, no server needed)
+- The ledger entry is written before anything is credited
+- A failed ledger write returns the reserved daily allowance
+- Failed follow-up writes stay pending and are retried alone
+"""
+import asyncio
+
+import pytest
+
+from conftest import FakeCollection, FakeDb
+from routers import fitness
+
+
+def fake_db(failing=()):
+    return FakeDb(**{name: FakeCollection(fail=True) for name in failing})
+
+
+@pytest.fixture
+def award(monkeypatch):
+    async def reserve(user_id, date, points):
+        return points
+
+    monkeypatch.setattr(fitness, "reserve_daily_fitness_points", reserve)
+
+    def run(failing=()):
+        fake = fake_db(failing)
+        monkeypatch.setattr(fitness, "db", fake)
+        return fake, asyncio.run(fitness.award_fitness_points("u1", {"activity_type": "walking", "steps": 5000}))
+    return run
+
+
+class TestAwardFitnessPoints:
+    """award_fitness_points and credit_fitness_award"""
+
+    def test_award_credits_everything(self, award):
+        fake, points = award()
+        assert points == 50
+        [entry] = fake.fitness_points_log.calls("insert_one")
+        assert entry["credit_pending"] is True and entry["points"] == 50
+        [(_, settle)] = fake.fitness_points_log.calls("update_one")
+        assert settle["$addToSet"]["credited"]["$each"] == list(fitness.FITNESS_CREDIT_STEPS)
+        assert settle["$set"] == {"credit_pending": False}
+        [(query, _)] = fake.points_transactions.calls("update_one")
+        assert query == {"source_id": entry["id"]}
+        print("✓ Ledger first, then wallet, transaction and total")
+
+    def test_failed_ledger_write_releases_reservation(self, monkeypatch):
+        async def reserve(user_id, date, points):
+            return points
+
+        fake = fake_db(failing=("fitness_points_log",))
+        monkeypatch.setattr(fitness, "db", fake)
+        monkeypatch.setattr(fitness, "reserve_daily_fitness_points", reserve)
+        with pytest.raises(RuntimeError):
+            asyncio.run(fitness.award_fitness_points("u1", {"activity_type": "walking", "steps": 5000}))
+        [(query, update)] = fake.fitness_points_daily.calls("update_one")
+        assert query["user_id"] == "u1" and update == {"$inc": {"points": -50}}
+        assert fake.wallets.writes == []
+        print("✓ Nothing paid, allowance handed back")
+
+    def test_failed_credit_stays_pending(self, award):
+        fake, points = award(failing=("wallets",))
+        assert points == 50
+        [(_, settle)] = fake.fitness_points_log.calls("update_one")
+        assert settle["$addToSet"]["credited"]["$each"] == ["transaction", "total"]
+        assert "$set" not in settle
+        print("✓ Partly credited awards stay pending with what succeeded recorded")
@@ -0,0 +1,64 @@
+"""
+Backend Tests for the Fitness Home Snapshot
+- GET /api/fitness/snapshot returns every home screen section in one call
+- Logging an activity invalidates the cached snapshot
+- Streak and badge sections match /streaks, /step-goal-streak and /badges
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+TEST_PHONE = "+919999999999"
+TEST_OTP = "123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get authorization headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/send-otp", json={"phone": TEST_PHONE})
+    assert response.status_code == 200, f"Failed to send OTP: {response.text}"
+    
+    response = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={"phone": TEST_PHONE, "otp": TEST_OTP})
+    assert response.status_code == 200, f"Failed to verify OTP: {response.text}"
+    
+    return {"Authorization": f"Bearer {response.json()['token']}", "Content-Type": "application/json"}
+
+
+class TestFitnessSnapshot:
+    """Test /api/fitness/snapshot"""
+    
+    def test_snapshot_sections(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/fitness/snapshot", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        for section in ["today", "weekly", "week_days", "streak", "step_goal_streak", "points", "badges"]:
+            assert section in data, f"Missing {section}"
+        assert len(data["week_days"]) == 7
+        assert data["points"]["today_remaining"] >= 0
+        print(f"✓ Snapshot: {data['today']['steps']} steps, streak {data['streak']['current_streak']}")
+    
+    def test_snapshot_reflects_new_activity(self, auth_headers):
+        before = requests.get(f"{BASE_URL}/api/fitness/snapshot", headers=auth_headers).json()
+        response = requests.post(f"{BASE_URL}/api/fitness/activity", headers=auth_headers, json={
+            "activity_type": "walking", "duration_minutes": 10, "steps": 1234
+        })
+        assert response.status_code == 200
+        after = requests.get(f"{BASE_URL}/api/fitness/snapshot", headers=auth_headers).json()
+        assert after["today"]["steps"] == before["today"]["steps"] + 1234
+        assert after["streak"]["active_today"] is True
+        print("✓ Snapshot refreshed after logging an activity")
+    
+    def test_snapshot_matches_streak_and_badge_endpoints(self, auth_headers):
+        data = requests.get(f"{BASE_URL}/api/fitness/snapshot", headers=auth_headers).json()
+        for section, path in [("streak", "streaks"), ("step_goal_streak", "step-goal-streak"), ("badges", "badges")]:
+            response = requests.get(f"{BASE_URL}/api/fitness/{path}", headers=auth_headers)
+            assert response.status_code == 200
+            assert data[section] == response.json(), f"{section} differs from /{path}"
+        print("✓ Snapshot sections match their own endpoints")
+    
+    def test_snapshot_requires_auth(self):
+        response = requests.get(f"{BASE_URL}/api/fitness/snapshot")
+        assert response.status_code in [401, 403]
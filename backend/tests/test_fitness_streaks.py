@@ -0,0 +1,40 @@
+"""
+Incremental fitness streak tests (in-process, no server needed)
+- A newly qualifying day after the last one extends or restarts the run
+- Days that keep their qualification leave the state untouched
+- Anything that is not an append asks for a rescan
+"""
+from routers.fitness import advance_streak, summarize_streak
+
+STATE = summarize_streak(["2025-10-14", "2025-10-15", "2025-10-16"])
+
+
+class TestAdvanceStreak:
+    """advance_streak against summarize_streak"""
+
+    def test_next_day_extends_run(self):
+        advanced = advance_streak(STATE, "2025-10-17", False, True)
+        assert advanced == summarize_streak(["2025-10-14", "2025-10-15", "2025-10-16", "2025-10-17"])
+        print("✓ Consecutive day extends the run")
+
+    def test_gap_restarts_run(self):
+        advanced = advance_streak(STATE, "2025-10-19", False, True)
+        assert advanced == {"current": 1, "longest": 3, "last_date": "2025-10-19", "total_days": 4}
+        print("✓ A gap restarts the current run and keeps the longest")
+
+    def test_unchanged_qualification_is_a_no_op(self):
+        assert advance_streak(STATE, "2025-10-15", True, True) is STATE
+        assert advance_streak(STATE, "2025-10-18", False, False) is STATE
+        print("✓ Same-day updates don't touch the state")
+
+    def test_non_appends_need_rescan(self):
+        assert advance_streak(STATE, "2025-10-16", True, False) is None
+        assert advance_streak(STATE, "2025-10-10", False, True) is None
+        assert advance_streak(STATE, "2025-10-17", None, True) is None
+        assert advance_streak(None, "2025-10-17", False, True) is None
+        print("✓ Lost days, backfilled days and unknown history rescan")
+
+    def test_first_day(self):
+        first = advance_streak(summarize_streak([]), "2025-10-17", False, True)
+        assert first == summarize_streak(["2025-10-17"])
+        print("✓ First qualifying day starts a run")
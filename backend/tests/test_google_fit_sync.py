@@ -0,0 +1,159 @@
+"""
+Google Fit incremental sync tests against a local fake Google Fit server
+- One aggregate request carries all four data types
+- Buckets are parsed into per-day fitness_data rows
+- A sync upserts every row in one bulk write and advances the watermark
+- One user's failure does not abort the all-users sync
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+from pymongo import UpdateOne
+
+from conftest import FakeCollection, FakeDb
+from routers import google_fit
+
+DAY_MS = 86400000
+START_MS = 1760745600000  # 2025-10-18T00:00:00Z
+
+
+class FakeGoogleFitHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeGoogleFitHandler.requests_seen.append({"path": self.path, "body": body})
+        buckets = []
+        for day in range(2):
+            start = body["startTimeMillis"] + day * DAY_MS
+            buckets.append({
+                "startTimeMillis": str(start),
+                "endTimeMillis": str(start + DAY_MS),
+                "dataset": [
+                    {"point": [{"value": [{"intVal": 4000 + day}]}, {"value": [{"intVal": 1000}]}]},
+                    {"point": [{"value": [{"fpVal": 1800.6}]}]},
+                    {"point": [{"value": [{"fpVal": 72.0}, {"fpVal": 130.0}, {"fpVal": 55.0}]}]},
+                    {"point": []}
+                ]
+            })
+        payload = json.dumps({"bucket": buckets}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fake_google_fit():
+    server = HTTPServer(("127.0.0.1", 0), FakeGoogleFitHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    original = google_fit.GOOGLE_FIT_API_URL
+    google_fit.GOOGLE_FIT_API_URL = f"http://127.0.0.1:{server.server_port}/fitness/v1/users/me"
+    yield FakeGoogleFitHandler
+    google_fit.GOOGLE_FIT_API_URL = original
+    server.shutdown()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(sync_state=(), tokens=()):
+        db = FakeDb(google_fit_sync_state=FakeCollection(sync_state), google_fit_tokens=FakeCollection(tokens))
+        monkeypatch.setattr(google_fit, "db", db)
+        return db
+
+    async def token(user_id):
+        return f"token-{user_id}"
+
+    monkeypatch.setattr(google_fit, "get_valid_token", token)
+    return install
+
+
+def sync_user(user_id):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await google_fit.sync_google_fit_user(client, user_id)
+    return asyncio.run(run())
+
+
+def fetch(start_ms, end_ms):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await google_fit.fetch_google_fit_buckets(client, "fake-token", start_ms, end_ms)
+    return asyncio.run(run())
+
+
+class TestGoogleFitSync:
+    """Incremental sync against the fake server"""
+
+    def test_single_request_for_all_data_types(self, fake_google_fit):
+        fake_google_fit.requests_seen.clear()
+        fetch(START_MS, START_MS + 2 * DAY_MS)
+        assert len(fake_google_fit.requests_seen) == 1
+        request = fake_google_fit.requests_seen[0]
+        assert request["path"].endswith("/dataset:aggregate")
+        assert [a["dataTypeName"] for a in request["body"]["aggregateBy"]] == [
+            name for name, _ in google_fit.SYNC_DATA_TYPES
+        ]
+
+    def test_buckets_parse_into_daily_rows(self, fake_google_fit):
+        rows = google_fit.parse_google_fit_buckets(fetch(START_MS, START_MS + 2 * DAY_MS))
+        by_key = {(r["date"], r["type"]): r for r in rows}
+        assert by_key[("2025-10-18", "steps")]["value"] == 5000
+        assert by_key[("2025-10-19", "steps")]["value"] == 5001
+        assert by_key[("2025-10-18", "calories")]["value"] == 1800
+        assert by_key[("2025-10-18", "heart_rate")] == {
+            "date": "2025-10-18", "type": "heart_rate", "value": 72, "max": 130, "min": 55
+        }
+        # Empty datasets produce no row
+        assert ("2025-10-18", "distance") not in by_key
+
+    def test_sync_bulk_upserts_rows_and_advances_watermark(self, fake_google_fit, fake_db):
+        db = fake_db()
+        fake_google_fit.requests_seen.clear()
+        result = sync_user("u1")
+
+        assert result == {"user_id": "u1", "status": "success", "rows": 6}
+        [ops] = db.fitness_data.calls("bulk_write")
+        assert len(ops) == 6 and all(isinstance(op, UpdateOne) for op in ops)
+        assert {op._filter["type"] for op in ops} == {"steps", "calories", "heart_rate"}
+        assert all(op._upsert and op._filter["user_id"] == "u1" and op._doc["$set"]["source"] == "google_fit" for op in ops)
+
+        [(query, update)] = db.google_fit_sync_state.calls("update_one")
+        watermark = update["$set"]["watermark_ms"]
+        assert query == {"user_id": "u1"} and watermark % DAY_MS == 0
+        # The watermark is the start of today, which is still filling up
+        assert 0 <= fake_google_fit.requests_seen[0]["body"]["endTimeMillis"] - watermark < DAY_MS
+        print("✓ One bulk upsert per sync; watermark moves to today")
+
+    def test_sync_starts_from_stored_watermark(self, fake_google_fit, fake_db):
+        fake_google_fit.requests_seen.clear()
+        now_ms = int(time.time() * 1000)
+        watermark = now_ms - now_ms % DAY_MS - 2 * DAY_MS
+        fake_db(sync_state=[{"user_id": "u1", "watermark_ms": watermark + 3600000}])
+        sync_user("u1")
+        assert fake_google_fit.requests_seen[0]["body"]["startTimeMillis"] == watermark
+        print("✓ Sync resumes from the day of the watermark")
+
+    def test_one_failing_user_does_not_abort_the_rest(self, fake_google_fit, fake_db, monkeypatch):
+        fake_db(tokens=[{"user_id": "bad"}, {"user_id": "good"}])
+        original = google_fit.sync_google_fit_user
+
+        async def flaky(client, user_id):
+            if user_id == "bad":
+                raise RuntimeError("unexpected payload")
+            return await original(client, user_id)
+
+        monkeypatch.setattr(google_fit, "sync_google_fit_user", flaky)
+        result = asyncio.run(google_fit.sync_all_google_fit_users())
+        assert result == {"users": 2, "synced": 1, "rows": 6}
+        print("✓ Unexpected errors are contained per user")
@@ -0,0 +1,59 @@
+"""
+Bulk news push - idempotent delivery from the standalone news service
+- Each article is created once per idempotency key
+- Replaying a batch reports duplicates with the original ids
+- Invalid items fail individually without failing the batch
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Admin test credentials (MOCKED - static OTP)
+ADMIN_PHONE = "+919999999999"
+TEST_OTP = "123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Admin authorization headers"""
+    resp = requests.post(f"{BASE_URL}/api/auth/send-otp", json={"phone": ADMIN_PHONE})
+    assert resp.status_code == 200
+    resp = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={"phone": ADMIN_PHONE, "otp": TEST_OTP})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json().get('token')}", "Content-Type": "application/json"}
+
+
+class TestBulkNewsPush:
+    """POST /api/news/admin/push/bulk"""
+
+    def test_replayed_batch_is_deduplicated(self, auth_headers):
+        run = uuid.uuid4().hex[:8]
+        batch = {"articles": [
+            {"idempotency_key": f"TEST_bulk_{run}_1", "title": f"TEST bulk {run} one", "summary": "One", "category": "local", "is_pinned": False, "priority": 5},
+            {"idempotency_key": f"TEST_bulk_{run}_2", "title": f"TEST bulk {run} two", "summary": "Two", "category": "city", "is_pinned": False, "priority": 5},
+            {"idempotency_key": f"TEST_bulk_{run}_3", "title": f"TEST bulk {run} bad", "summary": "Bad", "category": "no-such-category"}
+        ]}
+
+        first = requests.post(f"{BASE_URL}/api/news/admin/push/bulk", json=batch, headers=auth_headers)
+        assert first.status_code == 200
+        first_results = first.json()["results"]
+        assert [r["status"] for r in first_results] == ["created", "created", "error"]
+
+        second = requests.post(f"{BASE_URL}/api/news/admin/push/bulk", json=batch, headers=auth_headers)
+        assert second.status_code == 200
+        data = second.json()
+        assert data["created"] == 0
+        assert [r["status"] for r in data["results"]] == ["duplicate", "duplicate", "error"]
+        assert [r.get("id") for r in data["results"][:2]] == [r["id"] for r in first_results[:2]]
+
+        for result in first_results[:2]:
+            requests.delete(f"{BASE_URL}/api/news/admin/news/{result['id']}", headers=auth_headers)
+        print("✓ Bulk push is idempotent per key")
+
+    def test_bulk_push_requires_admin(self):
+        resp = requests.post(f"{BASE_URL}/api/news/admin/push/bulk", json={"articles": []})
+        assert resp.status_code in [401, 403]
+        print("✓ Bulk push requires auth")
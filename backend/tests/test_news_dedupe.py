@@ -0,0 +1,87 @@
+"""
+Near-duplicate clustering of ingested news
+- Rewordings of one story from different sources share LSH bands and a cluster
+- Distinct stories stay apart
+- The earliest report is the representative and collects the others' categories
+"""
+from routers.news_dedupe import (
+    assign_clusters, lsh_bands, minhash_signature, representative_updates, sign_articles, similarity, text_shingles
+)
+
+
+RAIN_SIASAT = (
+    "Heavy rains lash Hyderabad, IMD issues orange alert",
+    "Several parts of Hyderabad received heavy rainfall on Monday, causing waterlogging; "
+    "IMD issued an orange alert for the next two days."
+)
+RAIN_HANS = (
+    "IMD issues orange alert as heavy rain lashes Hyderabad",
+    "Heavy rainfall in several parts of the city on Monday led to waterlogging. "
+    "The IMD has sounded an orange alert for two days."
+)
+METRO = (
+    "Hyderabad Metro Rail phase 2 gets cabinet nod",
+    "The Telangana cabinet on Friday approved phase 2 of Hyderabad Metro Rail covering 76 km."
+)
+
+
+def article(url_hash, text, source, categories, published_at):
+    return {
+        "url_hash": url_hash, "title": text[0], "summary": text[1], "source": source,
+        "categories": list(categories), "published_at": published_at
+    }
+
+
+class TestNewsDedupe:
+    """MinHash signatures and banded LSH clustering"""
+
+    def test_signatures_estimate_similarity(self):
+        rain_a = minhash_signature(text_shingles(*RAIN_SIASAT))
+        rain_b = minhash_signature(text_shingles(*RAIN_HANS))
+        metro = minhash_signature(text_shingles(*METRO))
+        assert rain_a == minhash_signature(text_shingles(*RAIN_SIASAT))
+        assert similarity(rain_a, rain_b) > 0.5
+        assert similarity(rain_a, metro) < 0.2
+        assert set(lsh_bands(rain_a)) & set(lsh_bands(rain_b))
+        assert minhash_signature(text_shingles("", "")) is None
+        print("✓ Signatures are stable and track text overlap")
+
+    def test_telugu_text_shingles(self):
+        shingles = text_shingles("దమ్మాయిగూడలో కొత్త ఆరోగ్య కేంద్రం", "")
+        # కొత్త would split at its vowel sign with a plain \w tokenizer
+        assert "కొత్" in shingles
+        assert all(len(s) <= 4 for s in shingles)
+        print("✓ Telugu words keep their vowel signs")
+
+    def test_clusters_within_a_cycle(self):
+        new = [
+            article("hans", RAIN_HANS, "Hans India", ["city"], "2025-10-18T06:00:00+00:00"),
+            article("siasat", RAIN_SIASAT, "Siasat", ["local"], "2025-10-18T05:00:00+00:00"),
+            article("metro", METRO, "Telangana Today", ["state"], "2025-10-18T05:30:00+00:00")
+        ]
+        sign_articles(new)
+        assert assign_clusters(new, []) == {}
+
+        hans, siasat, metro = new
+        assert siasat["is_duplicate"] is False and siasat["cluster_id"] == "siasat"
+        assert hans["is_duplicate"] is True and hans["cluster_id"] == "siasat"
+        assert metro["is_duplicate"] is False and metro["cluster_id"] == "metro"
+        assert siasat["cluster_size"] == 2
+        assert siasat["cluster_sources"] == ["Siasat", "Hans India"]
+        assert siasat["categories"] == ["local", "city"]
+        print("✓ Earliest report represents the story and collects its categories")
+
+    def test_joins_stored_cluster(self):
+        stored = [article("siasat", RAIN_SIASAT, "Siasat", ["local"], "2025-10-18T05:00:00+00:00")]
+        sign_articles(stored)
+        stored[0]["cluster_id"] = "siasat"
+        new = [article("hans", RAIN_HANS, "Hans India", ["city"], "2025-10-18T06:00:00+00:00")]
+        sign_articles(new)
+
+        reps = assign_clusters(new, stored)
+        assert new[0]["cluster_id"] == "siasat" and new[0]["is_duplicate"] is True
+        assert reps == {"siasat": {"count": 1, "categories": ["city"], "sources": ["Hans India"]}}
+        op = representative_updates(reps)[0]
+        assert op._filter == {"url_hash": "siasat"}
+        assert op._doc["$inc"] == {"cluster_size": 1}
+        print("✓ A later report joins the stored cluster")
@@ -0,0 +1,101 @@
+"""
+News feed cache tests (in-process, no server needed)
+- Category normalization for the indexed `categories` field
+- Python feed ordering matches the Mongo sort
+- Admin writes patch cached top-N lists, or drop them when Mongo is needed
+- Rendered feed responses are reused until the feed version or TTL changes
+"""
+import asyncio
+import json
+import time
+
+from routers import news_feed
+from routers.news_feed import ALL_FEED, PINNED_FEED, normalize_categories, patch_feed, sort_feed
+
+
+def article(article_id, created_at, priority=1, pinned=False, categories=("local",), active=True):
+    return {
+        "id": article_id, "created_at": created_at, "priority": priority,
+        "is_pinned": pinned, "categories": list(categories), "is_active": active
+    }
+
+
+class TestNewsFeed:
+    """Feed ordering and cache patching"""
+
+    def test_normalize_categories(self):
+        assert normalize_categories(" Local ") == ["local"]
+        assert normalize_categories(["City", "city", "", None]) == ["city"]
+        print("✓ Categories are trimmed, lower-cased and unique")
+
+    def test_sort_matches_feed_order(self):
+        docs = [
+            article("old", "2025-10-01"),
+            article("pinned", "2025-09-01", pinned=True, priority=3),
+            article("urgent", "2025-09-15", priority=0),
+            article("new", "2025-10-02")
+        ]
+        assert [d["id"] for d in sort_feed(docs)] == ["pinned", "urgent", "new", "old"]
+        print("✓ Pinned, then priority, then newest")
+
+    def test_patch_insert_update_and_remove(self):
+        docs = sort_feed([article("a", "2025-10-01"), article("b", "2025-10-02")])
+        added = patch_feed(docs, "local", "c", article("c", "2025-10-03"))
+        assert [d["id"] for d in added] == ["c", "b", "a"]
+
+        # Deactivating removes it; another category's article is ignored
+        assert [d["id"] for d in patch_feed(added, "local", "b", article("b", "2025-10-02", active=False))] == ["c", "a"]
+        assert patch_feed(docs, "local", "z", article("z", "2025-10-05", categories=["city"])) == docs
+
+        # Unpinning drops it from the pinned feed but keeps it in its category
+        pinned = article("p", "2025-10-01", pinned=True)
+        assert patch_feed([pinned], PINNED_FEED, "p", {**pinned, "is_pinned": False}) == []
+        assert patch_feed([pinned], ALL_FEED, "p", {**pinned, "is_pinned": False})[0]["is_pinned"] is False
+        print("✓ Writes patch cached feeds in place")
+
+    def test_full_feed_needs_reload_when_tail_is_unknown(self, monkeypatch):
+        monkeypatch.setattr(news_feed, "NEWS_FEED_CACHE_SIZE", 2)
+        docs = sort_feed([article("a", "2025-10-01"), article("b", "2025-10-02")])
+        # Removing from a full list: the next article is only in Mongo
+        assert patch_feed(docs, "local", "b", None) is None
+        # Moving a cached article to the end of a full list: same problem
+        assert patch_feed(docs, "local", "b", article("b", "2025-09-01")) is None
+        # A new article that ranks below a full list is simply not cached
+        assert [d["id"] for d in patch_feed(docs, "local", "c", article("c", "2025-09-01"))] == ["b", "a"]
+        print("✓ Full lists reload instead of guessing the tail")
+
+
+class TestRenderedFeed:
+    """Pre-serialized feed responses"""
+
+    def test_render_once_per_version_and_ttl(self, monkeypatch):
+        # Pretend the shared version was just checked so no Mongo read happens
+        monkeypatch.setattr(news_feed, "_feed_version", 7)
+        monkeypatch.setattr(news_feed, "_version_checked_at", time.monotonic())
+        monkeypatch.setattr(news_feed, "_rendered", {})
+        builds = []
+
+        async def build():
+            builds.append(1)
+            return {"news": [{"title": "దమ్మాయిగూడ"}], "build": len(builds)}
+
+        async def render(key):
+            return await news_feed.rendered_feed(key, build)
+
+        first = asyncio.run(render(("all", 30)))
+        assert asyncio.run(render(("all", 30))) is first
+        assert json.loads(first) == {"news": [{"title": "దమ్మాయిగూడ"}], "build": 1}
+        assert "దమ్మాయిగూడ".encode() in first
+
+        # Another variant renders separately
+        asyncio.run(render(("all", 10)))
+        assert len(builds) == 2
+
+        # An admin write elsewhere bumps the version
+        monkeypatch.setattr(news_feed, "_feed_version", 8)
+        assert json.loads(asyncio.run(render(("all", 30))))["build"] == 3
+
+        # The TTL refreshes time_ago even without writes
+        monkeypatch.setattr(news_feed, "FEED_RENDER_TTL_SECONDS", 0)
+        assert json.loads(asyncio.run(render(("all", 30))))["build"] == 4
+        print("✓ Rendered bytes reused until version bump or TTL")
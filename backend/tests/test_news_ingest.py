@@ -0,0 +1,195 @@
+"""
+News ingestion tests against a local fixture feed server
+- Each distinct feed URL is fetched once per cycle
+- ETag / If-Modified-Since and body hashes skip unchanged feeds
+- Articles are deduped by canonical URL and fanned out to every category
+- Only feed-supplied dates overwrite published_at
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from routers import news
+from routers.news_ingest import article_upserts, canonical_url, fetch_all_feeds, normalize_published
+
+
+def rss(*items):
+    body = "".join(
+        f"<item><title>{title}</title><link>{link}</link>"
+        f"<description><![CDATA[<p>{title} summary</p><img src=\"https://img.example/{n}.jpg\"/>]]></description>"
+        f"<pubDate>Sat, 18 Oct 2025 06:30:00 +0530</pubDate></item>"
+        for n, (title, link) in enumerate(items)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{body}</channel></rss>'.encode()
+
+
+FEEDS = {
+    "/telangana.xml": (rss(
+        ("Metro line extended", "https://www.example.com/metro-line/?utm_source=rss"),
+        ("Ward meeting today", "https://example.com/ward-meeting")
+    ), '"v1"'),
+    "/national.xml": (rss(
+        ("Metro line extended to airport", "http://example.com/metro-line#comments"),
+        ("Budget session", "https://example.com/budget")
+    ), '"v7"'),
+    # Serves the same body every time and ignores conditional headers
+    "/no-etag.xml": (rss(("Cricket final", "https://example.com/cricket")), None)
+}
+
+
+class FixtureFeedHandler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        FixtureFeedHandler.hits[self.path] = FixtureFeedHandler.hits.get(self.path, 0) + 1
+        body, etag = FEEDS[self.path]
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def feed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureFeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def fixture_sources(base):
+    return {
+        f"{base}/telangana.xml": {"kind": "rss", "categories": ["local", "city", "state"]},
+        f"{base}/national.xml": {"kind": "rss", "categories": ["national"]},
+        f"{base}/no-etag.xml": {"kind": "rss", "categories": ["sports"]}
+    }
+
+
+def run_cycle(sources, states):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            # A URL listed twice (as RSS_FEEDS does across categories) is still fetched once
+            return await fetch_all_feeds(list(sources) + list(sources), states, client=client)
+    results = asyncio.run(run())
+    return results, news.collect_ingested_articles(sources, results)
+
+
+class TestNewsIngestion:
+    """Fetch, conditional GET and dedupe against the fixture server"""
+
+    def test_canonical_url(self):
+        assert canonical_url("http://WWW.Example.com/a/?utm_medium=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+        assert canonical_url("https://example.com/a") == canonical_url("https://www.example.com/a/")
+        assert normalize_published("Sat, 18 Oct 2025 06:30:00 +0530") == "2025-10-18T01:00:00+00:00"
+        print("✓ Canonical URLs and pubDate normalization")
+
+    def test_undated_items_keep_first_seen_time(self):
+        now = "2025-10-19T00:00:00+00:00"
+        dated, undated = article_upserts({
+            "a": {"title": "A", "categories": ["local"], "published_at": "Sat, 18 Oct 2025 06:30:00 +0530"},
+            "b": {"title": "B", "categories": ["local"], "published_at": None}
+        }, now)
+        assert dated._doc["$set"]["published_at"] == "2025-10-18T01:00:00+00:00"
+        assert "published_at" not in dated._doc["$setOnInsert"]
+        # Siasat and website items have no date: stamped once on insert, never moved forward
+        assert "published_at" not in undated._doc["$set"]
+        assert undated._doc["$setOnInsert"]["published_at"] == now
+        print("✓ published_at falls back to first-seen time only on insert")
+
+    def test_cycle_dedupes_and_skips_unchanged(self, feed_server):
+        FixtureFeedHandler.hits.clear()
+        sources = fixture_sources(feed_server)
+
+        results, articles = run_cycle(sources, {})
+        assert FixtureFeedHandler.hits == {"/telangana.xml": 1, "/national.xml": 1, "/no-etag.xml": 1}
+        assert [r["status"] for r in results] == ["ok", "ok", "ok"]
+
+        # The metro story appears in two feeds under different URLs
+        assert len(articles) == 4
+        metro = next(a for a in articles.values() if a["canonical_url"] == "https://example.com/metro-line")
+        assert metro["categories"] == ["local", "city", "state", "national"]
+        assert metro["title"] == "Metro line extended"
+        assert metro["summary"] == "Metro line extended summary"
+        assert metro["image"] == "https://img.example/0.jpg"
+
+        # Second cycle with the stored validators: nothing to parse
+        states = {r["url"]: r for r in results}
+        results, articles = run_cycle(sources, states)
+        assert [r["status"] for r in results] == ["not_modified", "not_modified", "unchanged"]
+        assert articles == {}
+        print("✓ One fetch per feed, cross-feed dedupe, conditional GET")
+
+    def test_feed_errors_are_isolated(self, feed_server):
+        sources = fixture_sources(feed_server)
+        sources["http://127.0.0.1:9/down.xml"] = {"kind": "rss", "categories": ["tech"]}
+        results, articles = run_cycle(sources, {})
+        assert results[-1]["status"] == "error"
+        assert len(articles) == 4
+        print("✓ A failing feed does not block the others")
+
+    def test_distinct_sources_from_config(self):
+        sources = news.news_feed_sources()
+        assert sources["https://telanganatoday.com/feed"]["categories"] == ["local", "city", "state"]
+        assert sources["https://www.siasat.com/hyderabad/"]["kind"] == "siasat"
+        assert len(sources) == len({url for urls in news.RSS_FEEDS.values() for url in urls}) + len(news.TELUGU_SOURCES)
+        print("✓ Feed config collapses to distinct URLs")
+
+
+class TestFeedParser:
+    """Streaming RSS/Atom item parser"""
+
+    def test_rss_fields_and_media(self):
+        body = (
+            '<?xml version="1.0" encoding="ISO-8859-1"?>'
+            '<rss xmlns:media="http://search.yahoo.com/mrss/"><channel>'
+            '<item><title>Caf\xe9 opens</title><link> https://example.com/cafe </link>'
+            '<description>&lt;p&gt;New   caf&amp;eacute; &lt;b&gt;near&lt;/b&gt; lake&lt;/p&gt;</description>'
+            '<media:group><media:content url="https://img.example/cafe.jpg"/></media:group></item>'
+            '<item><title>Second</title><link>https://example.com/2</link></item>'
+            '<item><title>Third</title><link>https://example.com/3</link></item>'
+            '</channel></rss>'
+        ).encode("iso-8859-1")
+        items = news.parse_rss_items(body, "https://www.thehindu.com/feeder/default.rss", limit=2)
+        assert len(items) == 2
+        assert items[0] == {
+            "title": "Caf\xe9 opens",
+            "summary": "New caf\xe9 near lake",
+            "link": "https://example.com/cafe",
+            "image": "https://img.example/cafe.jpg",
+            "published_at": None,
+            "source": "The Hindu"
+        }
+        assert items[1]["summary"] == "Read more..."
+        print("✓ RSS items: declared encoding, HTML summary, media:group, limit")
+
+    def test_atom_entries(self):
+        body = (
+            b'<feed xmlns="http://www.w3.org/2005/Atom"><entry><title>Atom story</title>'
+            b'<link rel="self" href="https://example.com/self"/><link rel="alternate" href="https://example.com/story"/>'
+            b'<updated>2025-10-18T04:00:00Z</updated><summary>Short summary</summary></entry></feed>'
+        )
+        item = news.parse_rss_items(body, "https://example.com/atom")[0]
+        assert item["link"] == "https://example.com/story"
+        assert item["published_at"] == "2025-10-18T04:00:00Z"
+        assert item["summary"] == "Short summary"
+        print("✓ Atom entries parse")
+
+    def test_truncated_feed_keeps_complete_items(self):
+        body = rss(("One", "https://example.com/1"), ("Two", "https://example.com/2"))
+        items = news.parse_rss_items(body[:body.index(b"<item>", 10) + 30], "https://example.com/feed")
+        assert items[0]["title"] == "One"
+        print("✓ Truncated feed does not raise")
@@ -0,0 +1,125 @@
+"""
+News AI rephrasing tests against a local fake chat-completions server
+- Articles are sent in batches and the JSON reply is split back per article
+- The concurrency limiter caps in-flight model calls
+- Malformed or partial replies leave the affected articles out
+- The stub backend runs with no server or API key
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from routers import news_rephrase
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = FakeChatHandler
+        with cls.lock:
+            cls.requests_seen.append(body)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.05)
+
+        articles = json.loads(body["messages"][1]["content"])["articles"]
+        reply = {"articles": [
+            {"i": a["i"], "title": a["title"].upper(), "summary": f"Rephrased: {a['summary']}"}
+            for a in articles if "skip me" not in a["title"]
+        ]}
+        payload = json.dumps({"choices": [{"message": {"content": json.dumps(reply)}}]}).encode()
+        with cls.lock:
+            cls.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    original = news_rephrase.OPENAI_CHAT_URL
+    news_rephrase.OPENAI_CHAT_URL = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    yield FakeChatHandler
+    news_rephrase.OPENAI_CHAT_URL = original
+    server.shutdown()
+
+
+def rephrase(articles):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await news_rephrase.rephrase_uncached(articles, client=client)
+    return asyncio.run(run())
+
+
+class TestNewsRephrase:
+    """Batching, limiting and output splitting"""
+
+    def test_batches_and_concurrency_limit(self, fake_openai, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.delenv("NEWS_AI_BACKEND", raising=False)
+        monkeypatch.setattr(news_rephrase, "REPHRASE_BATCH_SIZE", 4)
+        monkeypatch.setattr(news_rephrase, "REPHRASE_CONCURRENCY", 2)
+        fake_openai.requests_seen.clear()
+        fake_openai.max_in_flight = 0
+
+        articles = {f"k{n}": {"title": f"story {n}", "summary": f"summary {n}"} for n in range(18)}
+        results = rephrase(articles)
+
+        assert len(fake_openai.requests_seen) == 5
+        assert fake_openai.max_in_flight <= 2
+        assert fake_openai.requests_seen[0]["response_format"] == {"type": "json_object"}
+        assert results["k17"] == {"title": "STORY 17", "summary": "Rephrased: summary 17"}
+        assert len(results) == 18
+        print("✓ 18 articles -> 5 batched calls, at most 2 in flight")
+
+    def test_partial_reply_drops_missing_articles(self, fake_openai, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.delenv("NEWS_AI_BACKEND", raising=False)
+        results = rephrase({
+            "a": {"title": "kept", "summary": "s"},
+            "b": {"title": "skip me", "summary": "s"}
+        })
+        assert list(results) == ["a"]
+        print("✓ Articles missing from the reply are not rephrased")
+
+    def test_parse_batch_output(self):
+        batch = [{"i": 0}, {"i": 1}]
+        fenced = '```json\n{"articles": [{"i": 1, "title": " T ", "summary": "S"}, {"i": 5, "title": "x", "summary": "y"}]}\n```'
+        assert news_rephrase.parse_batch_output(fenced, batch) == {1: {"title": "T", "summary": "S"}}
+        assert news_rephrase.parse_batch_output("TITLE: nope", batch) == {}
+        assert news_rephrase.parse_batch_output('{"articles": [{"i": 0, "title": "", "summary": "S"}]}', batch) == {}
+        print("✓ Reply parsing tolerates fences and rejects bad rows")
+
+    def test_cache_key(self):
+        key = news_rephrase.rephrase_key("Title", "Summary")
+        assert key == news_rephrase.rephrase_key("Title", "Summary")
+        assert key != news_rephrase.rephrase_key("Title", "Summary!")
+        assert key != news_rephrase.rephrase_key("Title", "Summary", backend="stub")
+        print("✓ Cache key covers text, prompt version and backend")
+
+    def test_stub_backend_offline(self, monkeypatch):
+        monkeypatch.setenv("NEWS_AI_BACKEND", "stub")
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setattr(news_rephrase, "OPENAI_CHAT_URL", "http://127.0.0.1:9/unreachable")
+        assert news_rephrase.rephrase_backend() == "stub"
+        results = rephrase({"a": {"title": "Metro   line", "summary": "Opens\ntoday"}})
+        assert results == {"a": {"title": "Metro line", "summary": "Opens today"}}
+        print("✓ Stub backend needs no server or key")
@@ -0,0 +1,58 @@
+"""
+Compiled quiz grading tests (in-process, no server needed)
+- Answer keys compile once and grade by question id
+- Questions without ids fall back to their position
+- Batches aggregate into quiz-level and per-question stat deltas
+"""
+from routers.education import compile_quiz, grade_answers, aggregate_quiz_stats, unflatten_options
+
+QUIZ = {
+    "id": "quiz-1",
+    "version": 3,
+    "passing_score": 50,
+    "questions": [
+        {"id": "q1", "question": "2 + 2?", "options": ["3", "4", "5"], "correct_answer": "4", "explanation": "Basic addition"},
+        {"question": "Capital of Telangana?", "options": ["Hyderabad", "Chennai"], "correct_answer": "Hyderabad"}
+    ]
+}
+
+
+class TestQuizGrading:
+    """Grading against a compiled answer key"""
+
+    def test_compile_uses_ids_and_positions(self):
+        compiled = compile_quiz(QUIZ)
+        assert compiled["version"] == 3
+        assert compiled["question_ids"] == ["q1", "1"]
+        assert compiled["options"]["1"] == {"Hyderabad": 0, "Chennai": 1}
+        print("✓ Compiled key falls back to position ids")
+
+    def test_grade_answers(self):
+        compiled = compile_quiz(QUIZ)
+        grade = grade_answers(compiled, [
+            {"question_id": "q1", "selected_option": "4"},
+            {"question_id": "1", "selected_option": "Chennai"}
+        ])
+        assert grade["correct"] == 1 and grade["total"] == 2
+        assert grade["score"] == 50 and grade["passed"] is True
+        assert grade["results"][0]["explanation"] == "Basic addition"
+        print("✓ 1/2 correct scores 50 and passes at 50")
+
+    def test_unanswered_questions_are_wrong(self):
+        grade = grade_answers(compile_quiz(QUIZ), [])
+        assert grade["score"] == 0 and grade["passed"] is False
+        print("✓ Empty submission scores 0")
+
+    def test_batch_stats(self):
+        compiled = compile_quiz(QUIZ)
+        graded = [
+            grade_answers(compiled, [{"question_id": "q1", "selected_option": "4"}, {"question_id": "1", "selected_option": "Hyderabad"}]),
+            grade_answers(compiled, [{"question_id": "q1", "selected_option": "3"}]),
+            grade_answers(compiled, [{"question_id": "q1", "selected_option": "7"}])
+        ]
+        quiz_delta, items = aggregate_quiz_stats(compiled, graded)
+        assert quiz_delta == {"attempts": 3, "passed": 1, "score_sum": 100}
+        assert items["q1"] == {"attempts": 3, "correct": 1, "options.1": 1, "options.0": 1, "options.other": 1}
+        assert items["1"] == {"attempts": 3, "correct": 1, "options.0": 1, "options.skipped": 2}
+        assert unflatten_options(items["1"]) == {"attempts": 3, "correct": 1, "options": {"0": 1, "skipped": 2}}
+        print("✓ Option distribution keyed by option index")
@@ -0,0 +1,86 @@
+"""
+Vital series tests (in-process, no server needed)
+- Legacy *_logs documents map onto every vital metric they hold
+- Explicit resolutions are coarsened to stay within MAX_SERIES_POINTS
+- Legacy log migration skips bad values and never folds a document twice
+"""
+import asyncio
+
+from conftest import FakeCollection, FakeDb
+from routers import vitals
+
+
+class TestLogVitalSamples:
+    """log_vital_samples against LOG_VITAL_FIELDS"""
+
+    def test_heart_rate_log_yields_all_fields(self):
+        doc = {"current": 72, "resting": 58, "min": 55, "max": 140, "recorded_at": "2025-10-17T08:00:00+00:00"}
+        samples = vitals.log_vital_samples(doc, vitals.LOG_VITAL_FIELDS["heart_rate_logs"])
+        assert {s["metric"]: s["value"] for s in samples} == {
+            "heart_rate": 72, "heart_rate_resting": 58, "heart_rate_min": 55, "heart_rate_max": 140
+        }
+        assert all(s["metric"] in vitals.VITAL_METRICS for s in samples)
+        assert len({s["ts"] for s in samples}) == 1
+        print("✓ Resting, min and max heart rate are kept")
+
+    def test_created_at_is_the_fallback_time(self):
+        doc = {"spo2": 97, "created_at": "2025-10-17T08:00:00+00:00"}
+        [sample] = vitals.log_vital_samples(doc, vitals.LOG_VITAL_FIELDS["spo2_logs"])
+        assert sample["ts"].isoformat().startswith("2025-10-17T08:00:00")
+        print("✓ Logs without recorded_at use created_at")
+
+
+class TestSeriesResolution:
+    """get_vital_series resolution selection"""
+
+    def run_series(self, monkeypatch, days, resolution):
+        fake = FakeDb()
+        monkeypatch.setattr(vitals, "db", fake)
+        series = asyncio.run(vitals.get_vital_series("u1", "heart_rate", days, resolution))
+        assert fake.vital_rollups.queries[0]["resolution"] == series["resolution"]
+        return series["resolution"]
+
+    def test_explicit_fine_resolution_is_capped(self, monkeypatch):
+        assert self.run_series(monkeypatch, 7, "5m") == "1h"
+        print("✓ 5m over a week is coarsened")
+
+    def test_explicit_resolution_kept_when_within_cap(self, monkeypatch):
+        assert self.run_series(monkeypatch, 1, "5m") == "5m"
+        assert self.run_series(monkeypatch, 1, "1d") == "1d"
+        print("✓ Explicit resolutions within the cap are honoured")
+
+
+class TestMigrateVitalLogs:
+    """migrate_vital_logs over legacy *_logs documents"""
+
+    def setup_fake(self, monkeypatch, docs):
+        fake = FakeDb(spo2_logs=FakeCollection(docs))
+        recorded = []
+
+        async def fake_record(user_id, samples, source=None):
+            recorded.extend(s["value"] for s in samples)
+
+        monkeypatch.setattr(vitals, "db", fake)
+        monkeypatch.setattr(vitals, "record_vital_samples", fake_record)
+        return fake.spo2_logs.docs, recorded
+
+    def test_non_numeric_values_are_skipped(self, monkeypatch):
+        docs, recorded = self.setup_fake(monkeypatch, [
+            {"_id": 1, "user_id": "u1", "spo2": 97, "recorded_at": "2025-10-17T08:00:00+00:00"},
+            {"_id": 2, "user_id": "u1", "spo2": "n/a", "recorded_at": "not a time"},
+        ])
+        assert asyncio.run(vitals.migrate_vital_logs()) == 1
+        assert recorded == [97]
+        assert [d["in_vitals"] for d in docs] == [True, "skipped"]
+        print("✓ A bad legacy value is marked skipped instead of stopping the run")
+
+    def test_rerun_leaves_claimed_documents_alone(self, monkeypatch):
+        docs, recorded = self.setup_fake(monkeypatch, [
+            {"_id": 1, "user_id": "u1", "spo2": 97, "in_vitals": "migrating", "vitals_claim": "old"},
+            {"_id": 2, "user_id": "u1", "spo2": 95},
+        ])
+        asyncio.run(vitals.migrate_vital_logs())
+        asyncio.run(vitals.migrate_vital_logs())
+        assert recorded == [95]
+        assert [d["in_vitals"] for d in docs] == ["migrating", True]
+        print("✓ Interrupted and finished batches are not folded in again")
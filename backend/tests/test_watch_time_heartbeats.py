@@ -0,0 +1,92 @@
+"""
+Watch-time heartbeat coalescing tests (in-process, no server needed)
+- Beats for the same (user, lesson) collapse into one buffered delta
+- A flush issues one $inc upsert per key
+- Failed flushes keep their deltas for the next attempt, and only the failed ones
+- Shutdown stops the flush loop without cutting off a write in flight
+"""
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from conftest import FakeCollection, FakeDb
+from routers import education
+from routers.education import WatchTimeBeat
+
+
+def fake_db(**kwargs):
+    return FakeDb(lesson_progress=FakeCollection(**kwargs))
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    monkeypatch.setattr(education, "_watch_time_buffer", {})
+
+
+class TestWatchTimeHeartbeats:
+    """In-memory coalescing of video watch-time pings"""
+
+    def test_beats_coalesce_per_user_and_lesson(self, monkeypatch):
+        fake = fake_db()
+        monkeypatch.setattr(education, "db", fake)
+
+        # Two minutes of 5-second pings on two lessons
+        for i in range(24):
+            education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=5, position_seconds=i * 5))
+            education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l2", watch_time_seconds=5))
+
+        written = asyncio.run(education.flush_watch_time())
+        assert written == 2
+        ops = {op._filter["lesson_id"]: op._doc for op in fake.lesson_progress.calls("bulk_write")[0]}
+        assert ops["l1"]["$inc"]["watch_time_seconds"] == 120
+        assert ops["l1"]["$set"]["position_seconds"] == 115
+        assert ops["l2"]["$inc"]["watch_time_seconds"] == 120
+        assert education._watch_time_buffer == {}
+        print("✓ 48 pings became 2 upserts")
+
+    def test_oversized_and_negative_beats_are_clamped(self):
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=100000))
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=-50))
+        assert education._watch_time_buffer[("u1", "l1")]["seconds"] == education.MAX_BEAT_SECONDS
+        print("✓ Beat deltas clamped to [0, MAX_BEAT_SECONDS]")
+
+    def test_failed_flush_keeps_deltas(self, monkeypatch):
+        monkeypatch.setattr(education, "db", fake_db(fail=True))
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=30))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(education.flush_watch_time())
+
+        assert education._watch_time_buffer[("u1", "l1")]["seconds"] == 30
+        print("✓ Deltas survive a failed flush")
+
+    def test_partial_failure_retries_only_failed_ops(self, monkeypatch):
+        monkeypatch.setattr(education, "db", fake_db(failed_indexes=[1]))
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=30))
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l2", watch_time_seconds=40))
+
+        with pytest.raises(BulkWriteError):
+            asyncio.run(education.flush_watch_time())
+
+        # l1 was written; re-buffering it would count its 30 seconds twice
+        assert education._watch_time_buffer == {("u1", "l2"): {"course_id": "c1", "seconds": 40}}
+        print("✓ Only the failed op is retried")
+
+    def test_shutdown_waits_for_flush_in_flight(self, monkeypatch):
+        fake = fake_db(delay=0.05)
+        monkeypatch.setattr(education, "db", fake)
+        monkeypatch.setattr(education, "WATCH_TIME_FLUSH_SECONDS", 0)
+        education.buffer_watch_time("u1", WatchTimeBeat(course_id="c1", lesson_id="l1", watch_time_seconds=30))
+
+        async def run():
+            monkeypatch.setattr(education, "_watch_time_flush_task", asyncio.create_task(education.watch_time_flush_loop()))
+            await asyncio.sleep(0.01)  # the loop is now inside bulk_write
+            await education.flush_watch_time_on_shutdown()
+            return education._watch_time_flush_task
+
+        task = asyncio.run(run())
+        assert task.cancelled()
+        assert len(fake.lesson_progress.calls("bulk_write")) == 1
+        assert education._watch_time_buffer == {}
+        print("✓ Shutdown cancels the loop after its write lands")
@@ -0,0 +1,85 @@
+"""
+Backend Tests for Batch Wearable Ingestion
+- POST /api/fitness/sync/batch creates samples once per device-scoped sample id
+- Retried batches report duplicates instead of inserting again
+"""
+import pytest
+import requests
+import os
+import uuid
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+TEST_PHONE = "+919999999999"
+TEST_OTP = "123456"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get authorization headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/send-otp", json={"phone": TEST_PHONE})
+    assert response.status_code == 200, f"Failed to send OTP: {response.text}"
+    
+    response = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={"phone": TEST_PHONE, "otp": TEST_OTP})
+    assert response.status_code == 200, f"Failed to verify OTP: {response.text}"
+    
+    return {"Authorization": f"Bearer {response.json()['token']}", "Content-Type": "application/json"}
+
+
+def make_batch():
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "device_id": f"TEST-{uuid.uuid4()}",
+        "device_type": "fitbit",
+        "samples": [
+            {"kind": "activity", "sample_id": "a1", "recorded_at": now, "values": {"activity_type": "walking", "duration_minutes": 20, "steps": 2000}},
+            {"kind": "heart_rate", "sample_id": "h1", "recorded_at": now, "values": {"current": 72, "resting": 60}},
+            {"kind": "spo2", "sample_id": "o1", "recorded_at": now, "values": {"spo2": 98}},
+            {"kind": "unknown", "sample_id": "x1", "recorded_at": now, "values": {}}
+        ]
+    }
+
+
+class TestWearableBatchSync:
+    """Test /api/fitness/sync/batch"""
+    
+    def test_batch_reports_per_item_status(self, auth_headers):
+        response = requests.post(f"{BASE_URL}/api/fitness/sync/batch", json=make_batch(), headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["status"] for r in data["results"]] == ["created", "created", "created", "rejected"]
+        assert data["counts"]["created"] == 3
+        print(f"✓ Batch ingested: {data['counts']}")
+    
+    def test_retried_batch_is_deduplicated(self, auth_headers):
+        batch = make_batch()
+        requests.post(f"{BASE_URL}/api/fitness/sync/batch", json=batch, headers=auth_headers)
+        response = requests.post(f"{BASE_URL}/api/fitness/sync/batch", json=batch, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["counts"]["created"] == 0
+        assert data["counts"]["duplicate"] == 3
+        print("✓ Retried batch reported as duplicates")
+    
+    def test_non_numeric_values_and_bad_times_are_rejected(self, auth_headers):
+        now = datetime.now(timezone.utc).isoformat()
+        batch = {
+            "device_id": f"TEST-{uuid.uuid4()}",
+            "device_type": "fitbit",
+            "samples": [
+                {"kind": "heart_rate", "sample_id": "h1", "recorded_at": now, "values": {"current": "72"}},
+                {"kind": "activity", "sample_id": "a1", "recorded_at": now, "values": {"steps": "2000"}},
+                {"kind": "spo2", "sample_id": "o1", "recorded_at": "yesterday", "values": {"spo2": 98}},
+                {"kind": "spo2", "sample_id": "o2", "recorded_at": now, "values": {"spo2": 97}}
+            ]
+        }
+        response = requests.post(f"{BASE_URL}/api/fitness/sync/batch", json=batch, headers=auth_headers)
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()["results"]] == ["rejected", "rejected", "rejected", "created"]
+        print("✓ Unusable samples rejected without failing the batch")
+    
+    def test_batch_requires_auth(self):
+        response = requests.post(f"{BASE_URL}/api/fitness/sync/batch", json=make_batch())
+        assert response.status_code in [401, 403]
@@ -4,19 +4,26 @@ A complete, production-ready news aggregation API with admin dashboard support.
 Can be deployed separately and synced with My Dammaiguda or other apps.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import httpx
-from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
 import logging
+import io
+import hashlib
+import json
 import os
 import uuid
+import random
 import asyncio
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
@@ -53,9 +60,19 @@ async def lifespan(app: FastAPI):
     await db.news_articles.create_index("category")
     await db.news_articles.create_index([("created_at", -1)])
     await db.news_bookmarks.create_index([("user_id", 1), ("article_id", 1)], unique=True)
+    await db.ai_rephrase_cache.create_index("key", unique=True)
+    await db.news_articles.create_index(
+        "sync.idempotency_key", unique=True, partialFilterExpression={"sync.idempotency_key": {"$type": "string"}}
+    )
+    await db.news_articles.create_index([("sync.status", 1), ("sync.next_attempt_at", 1)], sparse=True)
+    await db.news_articles.create_index("sync.lease_owner", sparse=True)
+    
+    worker = asyncio.create_task(outbox_worker()) if sync_enabled() else None
     
     yield
     
+    if worker:
+        worker.cancel()
     client.close()
     logger.info("MongoDB connection closed")
 
@@ -243,51 +260,224 @@ async def require_admin(user: dict = Depends(get_current_user)):
 
 # ============== AI REPHRASING ==============
 
-async def rephrase_with_ai(title: str, summary: str) -> Dict[str, str]:
-    """Use OpenAI to rephrase news for originality"""
-    if not OPENAI_API_KEY:
-        return {"title": title, "summary": summary}
+# Bump whenever the prompt or model changes so old cache entries stop matching
+REPHRASE_PROMPT_VERSION = "2"
+REPHRASE_MODEL = "gpt-4o-mini"
+OPENAI_CHAT_URL = os.environ.get("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+AI_BACKEND = os.environ.get("NEWS_AI_BACKEND", "openai")  # "stub" echoes locally, for offline runs
+REPHRASE_BATCH_SIZE = int(os.environ.get("NEWS_AI_BATCH_SIZE", "8"))
+REPHRASE_CONCURRENCY = int(os.environ.get("NEWS_AI_CONCURRENCY", "3"))
+
+REPHRASE_SYSTEM_PROMPT = (
+    "You are a news editor. Rephrase each title and summary to be original while keeping facts accurate. "
+    "Keep it concise. The input is JSON {\"articles\": [{\"i\": number, \"title\": string, \"summary\": string}]}. "
+    "Reply with JSON {\"articles\": [{\"i\": number, \"title\": string, \"summary\": string}]} "
+    "containing every input i exactly once."
+)
+
+_rephrase_semaphore = None
+
+def rephrase_enabled() -> bool:
+    return AI_BACKEND == "stub" or bool(OPENAI_API_KEY)
+
+def rephrase_key(title: str, summary: str) -> str:
+    model = "stub" if AI_BACKEND == "stub" else REPHRASE_MODEL
+    payload = json.dumps([REPHRASE_PROMPT_VERSION, model, title or "", summary or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def parse_batch_output(content: str, batch: List[Dict]) -> Dict[int, Dict[str, str]]:
+    """Split the model's JSON reply into {i: {title, summary}}, dropping anything malformed"""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    try:
+        articles = json.loads(text).get("articles", [])
+    except (ValueError, AttributeError):
+        return {}
+    
+    expected = {item["i"] for item in batch}
+    results = {}
+    for article in articles if isinstance(articles, list) else []:
+        if not isinstance(article, dict):
+            continue
+        i, title, summary = article.get("i"), article.get("title"), article.get("summary")
+        if i in expected and isinstance(title, str) and isinstance(summary, str) and title.strip() and summary.strip():
+            results[i] = {"title": title.strip(), "summary": summary.strip()}
+    return results
+
+async def rephrase_batch(client: httpx.AsyncClient, batch: List[Dict]) -> Dict[int, Dict[str, str]]:
+    """One model call for a batch of {i, title, summary}"""
+    global _rephrase_semaphore
+    if AI_BACKEND == "stub":
+        return {item["i"]: {"title": " ".join(item["title"].split()), "summary": " ".join(item["summary"].split())} for item in batch}
     
+    if _rephrase_semaphore is None:
+        _rephrase_semaphore = asyncio.Semaphore(REPHRASE_CONCURRENCY)
     try:
-        async with httpx.AsyncClient() as client:
+        async with _rephrase_semaphore:
             resp = await client.post(
-                "https://api.openai.com/v1/chat/completions",
+                OPENAI_CHAT_URL,
                 headers={
                     "Authorization": f"Bearer {OPENAI_API_KEY}",
                     "Content-Type": "application/json"
                 },
                 json={
-                    "model": "gpt-4o-mini",
+                    "model": REPHRASE_MODEL,
                     "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a news editor. Rephrase the title and summary to be original while keeping facts accurate. Keep it concise. Format: TITLE: [title]\nSUMMARY: [summary]"
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Title: {title}\nSummary: {summary}"
-                        }
+                        {"role": "system", "content": REPHRASE_SYSTEM_PROMPT},
+                        {"role": "user", "content": json.dumps({"articles": batch}, ensure_ascii=False)}
                     ],
-                    "max_tokens": 300
+                    "response_format": {"type": "json_object"},
+                    "max_tokens": 250 * len(batch)
                 },
-                timeout=30.0
+                timeout=60.0
             )
-            resp.raise_for_status()
-            content = resp.json()["choices"][0]["message"]["content"]
-            
-            result = {"title": title, "summary": summary}
-            for line in content.strip().split('\n'):
-                if line.startswith("TITLE:"):
-                    result["title"] = line.replace("TITLE:", "").strip()
-                elif line.startswith("SUMMARY:"):
-                    result["summary"] = line.replace("SUMMARY:", "").strip()
-            return result
+        resp.raise_for_status()
+        return parse_batch_output(resp.json()["choices"][0]["message"]["content"], batch)
+    except Exception as e:
+        logger.error(f"AI rephrase batch error: {e}")
+        return {}
+
+async def rephrase_articles(articles: List[Dict]) -> List[Dict]:
+    """{title, summary, is_ai_rephrased} per article; cached in ai_rephrase_cache, misses batched"""
+    originals = [
+        {"title": a.get("title") or "", "summary": a.get("summary") or "", "is_ai_rephrased": False}
+        for a in articles
+    ]
+    if not articles or not rephrase_enabled():
+        return originals
+    
+    keys = [rephrase_key(o["title"], o["summary"]) for o in originals]
+    found = {}
+    async for doc in db.ai_rephrase_cache.find({"key": {"$in": list(set(keys))}}, {"_id": 0}):
+        found[doc["key"]] = {"title": doc["title"], "summary": doc["summary"]}
+    
+    todo = list({key: original for key, original in zip(keys, originals) if key not in found}.items())
+    if todo:
+        batches = [todo[start:start + REPHRASE_BATCH_SIZE] for start in range(0, len(todo), REPHRASE_BATCH_SIZE)]
+        async with httpx.AsyncClient() as client:
+            replies = await asyncio.gather(*(
+                rephrase_batch(client, [{"i": i, "title": o["title"], "summary": o["summary"]} for i, (_, o) in enumerate(batch)])
+                for batch in batches
+            ))
+        fresh = {batch[i][0]: result for batch, reply in zip(batches, replies) for i, result in reply.items()}
+        
+        if fresh:
+            created_at = now_iso()
+            await db.ai_rephrase_cache.bulk_write([
+                UpdateOne(
+                    {"key": key},
+                    {"$setOnInsert": {**result, "key": key, "prompt_version": REPHRASE_PROMPT_VERSION, "created_at": created_at}},
+                    upsert=True
+                )
+                for key, result in fresh.items()
+            ], ordered=False)
+            found.update(fresh)
+    
+    return [
+        {**found[key], "is_ai_rephrased": True} if key in found else original
+        for key, original in zip(keys, originals)
+    ]
+
+async def rephrase_with_ai(title: str, summary: str) -> Dict[str, str]:
+    """Use AI to rephrase news for originality (cached)"""
+    try:
+        result = (await rephrase_articles([{"title": title, "summary": summary}]))[0]
+        return {"title": result["title"], "summary": result["summary"]}
     except Exception as e:
         logger.error(f"AI rephrase error: {e}")
         return {"title": title, "summary": summary}
 
 # ============== RSS SCRAPING ==============
 
+# Plain-text summary length kept per item
+SUMMARY_MAX_CHARS = 400
+
+def feed_source_name(url: str) -> str:
+    if "thehindu" in url:
+        return "The Hindu"
+    elif "timesofindia" in url:
+        return "Times of India"
+    elif "telangana" in url.lower():
+        return "Telangana Today"
+    elif "siasat" in url:
+        return "Siasat"
+    elif "hansindia" in url:
+        return "The Hans India"
+    return "News"
+
+def _localname(tag) -> str:
+    # Comments and processing instructions have non-string tags
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def html_to_text(fragment: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Whitespace-collapsed text and first <img src> of an HTML description"""
+    if not fragment or not fragment.strip():
+        return "", None
+    if "<" not in fragment and "&" not in fragment:
+        return " ".join(fragment.split()), None
+    try:
+        root = lxml.html.fragment_fromstring(fragment, create_parent="div")
+    except (etree.ParserError, ValueError):
+        return " ".join(fragment.split()), None
+    img = root.find(".//img")
+    return " ".join(root.text_content().split()), img.get("src") if img is not None else None
+
+def parse_rss_items(content: bytes, url: str, limit: int = 10) -> List[Dict]:
+    """Stream title/link/summary/image/date out of a feed's <item>s (or Atom <entry>s)
+
+    Items are cleared as soon as they are read and parsing stops after `limit`,
+    so memory stays bounded. CPU-bound: run it with asyncio.to_thread.
+    """
+    items = []
+    events = etree.iterparse(
+        io.BytesIO(content), events=("end",), tag=("{*}item", "{*}entry"),
+        recover=True, resolve_entities=False, no_network=True, huge_tree=False
+    )
+    try:
+        for _, elem in events:
+            title = link = description = fallback_description = pub_date = image = None
+            for child in elem:
+                name = _localname(child.tag)
+                if name == "title":
+                    title = "".join(child.itertext()).strip()
+                elif name == "link":
+                    if child.get("href"):
+                        if link is None or child.get("rel", "alternate") == "alternate":
+                            link = child.get("href")
+                    elif child.text:
+                        link = child.text.strip()
+                elif name in ("description", "summary"):
+                    description = child.text
+                elif name in ("encoded", "content") and not child.get("url"):
+                    fallback_description = "".join(child.itertext())
+                elif name in ("pubDate", "date", "published", "updated") and not pub_date:
+                    pub_date = (child.text or "").strip() or None
+
+            for media in elem.iter("{*}content", "{*}thumbnail", "{*}enclosure"):
+                if media.get("url"):
+                    image = media.get("url")
+                    break
+
+            summary, description_image = html_to_text(description or fallback_description)
+            items.append({
+                "title": title or "No title",
+                "summary": summary[:SUMMARY_MAX_CHARS].strip() or "Read more...",
+                "link": link or "",
+                "image_url": image or description_image,
+                "published_at": pub_date
+            })
+
+            elem.clear(keep_tail=False)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+            if len(items) >= limit:
+                break
+    except etree.XMLSyntaxError as e:
+        logger.error(f"RSS parse error for {url}: {e}")
+    return items
+
 async def scrape_rss_feed(url: str, category: str, limit: int = 10) -> List[Dict]:
     """Scrape news from RSS feed"""
     news_items = []
@@ -301,58 +491,18 @@ async def scrape_rss_feed(url: str, category: str, limit: int = 10) -> List[Dict
             response = await client.get(url, headers=headers, timeout=20.0, follow_redirects=True)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'lxml-xml')
-                items = soup.find_all('item')[:limit]
+                # Parse off the event loop
+                items = await asyncio.to_thread(parse_rss_items, response.content, url, limit)
+                source = feed_source_name(url)
                 
                 for idx, item in enumerate(items):
-                    title_el = item.find('title')
-                    link_el = item.find('link')
-                    desc_el = item.find('description')
-                    pub_date = item.find('pubDate')
-                    
-                    # Extract image
-                    image = None
-                    media = item.find('media:content') or item.find('enclosure') or item.find('media:thumbnail')
-                    if media and media.get('url'):
-                        image = media.get('url')
-                    
-                    if not image and desc_el:
-                        desc_soup = BeautifulSoup(desc_el.text, 'html.parser')
-                        img_tag = desc_soup.find('img')
-                        if img_tag and img_tag.get('src'):
-                            image = img_tag.get('src')
-                    
-                    # Clean description
-                    desc_text = ""
-                    if desc_el:
-                        desc_soup = BeautifulSoup(desc_el.text, 'html.parser')
-                        desc_text = desc_soup.get_text()[:400].strip()
-                    
-                    # Determine source
-                    source = "News"
-                    if "thehindu" in url:
-                        source = "The Hindu"
-                    elif "timesofindia" in url:
-                        source = "Times of India"
-                    elif "telangana" in url.lower():
-                        source = "Telangana Today"
-                    elif "siasat" in url:
-                        source = "Siasat"
-                    elif "hansindia" in url:
-                        source = "The Hans India"
-                    
-                    title_text = title_el.text.strip() if title_el else "No title"
-                    
                     news_items.append({
+                        **item,
                         "id": f"rss_{category}_{idx}_{uuid.uuid4().hex[:6]}",
-                        "title": title_text,
-                        "summary": desc_text or "Read more...",
-                        "link": link_el.text.strip() if link_el else "",
-                        "image_url": image,
                         "category": category,
                         "source": source,
                         "is_scraped": True,
-                        "published_at": pub_date.text if pub_date else now_iso(),
+                        "published_at": item["published_at"] or now_iso(),
                         "created_at": now_iso()
                     })
     except Exception as e:
@@ -369,50 +519,241 @@ async def scrape_category(category: str, limit: int = 20, use_ai: bool = False)
         news = await scrape_rss_feed(feed_url, category, limit=limit // len(feeds) if feeds else limit)
         all_news.extend(news)
     
-    # Optional: AI rephrase first 5 articles
-    if use_ai and OPENAI_API_KEY:
-        for i, article in enumerate(all_news[:5]):
-            rephrased = await rephrase_with_ai(article["title"], article["summary"])
-            all_news[i]["title"] = rephrased["title"]
-            all_news[i]["summary"] = rephrased["summary"]
-            all_news[i]["is_ai_rephrased"] = True
+    # Optional: AI rephrase first 5 articles, in one batch
+    if use_ai and rephrase_enabled():
+        try:
+            for article, rephrased in zip(all_news[:5], await rephrase_articles(all_news[:5])):
+                article.update(rephrased)
+        except Exception as e:
+            logger.error(f"AI rephrase error: {e}")
     
     return all_news[:limit]
 
 # ============== SYNC WITH DAMMAIGUDA ==============
+# An article bound for My Dammaiguda carries its delivery state in a `sync` sub-document
+# written by the same insert/upsert as the article, so an article is never saved without
+# being queued, or queued without being saved. A background worker claims due articles
+# under a lease, delivers them in batches to the bulk push endpoint and retries failures
+# with exponential backoff. Every article has an idempotency key, so a redelivery after
+# a timeout or crash is reported back as a duplicate instead of creating it twice.
+
+OUTBOX_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("SYNC_POLL_SECONDS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("SYNC_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_DELAY_SECONDS = 5
+OUTBOX_MAX_DELAY_SECONDS = 3600
+# A worker that dies mid-delivery releases its batch after this long
+OUTBOX_LEASE_SECONDS = 120
+
+# Categories My Dammaiguda accepts; politics and education have no counterpart there
+SYNC_CATEGORIES = {
+    "local", "city", "state", "national", "international", "sports", "entertainment", "tech", "health", "business"
+}
 
-async def sync_to_dammaiguda(article: Dict):
-    """Push article to My Dammaiguda API"""
-    if not DAMMAIGUDA_API or not DAMMAIGUDA_TOKEN:
-        return None
-    
+# Client errors that say nothing about the articles in the batch, so the batch is retried as is
+RETRYABLE_CLIENT_ERRORS = {401, 403, 404, 408, 429}
+
+def sync_enabled() -> bool:
+    return bool(DAMMAIGUDA_API and DAMMAIGUDA_TOKEN)
+
+def sync_key(article: Dict) -> str:
+    """Stable per story: scraped articles get a new id on every scrape, so key those by link"""
+    if article.get("is_scraped") and article.get("link"):
+        return "news-api:link:" + hashlib.sha256(article["link"].strip().encode("utf-8")).hexdigest()[:32]
+    return f"news-api:{article['id']}"
+
+def clean_text(value) -> Optional[str]:
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+def sync_payload(article: Dict) -> Dict:
+    """Bulk push item for an article, shaped to pass the app's validation; ValueError if it can't"""
+    title = clean_text(article.get("title"))
+    if not title:
+        raise ValueError("Article has no title")
+    category = article.get("category") or "local"
+    if category not in SYNC_CATEGORIES:
+        raise ValueError(f"Category '{category}' is not available in My Dammaiguda")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{DAMMAIGUDA_API}/news/admin/push",
-                json={
-                    "title": article.get("title"),
-                    "title_te": article.get("title_te"),
-                    "summary": article.get("summary"),
-                    "summary_te": article.get("summary_te"),
-                    "category": article.get("category", "local"),
-                    "image_url": article.get("image_url"),
-                    "video_url": article.get("video_url"),
-                    "link": article.get("link"),
-                    "is_pinned": article.get("is_pinned", False),
-                    "priority": article.get("priority", 5),
-                    "content_type": article.get("content_type", "text")
-                },
-                headers={"Authorization": f"Bearer {DAMMAIGUDA_TOKEN}"},
-                timeout=30.0
-            )
-            return response.json()
-    except Exception as e:
-        logger.error(f"Sync to Dammaiguda failed: {e}")
+        priority = int(article.get("priority"))
+    except (TypeError, ValueError):
+        priority = 5
+    video_url = clean_text(article.get("video_url"))
+    return {
+        "idempotency_key": sync_key(article),
+        "title": title,
+        "title_te": clean_text(article.get("title_te")),
+        # Feed items without a description fall back to their headline
+        "summary": clean_text(article.get("summary")) or title,
+        "summary_te": clean_text(article.get("summary_te")),
+        "category": category,
+        "image_url": clean_text(article.get("image_url")),
+        "video_url": video_url,
+        "link": clean_text(article.get("link")),
+        "source": clean_text(article.get("source")),
+        "is_pinned": bool(article.get("is_pinned")),
+        "priority": priority,
+        "content_type": "video" if video_url and article.get("content_type") == "video" else "text"
+    }
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(OUTBOX_MAX_DELAY_SECONDS, OUTBOX_BASE_DELAY_SECONDS * 2 ** (attempts - 1)))
+
+def iso_in(seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+def sync_state(article: Dict) -> Optional[Dict]:
+    """Initial `sync` sub-document for an article, or None when sync is off.
+    An article the app would reject is recorded as dead straight away."""
+    if not sync_enabled():
         return None
+    try:
+        sync_payload(article)
+        error = None
+    except ValueError as e:
+        error = str(e)
+    now = now_iso()
+    return {
+        "idempotency_key": sync_key(article),
+        "status": "dead" if error else "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "lease_owner": None,
+        "lease_until": None,
+        "last_error": error,
+        "queued_at": now
+    }
+
+def wake_outbox_worker():
+    _outbox_wakeup.set()
+
+async def claim_outbox_batch(owner: str) -> List[Dict]:
+    """Lease up to OUTBOX_BATCH_SIZE due articles to this worker"""
+    now = now_iso()
+    due = {
+        "$or": [
+            {"sync.status": "pending", "sync.next_attempt_at": {"$lte": now}, "sync.lease_until": None},
+            {"sync.status": "pending", "sync.lease_until": {"$lt": now}}
+        ]
+    }
+    candidates = await db.news_articles.find(due, {"_id": 0, "id": 1}).sort("sync.next_attempt_at", 1).to_list(OUTBOX_BATCH_SIZE)
+    if not candidates:
+        return []
+    # The filter is re-applied, so an article another worker leased in the meantime is skipped
+    await db.news_articles.update_many(
+        {"$and": [{"id": {"$in": [c["id"] for c in candidates]}}, due]},
+        {"$set": {"sync.lease_owner": owner, "sync.lease_until": iso_in(OUTBOX_LEASE_SECONDS)}}
+    )
+    return await db.news_articles.find(
+        {"sync.lease_owner": owner, "sync.status": "pending"}, {"_id": 0}
+    ).to_list(OUTBOX_BATCH_SIZE)
+
+async def deliver_batch(http: httpx.AsyncClient, articles: List[Dict]) -> Dict[str, Dict]:
+    """POST one batch; {idempotency_key: per-item result} or raises on a transport/server error"""
+    response = await http.post(
+        f"{DAMMAIGUDA_API}/news/admin/push/bulk",
+        json={"articles": [sync_payload(article) for article in articles]},
+        headers={"Authorization": f"Bearer {DAMMAIGUDA_TOKEN}"},
+        timeout=30.0
+    )
+    response.raise_for_status()
+    return {item["idempotency_key"]: item for item in response.json().get("results", [])}
+
+async def deliver_articles(http: httpx.AsyncClient, articles: List[Dict]) -> Dict[str, Dict]:
+    """Deliver articles, isolating the ones the app rejects so they don't hold back the rest
+
+    Articles that no longer make a valid payload (edited since they were queued) fail
+    without being sent. A batch refused with a client error is split in half until the
+    offending article is on its own; that article gets a permanent per-item error.
+    """
+    results, sendable = {}, []
+    for article in articles:
+        try:
+            sync_payload(article)
+            sendable.append(article)
+        except ValueError as e:
+            results[article["sync"]["idempotency_key"]] = {"status": "error", "detail": str(e)}
+    if not sendable:
+        return results
+    try:
+        results.update(await deliver_batch(http, sendable))
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        if not 400 <= status < 500 or status in RETRYABLE_CLIENT_ERRORS:
+            raise
+        if len(sendable) == 1:
+            detail = f"Rejected with HTTP {status}: {e.response.text[:200]}"
+            results[sendable[0]["sync"]["idempotency_key"]] = {"status": "error", "detail": detail}
+        else:
+            middle = len(sendable) // 2
+            results.update(await deliver_articles(http, sendable[:middle]))
+            results.update(await deliver_articles(http, sendable[middle:]))
+    return results
+
+async def settle_outbox(articles: List[Dict], results: Dict[str, Dict], batch_error: Optional[str] = None):
+    """Mark delivered articles done and reschedule (or dead-letter) the rest"""
+    now = now_iso()
+    ops = []
+    for article in articles:
+        state = article["sync"]
+        result = results.get(state["idempotency_key"])
+        release = {"sync.lease_owner": None, "sync.lease_until": None}
+        if result and result.get("status") in ("created", "duplicate"):
+            ops.append(UpdateOne({"id": article["id"]}, {"$set": {
+                **release, "sync.status": "delivered", "sync.remote_id": result.get("id"),
+                "sync.delivered_at": now, "sync.last_error": None
+            }}))
+            continue
+        attempts = state["attempts"] + 1
+        error = batch_error or (result or {}).get("detail") or "missing from response"
+        # A rejected item (bad category, ...) will be rejected again; only transport errors are retried
+        permanent = result is not None and result.get("status") == "error"
+        update = {**release, "sync.attempts": attempts, "sync.last_error": error, "sync.last_attempt_at": now}
+        if permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+            update["sync.status"] = "dead"
+        else:
+            update["sync.next_attempt_at"] = iso_in(retry_delay(attempts))
+        ops.append(UpdateOne({"id": article["id"]}, {"$set": update}))
+    if ops:
+        await db.news_articles.bulk_write(ops, ordered=False)
+
+async def process_outbox(http: httpx.AsyncClient, owner: str) -> int:
+    """Deliver one claimed batch; returns how many articles were attempted"""
+    articles = await claim_outbox_batch(owner)
+    if not articles:
+        return 0
+    try:
+        results = await deliver_articles(http, articles)
+        await settle_outbox(articles, results)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Sync batch of {len(articles)} failed: {e}")
+        await settle_outbox(articles, {}, batch_error=str(e) or type(e).__name__)
+    return len(articles)
+
+_outbox_wakeup = asyncio.Event()
+
+async def outbox_worker():
+    """Drain the outbox until cancelled, polling every OUTBOX_POLL_SECONDS when idle"""
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    async with httpx.AsyncClient() as http:
+        while True:
+            try:
+                if await process_outbox(http, owner) == OUTBOX_BATCH_SIZE:
+                    continue
+            except Exception as e:
+                logger.error(f"Sync outbox error: {e}")
+            _outbox_wakeup.clear()
+            try:
+                await asyncio.wait_for(_outbox_wakeup.wait(), timeout=OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
 
 # ============== ROUTES: PUBLIC ==============
 
+# Delivery state is internal to the admin side
+PUBLIC_ARTICLE_PROJECTION = {"_id": 0, "sync": 0}
+
 @app.get("/")
 async def root():
     return {
@@ -447,7 +788,7 @@ async def get_all_news(
     # Get admin-pushed articles
     admin_news = await db.news_articles.find(
         {"is_active": {"$ne": False}},
-        {"_id": 0}
+        PUBLIC_ARTICLE_PROJECTION
     ).sort([("is_pinned", -1), ("is_breaking", -1), ("priority", 1), ("created_at", -1)]).to_list(limit)
     
     for article in admin_news:
@@ -484,7 +825,7 @@ async def get_news_by_category(
     # Get admin-pushed articles for this category
     admin_news = await db.news_articles.find(
         {"$or": [{"category": category}, {"is_pinned": True}], "is_active": {"$ne": False}},
-        {"_id": 0}
+        PUBLIC_ARTICLE_PROJECTION
     ).sort([("is_pinned", -1), ("is_breaking", -1), ("priority", 1), ("created_at", -1)]).to_list(limit)
     
     for article in admin_news:
@@ -507,7 +848,7 @@ async def get_news_by_category(
 @app.get("/api/news/article/{article_id}")
 async def get_article(article_id: str):
     """Get single article by ID"""
-    article = await db.news_articles.find_one({"id": article_id}, {"_id": 0})
+    article = await db.news_articles.find_one({"id": article_id}, PUBLIC_ARTICLE_PROJECTION)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
     
@@ -525,7 +866,6 @@ async def get_article(article_id: str):
 @app.post("/api/news/admin/push")
 async def admin_push_news(
     article: NewsArticle,
-    background_tasks: BackgroundTasks,
     sync_to_app: bool = Query(False, description="Also push to My Dammaiguda"),
     user: dict = Depends(require_admin)
 ):
@@ -556,13 +896,15 @@ async def admin_push_news(
         "created_at": now_iso(),
         "updated_at": now_iso()
     }
+    # Queued in the same insert; delivered to My Dammaiguda by the outbox worker
+    state = sync_state(new_article) if sync_to_app else None
+    if state:
+        new_article["sync"] = state
     
     await db.news_articles.insert_one(new_article)
     new_article.pop("_id", None)
-    
-    # Sync to My Dammaiguda in background
-    if sync_to_app:
-        background_tasks.add_task(sync_to_dammaiguda, new_article)
+    if state:
+        wake_outbox_worker()
     
     return {"success": True, "article": new_article}
 
@@ -683,7 +1025,7 @@ async def get_bookmarks(user: dict = Depends(get_current_user)):
     article_ids = [b["article_id"] for b in bookmarks]
     articles = await db.news_articles.find(
         {"id": {"$in": article_ids}},
-        {"_id": 0}
+        PUBLIC_ARTICLE_PROJECTION
     ).to_list(100)
     
     for article in articles:
@@ -758,6 +1100,7 @@ async def trigger_scrape(
     limit: int = Query(10, ge=1, le=50),
     use_ai: bool = Query(False),
     auto_save: bool = Query(False),
+    sync_to_app: bool = Query(False, description="Also push saved articles to My Dammaiguda"),
     user: dict = Depends(require_admin)
 ):
     """Manually trigger RSS scraping for a category"""
@@ -766,6 +1109,7 @@ async def trigger_scrape(
     
     categories = [category] if category != "all" else list(RSS_FEEDS.keys())
     all_scraped = []
+    queued = 0
     
     for cat in categories:
         scraped = await scrape_category(cat, limit=limit, use_ai=use_ai)
@@ -776,19 +1120,57 @@ async def trigger_scrape(
             for article in scraped:
                 article["is_scraped"] = True
                 article["scraped_at"] = now_iso()
-                await db.news_articles.update_one(
-                    {"id": article["id"]},
-                    {"$set": article},
-                    upsert=True
-                )
+                state = sync_state(article) if sync_to_app else None
+                update = {"$set": article}
+                if state:
+                    update["$setOnInsert"] = {"sync": state}
+                try:
+                    result = await db.news_articles.update_one({"id": article["id"]}, update, upsert=True)
+                except DuplicateKeyError:
+                    # This story's link was saved and queued by an earlier scrape
+                    continue
+                if state and state["status"] == "pending" and result.upserted_id is not None:
+                    queued += 1
+    
+    if queued:
+        wake_outbox_worker()
     
     return {
         "success": True,
         "scraped_count": len(all_scraped),
         "articles": all_scraped,
-        "saved_to_db": auto_save
+        "saved_to_db": auto_save,
+        "queued_for_sync": queued
     }
 
+@app.get("/api/news/admin/sync/outbox")
+async def sync_outbox_stats(user: dict = Depends(require_admin)):
+    """Outbox counts by status, plus the most recent failures"""
+    counts = {"pending": 0, "delivered": 0, "dead": 0}
+    async for row in db.news_articles.aggregate([
+        {"$match": {"sync": {"$exists": True}}},
+        {"$group": {"_id": "$sync.status", "count": {"$sum": 1}}}
+    ]):
+        counts[row["_id"]] = row["count"]
+    failures = await db.news_articles.find(
+        {"sync.last_error": {"$ne": None, "$exists": True}},
+        {"_id": 0, "id": 1, "title": 1, "category": 1, "sync": 1}
+    ).sort("sync.last_attempt_at", -1).to_list(20)
+    return {"enabled": sync_enabled(), "counts": counts, "recent_failures": failures}
+
+@app.post("/api/news/admin/sync/retry")
+async def sync_outbox_retry(user: dict = Depends(require_admin)):
+    """Put dead-lettered articles back in the queue"""
+    result = await db.news_articles.update_many(
+        {"sync.status": "dead"},
+        {"$set": {
+            "sync.status": "pending", "sync.attempts": 0, "sync.next_attempt_at": now_iso(),
+            "sync.lease_owner": None, "sync.lease_until": None
+        }}
+    )
+    wake_outbox_worker()
+    return {"success": True, "requeued": result.modified_count}
+
 # ============== HEALTH CHECK ==============
 
 @app.get("/health")